@@ -0,0 +1,91 @@
+"""
+Compares the per-marker map loop with server-side clustering.
+
+For 1k, 10k and 100k synthetic samples spread over Australia this builds the
+folium map both ways and reports the rendered HTML size (what st_folium ships
+to the browser) and the time taken to build and render it.
+
+    python Benchmarks/bench_clustering.py [--sizes 1000 10000 100000] [--zoom 4]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import folium
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Src" / "Map Interface"))
+from clustering import cluster_samples, add_clusters  # noqa: E402
+
+AUSTRALIA_BOUNDS = [[-44.0, 112.0], [-10.0, 154.0]]
+
+
+def synthetic_samples(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "sample_id": np.arange(n),
+        "name": [f"Sample {i}" for i in range(n)],
+        "lat": rng.uniform(-44.0, -10.0, n),
+        "lon": rng.uniform(112.0, 154.0, n),
+    })
+
+
+def render(m):
+    return m.get_root().render()
+
+
+def per_marker_map(samples):
+    m = folium.Map(tiles="Cartodb Positron")
+    m.fit_bounds(AUSTRALIA_BOUNDS)
+    for s in samples.to_dict('records'):
+        folium.Marker(
+            [s['lat'], s['lon']],
+            tooltip=f"""
+        Name: {s['name']}; SampleID: {s['sample_id']}
+        """
+        ).add_to(m)
+    return render(m)
+
+
+def clustered_map(samples, zoom):
+    m = folium.Map(tiles="Cartodb Positron")
+    m.fit_bounds(AUSTRALIA_BOUNDS)
+    markers = folium.FeatureGroup(name="Samples")
+    clusters, singles = cluster_samples(samples, zoom, AUSTRALIA_BOUNDS)
+    add_clusters(markers, clusters)
+    for s in singles.to_dict('records'):
+        folium.Marker(
+            [s['lat'], s['lon']],
+            tooltip=f"""
+        Name: {s['name']}; SampleID: {s['sample_id']}
+        """
+        ).add_to(markers)
+    markers.add_to(m)
+    return render(m), len(clusters), len(singles)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--zoom", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'samples':>8} | {'mode':<10} | {'objects':>8} | {'payload (KB)':>12} | {'time (s)':>8}")
+    for n in args.sizes:
+        samples = synthetic_samples(n)
+        html, t = timed(per_marker_map, samples)
+        print(f"{n:>8} | {'per-marker':<10} | {n:>8} | {len(html) / 1024:>12.1f} | {t:>8.3f}")
+        (html, n_clusters, n_singles), t = timed(clustered_map, samples, args.zoom)
+        print(f"{n:>8} | {'clustered':<10} | {n_clusters + n_singles:>8} | {len(html) / 1024:>12.1f} | {t:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
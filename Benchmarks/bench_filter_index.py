@@ -0,0 +1,91 @@
+"""
+Sidebar filtering: pandas boolean masks vs FilterIndex.
+
+Builds synthetic samples (default 1M, 3 images each, 5 equipment types) and
+times the operations a Streamlit rerun performs, with the original
+full-table pandas approach and with the index:
+
+- filter:  all samples in a date window with images of selected types
+- viewport: the same filters applied to the samples inside the viewport
+
+    python Benchmarks/bench_filter_index.py [--samples 1000000]
+"""
+import argparse
+import datetime
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Src" / "Map Interface"))
+from filter_index import FilterIndex  # noqa: E402
+
+TYPES = ["SEM", "TEM", "XRD", "EDS", "CT"]
+
+
+def synthetic(n, images_per_sample=3, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, n + 1)
+    dates = pd.Timestamp("2000-01-01") + pd.to_timedelta(rng.integers(0, 9000, n), unit="D")
+    samples = pd.DataFrame({"sample_id": ids, "date": dates.date})
+    m = n * images_per_sample
+    images = pd.DataFrame({
+        "image_id": np.arange(1, m + 1),
+        "sample_id": rng.integers(1, n + 1, m),
+        "etype": rng.choice(TYPES, m),
+    })
+    return samples, images
+
+
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--viewport", type=int, default=20_000, help="samples inside the viewport")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    samples, images = synthetic(args.samples)
+    start, end = datetime.date(2005, 1, 1), datetime.date(2015, 1, 1)
+    wanted = ["SEM", "XRD"]
+    rng = np.random.default_rng(1)
+    viewport = samples.iloc[rng.choice(len(samples), args.viewport, replace=False)]
+
+    t = time.perf_counter()
+    sample_types = images[["sample_id", "etype"]].drop_duplicates()
+    index = FilterIndex(samples["sample_id"], samples["date"], sample_types)
+    print(f"{args.samples:,} samples, {len(images):,} images; index built in {time.perf_counter() - t:.2f} s")
+
+    def pandas_filter(df):
+        mask = (df["date"] >= start) & (df["date"] <= end)
+        ok = images.loc[images["etype"].isin(wanted), "sample_id"].unique()
+        return df[mask & df["sample_id"].isin(ok)]
+
+    expected = np.sort(pandas_filter(samples)["sample_id"].to_numpy())
+    assert np.array_equal(index.sample_ids(start, end, wanted), expected)
+    assert np.array_equal(index.mask(viewport["sample_id"], start, end, wanted),
+                          viewport["sample_id"].isin(expected).to_numpy())
+
+    print(f"{'operation':<10} | {'pandas (ms)':>12} | {'index (ms)':>11}")
+    rows = [
+        ("filter", lambda: pandas_filter(samples), lambda: index.sample_ids(start, end, wanted)),
+        ("viewport", lambda: pandas_filter(viewport),
+         lambda: viewport[index.mask(viewport["sample_id"], start, end, wanted)]),
+    ]
+    for name, slow, fast in rows:
+        print(f"{name:<10} | {timed(slow, args.repeats):>12.3f} | {timed(fast, args.repeats):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
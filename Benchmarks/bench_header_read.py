@@ -0,0 +1,190 @@
+"""
+Bytes read and time for TIFF metadata extraction: whole file vs header only.
+
+Writes synthetic large SEM TIFFs (FEI-style text in tag 34682 and a Zeiss
+block in 34118, default 5000 x 4000 16-bit pixels), serves them from a local
+HTTP server that honours Range requests, and compares:
+
+- local full:   the extract_from_image path (Image.open + SEMMeta), counting
+                the bytes PIL reads from the file
+- local header: tiff_header.extract_header_only on the path (mmap)
+- http full:    download the whole file, then extract_from_image
+- http header:  tiff_header.extract_header_only on the URL (Range requests)
+
+It also checks that every method returns the same record.
+
+    python Benchmarks/bench_header_read.py [--files 10] [--width 5000] [--height 4000]
+"""
+import argparse
+import io
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Src" / "Metadata extraction"))
+from sem_extract import convert_meta_to_json, extract_from_image  # noqa: E402
+from tiff_header import extract_header_only  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_metadata_parse import fei_block, zeiss_block  # noqa: E402
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler plus single-range `Range: bytes=a-b` support."""
+
+    def log_message(self, *args):
+        pass
+
+    def send_head(self):
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        path = self.translate_path(self.path)
+        if not match or not os.path.isfile(path):
+            return super().send_head()
+        size = os.path.getsize(path)
+        first = int(match.group(1))
+        last = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+        if first >= size:
+            self.send_error(416)
+            return None
+        with open(path, "rb") as f:
+            f.seek(first)
+            body = f.read(last - first + 1)
+        self.send_response(206)
+        self.send_header("Content-Type", "image/tiff")
+        self.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+        self.send_header("Content-Length", str(last - first + 1))
+        self.end_headers()
+        return io.BytesIO(body)
+
+
+class CountingFile(io.RawIOBase):
+    """Wraps a binary file and counts the bytes read through it."""
+
+    def __init__(self, f):
+        super().__init__()
+        self.f = f
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self.f.seek(offset, whence)
+
+    def tell(self):
+        return self.f.tell()
+
+    def readinto(self, buffer):
+        n = self.f.readinto(buffer)
+        self.bytes_read += n or 0
+        return n
+
+
+def write_corpus(folder, n, width, height):
+    import numpy as np
+    import tifffile
+
+    rng = np.random.default_rng(0)
+    for i in range(n):
+        data = rng.integers(0, 65535, size=(height, width), dtype="uint16")
+        tifffile.imwrite(
+            Path(folder) / f"large_{i}.tif", data, description="SEM image", metadata=None,
+            rowsperstrip=64, extratags=[(34682, "s", 0, fei_block(i), True),
+                                        (34118, "s", 0, zeiss_block(i), True)],
+        )
+
+
+def local_full(path):
+    from PIL import Image
+    from sem_meta import SEMMeta
+
+    with open(path, "rb") as raw:
+        f = CountingFile(raw)
+        with Image.open(f) as im:
+            meta, _ = SEMMeta.ImageMetadata(im)
+            record = {"image": Path(path).name, "metadata": convert_meta_to_json(meta)}
+    return record, f.bytes_read
+
+
+def http_full(url, session, folder):
+    r = session.get(url, timeout=30)
+    r.raise_for_status()
+    path = Path(folder) / url.rsplit("/", 1)[-1]
+    path.write_bytes(r.content)
+    return extract_from_image(str(path)), len(r.content)
+
+
+def measure(fn, sources):
+    times, total_bytes, records = [], 0, []
+    for source in sources:
+        start = time.perf_counter()
+        record, n = fn(source)
+        times.append(time.perf_counter() - start)
+        total_bytes += n
+        records.append(record)
+    return times, total_bytes, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--width", type=int, default=5000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--keep", action="store_true", help="keep the generated files")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="bench_header_")
+    download_dir = tempfile.mkdtemp(prefix="bench_header_dl_")
+    server = None
+    try:
+        write_corpus(folder, args.files, args.width, args.height)
+        paths = sorted(str(p) for p in Path(folder).glob("*.tif"))
+        file_bytes = sum(os.path.getsize(p) for p in paths)
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(RangeRequestHandler, directory=folder))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base}/{Path(p).name}" for p in paths]
+
+        session = requests.Session()
+        methods = [
+            ("local full", local_full, paths),
+            ("local header", extract_header_only, paths),
+            ("http full", lambda u: http_full(u, session, download_dir), urls),
+            ("http header", lambda u: extract_header_only(u, session=session), urls),
+        ]
+
+        print(f"{len(paths)} files, {file_bytes / 1e6:.1f} MB total")
+        print(f"{'method':<13} | {'bytes read':>12} | {'% of file':>9} | {'p50 (ms)':>9} | {'total (s)':>9}")
+        reference = None
+        for name, fn, sources in methods:
+            times, total_bytes, records = measure(fn, sources)
+            reference = reference or records
+            same = "" if records == reference else "  (records differ!)"
+            print(f"{name:<13} | {total_bytes:>12,} | {100 * total_bytes / file_bytes:>8.2f}% | "
+                  f"{statistics.median(times) * 1e3:>9.2f} | {sum(times):>9.3f}{same}")
+    finally:
+        if server is not None:
+            server.shutdown()
+        shutil.rmtree(download_dir, ignore_errors=True)
+        if args.keep:
+            print(f"Files kept in {folder}")
+        else:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+JEOL sidecar throughput: the original parse_jeol_metadata vs jeol_sidecar.py.
+
+Writes a folder of synthetic sidecars in two dialects ($$SM_ keys with
+CRLF, and $SM_ keys with tabs and LF), then times over the whole folder:
+
+- original:  the regex-per-line parse_jeol_metadata (raw strings)
+- tokenize:  jeol_sidecar.read_sidecar (raw strings, single pass)
+- typed:     jeol_sidecar.parse_sidecar (schema keys as numbers / dates)
+- table:     jeol_sidecar.parse_folder, all files to one typed DataFrame
+- rerun:     parse_folder again with the previous table, nothing changed
+
+and checks that original and tokenize return identical dicts.
+
+    python Benchmarks/bench_jeol_sidecar.py [--files 5000] [--repeats 5]
+"""
+import argparse
+import re
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Src" / "Metadata extraction"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import jeol_sidecar  # noqa: E402
+from synthetic import jeol_sidecar as classic_sidecar  # noqa: E402
+
+# ------------------ Original implementation (baseline) ------------------
+
+def legacy_parse_jeol_metadata(meta_path):
+    d={}
+    try:
+        with open(meta_path,"r",encoding="utf-8",errors="ignore") as f:
+            for line in f:
+                line=line.strip()
+                if line.startswith("$"):
+                    m=re.match(r"^\$+([A-Z0-9_%]+)\s*(.*)$",line)
+                    if m: k,v=m.groups(); d[k.strip()]=v.strip()
+    except Exception as e:
+        d={"Error":f"Failed to parse metadata: {e}"}
+    return d
+
+# ------------------ Corpus ------------------
+
+def single_dollar_sidecar(i):
+    """Later-instrument dialect: $SM_ keys, tab separated, LF line endings."""
+    lines = []
+    for line in classic_sidecar(i).split("\r\n"):
+        if line:
+            key, _, value = line.lstrip("$").partition(" ")
+            lines.append(f"${key}\t{value}")
+    lines.append(f"$SM_STAGE_POS {i % 70}.0 {i % 50}.5 10.0 0.0 {i % 360}.0")
+    return "\n".join(lines) + "\n"
+
+
+def write_corpus(folder, n):
+    folder = Path(folder)
+    total = 0
+    for i in range(n):
+        text = single_dollar_sidecar(i) if i % 3 == 2 else classic_sidecar(i)
+        total += (folder / f"jeol_{i:05d}.txt").write_text(text, encoding="utf-8", newline="")
+    return total
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="bench_jeol_")
+    try:
+        size = write_corpus(folder, args.files)
+        paths = jeol_sidecar.find_sidecars(folder)
+        previous, _ = jeol_sidecar.parse_folder(folder)
+        methods = {
+            "original": lambda: [legacy_parse_jeol_metadata(p) for p in paths],
+            "tokenize": lambda: [jeol_sidecar.read_sidecar(p) for p in paths],
+            "typed": lambda: [jeol_sidecar.parse_sidecar(p) for p in paths],
+            "table": lambda: jeol_sidecar.parse_folder(folder),
+            "rerun": lambda: jeol_sidecar.parse_folder(folder, previous),
+        }
+        mismatches = sum(legacy_parse_jeol_metadata(p) != jeol_sidecar.read_sidecar(p)[0] for p in paths)
+
+        print(f"{len(paths)} sidecars, {size / 1e6:.1f} MB, best of {args.repeats}")
+        print(f"{'method':<9} | {'files/s':>9} | {'MB/s':>6} | {'speed-up':>8}")
+        baseline = None
+        for name, fn in methods.items():
+            t = best_of(fn, args.repeats)
+            baseline = baseline or t
+            print(f"{name:<9} | {len(paths) / t:>9,.0f} | {size / 1e6 / t:>6.1f} | {baseline / t:>7.1f}x")
+        print("raw outputs identical" if not mismatches else f"⚠️ raw outputs differ for {mismatches} files")
+        print(f"table: {len(previous)} rows x {len(previous.columns)} typed columns, "
+              f"{previous.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
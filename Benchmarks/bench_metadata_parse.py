@@ -0,0 +1,175 @@
+"""
+Per-file metadata normalisation time: original parse_value vs the current one.
+
+Reads the TIFF tags of every file in a corpus (as SEMMeta.ImageMetadata
+returns them), then times convert_meta_to_json over all files with the
+original implementation and with the one in sem_extract.py, and checks that
+both produce identical output.
+
+    python Benchmarks/bench_metadata_parse.py --corpus /path/to/vendor/tiffs
+    python Benchmarks/bench_metadata_parse.py            # synthetic FEI/Zeiss/Fibics headers
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Src" / "Metadata extraction"))
+import sem_extract  # noqa: E402
+
+# ------------------ Original implementation (baseline) ------------------
+
+def legacy_strip_ns_key(key): return key.split('}')[-1] if '}' in key else key
+
+def legacy_xml_to_dict(elem):
+    children = list(elem)
+    if not children:
+        t = elem.text.strip() if elem.text and elem.text.strip() else None
+        return t
+    r = {}
+    for c in children:
+        d = legacy_xml_to_dict(c)
+        t = legacy_strip_ns_key(c.tag)
+        if t in r:
+            if not isinstance(r[t], list): r[t] = [r[t]]
+            r[t].append(d)
+        else:
+            r[t] = d
+    return r
+
+def legacy_strip_ns(d):
+    if isinstance(d, dict):  return {legacy_strip_ns_key(k): legacy_strip_ns(v) for k,v in d.items()}
+    if isinstance(d, list):  return [legacy_strip_ns(i) for i in d]
+    return d
+
+def legacy_parse_value(v):
+    if v is None: return None
+    if isinstance(v,(tuple,list)): return [legacy_parse_value(i) for i in v]
+    if isinstance(v,bytes):
+        try: v=v.decode("utf-8",errors="ignore")
+        except: return None
+    if isinstance(v,str):
+        try:
+            r=ET.fromstring(v)
+            return {legacy_strip_ns_key(r.tag):legacy_xml_to_dict(r)}
+        except ET.ParseError: pass
+        if "=" in v:
+            kv={}
+            for line in v.splitlines():
+                if "=" in line:
+                    k,val=line.split("=",1)
+                    kv[k.strip()]=val.strip()
+            if kv: return {"plain":kv}
+    try: json.dumps(v); return v
+    except: return None
+
+def legacy_convert_meta_to_json(meta):
+    c={}
+    for k,v in meta.items():
+        try: c[str(k)]=legacy_strip_ns(legacy_parse_value(v))
+        except: c[str(k)]=None
+    return c
+
+# ------------------ Synthetic corpus ------------------
+
+def fei_block(i):
+    sections = {
+        "User": {"Date": "05/01/2024", "Time": f"10:{i % 60:02d}:00 AM", "User": "operator"},
+        "System": {"Type": "SEM", "Dnumber": "D1234", "Software": "Helios 5.1", "Source": "FEG"},
+        "Beam": {"HV": "5000", "Spot": "3", "StigmatorX": "0.1", "StigmatorY": "-0.2"},
+        "Scan": {"PixelWidth": f"{1e-9 * (i + 1):.6e}", "PixelHeight": f"{1e-9 * (i + 1):.6e}",
+                 "Dwelltime": "1e-06", "HorFieldsize": "1.2e-05"},
+    }
+    lines = []
+    for name, keys in sections.items():
+        lines.append(f"[{name}]")
+        lines.extend(f"{k}={v}" for k, v in keys.items())
+        lines.extend(f"Param{j}={j * 0.5}" for j in range(40))
+        lines.append("")
+    return "\r\n".join(lines)
+
+
+def zeiss_block(i):
+    lines = ["0", "0"]
+    for j in range(300):
+        lines.append(f"AP_PARAM_{j}")
+        lines.append(f"Param {j} = {j * 1.5 + i:.2f} nm")
+    return "\r\n".join(lines)
+
+
+def fibics_block(i):
+    scans = "".join(f"<Item{j}>{j}</Item{j}>" for j in range(100))
+    return (f'<?xml version="1.0" encoding="iso-8859-1"?><Fibics xmlns="http://fibics.com/ns">'
+            f'<Application>Atlas</Application><Scan><Ux>{i * 0.1:.3f}</Ux><Dwell>3</Dwell>{scans}</Scan></Fibics>')
+
+
+def build_synthetic_corpus(folder, n=60):
+    import numpy as np
+    from PIL import Image, TiffImagePlugin
+
+    folder = Path(folder)
+    for i in range(n):
+        ifd = TiffImagePlugin.ImageFileDirectory_v2()
+        kind = i % 3
+        if kind == 0:
+            ifd[34682] = fei_block(i)
+        elif kind == 1:
+            ifd[34118] = zeiss_block(i)
+        else:
+            ifd[34118] = fibics_block(i)
+        ifd[270] = "SEM image" if kind else fei_block(i)
+        img = Image.fromarray((np.random.default_rng(i).random((256, 256)) * 255).astype("uint8"))
+        img.save(folder / f"synthetic_{i}.tif", tiffinfo=ifd, compression=None)
+    return folder
+
+
+def read_headers(folder):
+    from PIL import Image
+    headers = []
+    for p in sorted(Path(folder).rglob("*")):
+        if p.suffix.lower() in (".tif", ".tiff"):
+            with Image.open(p) as im:
+                headers.append((p.name, dict(im.tag)))
+    return headers
+
+
+def time_per_file(fn, headers, repeats):
+    per_file = []
+    for _ in range(repeats):
+        for _, meta in headers:
+            start = time.perf_counter()
+            fn(meta)
+            per_file.append(time.perf_counter() - start)
+    return per_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", help="folder of real vendor TIFFs (default: synthetic)")
+    parser.add_argument("--files", type=int, default=60, help="synthetic corpus size")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    folder = args.corpus or build_synthetic_corpus(tempfile.mkdtemp(prefix="bench_meta_"), args.files)
+    headers = read_headers(folder)
+    if not headers:
+        sys.exit(f"No TIFF files found in {folder}")
+
+    mismatches = [name for name, meta in headers
+                  if legacy_convert_meta_to_json(meta) != sem_extract.convert_meta_to_json(meta)]
+
+    print(f"{len(headers)} files from {folder}")
+    print(f"{'implementation':<10} | {'mean (us)':>10} | {'p50 (us)':>10} | {'p99 (us)':>10}")
+    for name, fn in (("original", legacy_convert_meta_to_json), ("current", sem_extract.convert_meta_to_json)):
+        t = sorted(time_per_file(fn, headers, args.repeats))
+        p99 = t[min(len(t) - 1, int(len(t) * 0.99))]
+        print(f"{name:<10} | {statistics.mean(t) * 1e6:>10.1f} | {statistics.median(t) * 1e6:>10.1f} | {p99 * 1e6:>10.1f}")
+    print("outputs identical" if not mismatches else f"outputs differ for: {', '.join(mismatches)}")
+
+
+if __name__ == "__main__":
+    main()
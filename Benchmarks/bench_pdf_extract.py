@@ -0,0 +1,106 @@
+"""
+PDF image extraction: the original serial loop vs pdf_extract.py.
+
+Builds a synthetic report (default 1000 pages, each with a shared logo, a
+figure of its own and every 10th page repeating an earlier figure) and
+extracts it with both implementations, reporting time, files and bytes
+written, and the number of metadata rows.
+
+    python Benchmarks/bench_pdf_extract.py [--pages 1000] [--workers 4]
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Src" / "Metadata extraction"))
+import fitz  # noqa: E402
+import pandas as pd  # noqa: E402
+from pdf_extract import extract_pdf_images  # noqa: E402
+
+
+def legacy_extract(pdf_path, full_output_path):
+    """The loop from app.extract_images_from_pdf before this change, without the Tk output."""
+    doc = fitz.open(pdf_path)
+    metadata_list = []
+    for page_index in range(len(doc)):
+        page = doc[page_index]
+        for img_index, img in enumerate(page.get_images(full=True)):
+            xref = img[0]
+            base_image = doc.extract_image(xref)
+            image_filename = f"page{page_index+1}_img{img_index+1}.{base_image['ext']}"
+            image_path = os.path.join(full_output_path, image_filename)
+            with open(image_path, "wb") as f:
+                f.write(base_image["image"])
+            metadata_list.append({
+                "Page": page_index + 1, "Image Number": img_index + 1, "Filename": image_filename,
+                "Width (px)": base_image["width"], "Height (px)": base_image["height"],
+                "Extension": base_image["ext"], "Color Space": base_image["colorspace"],
+                "Bits per Component": base_image["bpc"], "File Path": image_path,
+            })
+    df = pd.DataFrame(metadata_list)
+    df.to_csv(os.path.join(full_output_path, "image_metadata.csv"), index=False)  # xlsx needs openpyxl
+    return len(metadata_list)
+
+
+def build_report(path, pages, figure_px=400):
+    import numpy as np
+    from PIL import Image
+
+    def png(seed, size):
+        a = (np.random.default_rng(seed).random((size, size, 3)) * 255).astype("uint8")
+        buf = io.BytesIO()
+        Image.fromarray(a).save(buf, "png")
+        return buf.getvalue()
+
+    logo = png(0, 96)
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(20, 20, 80, 80), stream=logo)
+        page.insert_image(fitz.Rect(100, 100, 500, 500), stream=png(p + 1, figure_px))
+        if p % 10 == 9:
+            page.insert_image(fitz.Rect(100, 520, 300, 720), stream=png(p - 8, figure_px))
+    doc.save(path)
+
+
+def folder_stats(folder):
+    files = [f for f in os.scandir(folder) if not f.name.startswith("image_metadata")]
+    return len(files), sum(f.stat().st_size for f in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_pdf_")
+    try:
+        pdf = os.path.join(work, "report.pdf")
+        build_report(pdf, args.pages)
+        print(f"{args.pages} pages, {os.path.getsize(pdf) / 1e6:.1f} MB")
+        print(f"{'method':<9} | {'seconds':>8} | {'rows':>6} | {'files':>6} | {'MB written':>10}")
+
+        out = os.path.join(work, "legacy")
+        os.makedirs(out)
+        start = time.perf_counter()
+        rows = legacy_extract(pdf, out)
+        elapsed = time.perf_counter() - start
+        files, size = folder_stats(out)
+        print(f"{'original':<9} | {elapsed:>8.2f} | {rows:>6} | {files:>6} | {size / 1e6:>10.1f}")
+
+        out = os.path.join(work, "parallel")
+        summary = extract_pdf_images(pdf, out, workers=args.workers)
+        files, size = folder_stats(out)
+        print(f"{'parallel':<9} | {summary['seconds']:>8.2f} | {summary['images']:>6} | {files:>6} | {size / 1e6:>10.1f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+"Similar images" lookups: exact search vs the inverted-file SimilarityIndex.
+
+Generates synthetic embeddings shaped like the ViT pooled outputs (a
+low-rank signal plus noise, so neighbours are graded rather than exact
+copies), then for each catalogue size reports:
+
+- build:   k-means lists over the float16 matrix, and its size on disk
+- load:    SimilarityIndex.load with the matrix memory-mapped
+- query:   p50 / p99 latency and recall@10 against exact search, for
+           exhaustive search and a few nprobe values
+- add:     adding 1% new images incrementally vs rebuilding the index
+
+    python Benchmarks/bench_similarity.py [--sizes 10000 100000] [--dim 768]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Src" / "Map Interface"))
+from similarity import SimilarityIndex, normalise  # noqa: E402
+
+NPROBES = (4, 16, 64)
+K = 10
+
+
+def embeddings(n, dim, rank=32, seed=0):
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(rank, dim)).astype(np.float32)
+    return rng.normal(size=(n, rank)).astype(np.float32) @ basis + rng.normal(scale=2.0, size=(n, dim)).astype(np.float32)
+
+
+def query_stats(index, exact, queries, nprobe):
+    latencies, recall = [], []
+    for q in queries:
+        start = time.perf_counter()
+        if nprobe is None:
+            scores = exact @ exact[q]
+            rows = np.argpartition(-scores, K)[:K + 1]
+        else:
+            rows, _ = index.search(index.vectors[q], K + 1, nprobe)
+        latencies.append(time.perf_counter() - start)
+        truth = set(np.argsort(-(exact @ exact[q]))[:K + 1])
+        recall.append(len(truth & set(rows)) / (K + 1))
+    return np.percentile(latencies, 50) * 1e3, np.percentile(latencies, 99) * 1e3, float(np.mean(recall))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_similarity_")
+    try:
+        for n in args.sizes:
+            vectors = embeddings(n, args.dim)
+            ids = np.arange(1, n + 1)
+            cut = n - n // 100
+
+            start = time.perf_counter()
+            index = SimilarityIndex.build(vectors[:cut], ids[:cut], ids[:cut])
+            build_s = time.perf_counter() - start
+            start = time.perf_counter()
+            index.add(vectors[cut:], ids[cut:], ids[cut:])
+            add_s = time.perf_counter() - start
+            start = time.perf_counter()
+            SimilarityIndex.build(vectors, ids, ids)
+            rebuild_s = time.perf_counter() - start
+
+            folder = os.path.join(work, str(n))
+            index.save(folder)
+            start = time.perf_counter()
+            index = SimilarityIndex.load(folder)
+            load_s = time.perf_counter() - start
+            size = os.path.getsize(os.path.join(index.folder, "vectors.npy"))
+
+            # Exact search on the same float16 vectors, as float32 so numpy uses BLAS
+            exact = normalise(np.asarray(index.vectors))
+            queries = np.random.default_rng(1).integers(0, n, args.queries)
+            print(f"\n{n:,} images x {args.dim} dims: float16 matrix {size / 1e6:.1f} MB, "
+                  f"{len(index.centroids)} lists")
+            print(f"build {build_s:.2f} s | load {load_s * 1e3:.0f} ms | "
+                  f"add {n - cut} images {add_s:.2f} s vs rebuild {rebuild_s:.2f} s")
+            print(f"{'search':<12} | {'p50 ms':>7} | {'p99 ms':>7} | {'recall@10':>9}")
+            for nprobe in (None,) + NPROBES:
+                p50, p99, recall = query_stats(index, exact, queries, nprobe)
+                name = "exact" if nprobe is None else f"nprobe {nprobe}"
+                print(f"{name:<12} | {p50:>7.2f} | {p99:>7.2f} | {recall:>9.2f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Cold start of the map's catalogue: database queries vs the Arrow snapshot.
+
+For each size, writes synthetic tables to SQLite and the same rows to a
+snapshot, then times what a fresh Streamlit process does before its first
+render, each in a new subprocess:
+
+- database: viewport samples plus the sample dates and equipment types
+            read with pd.read_sql (the SQLite stand-ins from run_suite.py)
+            and the FilterIndex built from them
+- snapshot: Snapshot() (memory-mapped Arrow files), its FilterIndex and the
+            viewport mask
+
+    python Benchmarks/bench_snapshot.py [--sizes 10000 100000] [--compression zstd]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "Src" / "Map Interface"))
+sys.path.insert(0, str(HERE))
+
+
+def snapshot_frames(tables):
+    """The synthetic tables in the shape export_snapshot reads them from PostGIS."""
+    samples = tables["Sample"].rename(columns={
+        "id": "sample_id", "sample_name": "name", "description": "desc", "date_collected": "date"})
+    equipment = tables["Equipment"].rename(columns={"id": "equipment_id", "name": "equipment", "type": "etype"})
+    images = tables["SampleImage"].merge(equipment, on="equipment_id", how="left").rename(columns={
+        "id": "image_id", "image_url": "path", "date_obtained": "date"})
+    references = tables["Reference"].merge(tables["Document"], on="document_id").rename(columns={
+        "document_name": "name", "document_url": "link"})
+    return {
+        "samples": samples[["sample_id", "name", "desc", "sample_image_url", "lat", "lon", "date"]],
+        "images": images[["image_id", "sample_id", "path", "caption", "equipment", "etype", "date"]],
+        "references": references[["sample_id", "name", "link"]],
+    }
+
+
+def cold_start(method, source):
+    """
+    Runs in the child process; returns seconds to a ready FilterIndex and
+    viewport. Imports happen before the clock starts: map.py pays for them
+    either way.
+    """
+    from run_suite import AUSTRALIA_BOUNDS, _read_map_data
+    from snapshot import Snapshot
+    from sqlalchemy import create_engine
+
+    start = time.perf_counter()
+    if method == "database":
+        samples, index = _read_map_data(create_engine(f"sqlite:///{source}"))
+    else:
+        snap = Snapshot(source)
+        index = snap.filter_index()
+        samples = snap.viewport(AUSTRALIA_BOUNDS)
+    return {"seconds": time.perf_counter() - start, "samples": len(samples), "indexed": len(index)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000])
+    parser.add_argument("--compression", choices=("lz4", "zstd"), default=None)
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(cold_start(*args.child)))
+        return
+
+    from sqlalchemy import create_engine
+    from snapshot import current_snapshot, write_snapshot
+    from synthetic import sample_tables, write_database
+
+    work = tempfile.mkdtemp(prefix="bench_snapshot_")
+    try:
+        print(f"{'samples':>8} | {'database s':>10} | {'snapshot s':>10} | {'speed-up':>8} | {'snapshot MB':>11}")
+        for n in args.sizes:
+            tables = sample_tables(n)
+            db = os.path.join(work, f"samples_{n}.db")
+            engine = create_engine(f"sqlite:///{db}")
+            write_database(engine, tables)
+            engine.dispose()
+            snap_dir = os.path.join(work, f"snapshot_{n}")
+            write_snapshot(snap_dir, snapshot_frames(tables), {"samples": n}, args.compression)
+            folder = current_snapshot(snap_dir)
+            size = sum(f.stat().st_size for f in os.scandir(folder))
+
+            times = {}
+            for method, source in (("database", db), ("snapshot", snap_dir)):
+                out = subprocess.run([sys.executable, __file__, "--child", method, source],
+                                     capture_output=True, text=True, check=True).stdout
+                times[method] = json.loads(out.strip().splitlines()[-1])["seconds"]
+            print(f"{n:>8} | {times['database']:>10.3f} | {times['snapshot']:>10.3f} | "
+                  f"{times['database'] / times['snapshot']:>7.1f}x | {size / 1e6:>11.1f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Peak memory and time of TIFF -> JPEG conversion: full PIL decode vs streaming.
+
+Writes a synthetic 16-bit grayscale TIFF (default 12000 x 12000 pixels, about
+the size of a large-area SEM map). Each method then runs in a fresh
+subprocess, and the script reports that process's peak RSS:
+
+- pil:    the original path (read all bytes, Image.open, convert('RGB'), save)
+- stream: tiff_stream.stream_downsample to a 1600 px preview
+- dzi:    tiff_stream.build_dzi deep zoom pyramid
+
+    python Benchmarks/bench_tiff_decode.py [--width 12000] [--height 12000] [--keep]
+
+Unix only (uses the resource module).
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+MAP_INTERFACE = Path(__file__).resolve().parents[1] / "Src" / "Map Interface"
+sys.path.insert(0, str(MAP_INTERFACE))
+
+
+def write_synthetic_tiff(path, width, height, rows_per_strip=64):
+    import numpy as np
+    import tifffile
+
+    data = tifffile.memmap(path, shape=(height, width), dtype="uint16", rowsperstrip=rows_per_strip)
+    rng = np.random.default_rng(0)
+    for y in range(0, height, 1024):
+        rows = min(1024, height - y)
+        data[y:y + rows] = rng.integers(0, 65535, size=(rows, width), dtype="uint16")
+    data.flush()
+    del data
+
+
+def run_method(method, tiff_path, out_dir):
+    """Runs inside the child process."""
+    start = time.perf_counter()
+    if method == "pil":
+        from io import BytesIO
+        from PIL import Image
+        Image.MAX_IMAGE_PIXELS = None
+        with open(tiff_path, "rb") as f:
+            image_data = f.read()
+        img = Image.open(BytesIO(image_data))
+        img.convert('RGB').save(os.path.join(out_dir, "full.jpeg"), 'jpeg', quality=85)
+    elif method == "stream":
+        from tiff_stream import stream_downsample
+        stream_downsample(tiff_path, 1600).save(os.path.join(out_dir, "preview.jpeg"), quality=85)
+    elif method == "dzi":
+        from tiff_stream import build_dzi
+        build_dzi(tiff_path, out_dir)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"method": method, "seconds": elapsed, "peak_rss_mb": peak_kb / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--width", type=int, default=12000)
+    parser.add_argument("--height", type=int, default=12000)
+    parser.add_argument("--methods", nargs="+", default=["pil", "stream", "dzi"])
+    parser.add_argument("--keep", action="store_true", help="keep the generated files")
+    parser.add_argument("--child", nargs=3, metavar=("METHOD", "TIFF", "OUT"), help=argparse.SUPPRESS)
+    parser.add_argument("--generate", metavar="TIFF", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_method(*args.child)
+        return
+    if args.generate:
+        write_synthetic_tiff(args.generate, args.width, args.height)
+        return
+
+    work = tempfile.mkdtemp(prefix="bench_tiff_")
+    tiff_path = os.path.join(work, "synthetic.tif")
+    # Generated in a subprocess too: Linux carries the peak RSS of a process
+    # over to the children it execs, which would inflate every measurement
+    subprocess.run(
+        [sys.executable, __file__, "--generate", tiff_path,
+         "--width", str(args.width), "--height", str(args.height)],
+        check=True,
+    )
+    size_mb = os.path.getsize(tiff_path) / 1024 / 1024
+    print(f"{args.width} x {args.height} uint16 TIFF, {size_mb:.0f} MB on disk")
+
+    print(f"{'method':<8} | {'time (s)':>8} | {'peak RSS (MB)':>13}")
+    for method in args.methods:
+        out_dir = tempfile.mkdtemp(dir=work, prefix=method)
+        result = subprocess.run(
+            [sys.executable, __file__, "--child", method, tiff_path, out_dir],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            print(f"{method:<8} | failed: {result.stderr.strip().splitlines()[-1]}")
+            continue
+        r = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{method:<8} | {r['seconds']:>8.2f} | {r['peak_rss_mb']:>13.0f}")
+
+    if not args.keep:
+        import shutil
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Synthetic inputs for the benchmark suite (run_suite.py).
+
+Everything is generated from a fixed seed, so two runs on different commits
+see byte-identical inputs:
+
+- sample_tables:   Sample / Equipment / SampleImage / Document / Reference
+                   rows spread over Australia, as DataFrames
+- write_database:  those tables in a SQLite file, or a scratch PostGIS
+                   database (origin as a geography point)
+- write_fei_tiffs: grayscale TIFFs with FEI text in tag 34682 and a Zeiss
+                   block in 34118
+- write_jeol_pairs: JEOL .tif images with their $CM_/$SM_ .txt sidecars
+- write_pdf:       a multi-page report with shared and repeated figures
+
+    python Benchmarks/synthetic.py SYNTH_DIR --samples 10000
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_metadata_parse import fei_block, zeiss_block  # noqa: E402
+
+SEED = 0
+EQUIPMENT = [
+    ("Helios G4", "SEM"), ("JSM-7001F", "SEM"), ("Titan", "TEM"),
+    ("D8 Advance", "XRD"), ("Oxford X-Max", "EDS"), ("Zeiss Xradia", "CT"),
+]
+LAT_RANGE = (-44.0, -10.0)
+LON_RANGE = (112.0, 154.0)
+
+# ------------------ Sample tables ------------------
+
+def sample_tables(n, images_per_sample=3, refs_per_sample=0.5, seed=SEED):
+    """Returns the five tables the map reads, keyed by table name."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, n + 1)
+    dates = pd.Timestamp("2000-01-01") + pd.to_timedelta(rng.integers(0, 9000, n), unit="D")
+    sample = pd.DataFrame({
+        "id": ids,
+        "sample_name": [f"Sample {i}" for i in ids],
+        "description": [f"Synthetic sample {i}" for i in ids],
+        "sample_image_url": [f"/images/sample_{i}.tif" if i % 4 == 0 else None for i in ids],
+        "lat": rng.uniform(*LAT_RANGE, n),
+        "lon": rng.uniform(*LON_RANGE, n),
+        "date_collected": dates.date,
+    })
+    equipment = pd.DataFrame({
+        "id": np.arange(1, len(EQUIPMENT) + 1),
+        "name": [name for name, _ in EQUIPMENT],
+        "type": [etype for _, etype in EQUIPMENT],
+    })
+    m = n * images_per_sample
+    image_dates = pd.Timestamp("2000-01-01") + pd.to_timedelta(rng.integers(0, 9000, m), unit="D")
+    sample_image = pd.DataFrame({
+        "id": np.arange(1, m + 1),
+        "sample_id": rng.integers(1, n + 1, m),
+        "equipment_id": rng.integers(1, len(EQUIPMENT) + 1, m),
+        "image_url": [f"/images/image_{i}.tif" for i in range(1, m + 1)],
+        "caption": [f"Image {i}" for i in range(1, m + 1)],
+        "date_obtained": image_dates.date,
+    })
+    k = max(1, int(n * refs_per_sample))
+    document = pd.DataFrame({
+        "document_id": np.arange(1, k + 1),
+        "document_name": [f"Report {i}" for i in range(1, k + 1)],
+        "document_url": [f"https://example.org/reports/{i}.pdf" for i in range(1, k + 1)],
+    })
+    reference = pd.DataFrame({
+        "sample_id": rng.integers(1, n + 1, k),
+        "document_id": np.arange(1, k + 1),
+    })
+    return {"Sample": sample, "Equipment": equipment, "SampleImage": sample_image,
+            "Document": document, "Reference": reference}
+
+
+def write_database(engine, tables):
+    """
+    Writes sample_tables() output. On PostgreSQL the lat/lon columns become
+    the PostGIS `origin` geography the app queries, so point engine at a
+    scratch database: the five tables are dropped and recreated.
+    """
+    from sqlalchemy import text
+
+    postgis = engine.dialect.name == "postgresql"
+    with engine.begin() as conn:
+        for name, df in tables.items():
+            df.to_sql(name.lower() if postgis else name, conn, if_exists="replace", index=False,
+                      chunksize=10_000, method="multi" if postgis else None)
+        if postgis:
+            conn.execute(text("ALTER TABLE sample ADD COLUMN origin geography(Point, 4326)"))
+            conn.execute(text("UPDATE sample SET origin = ST_SetSRID(ST_MakePoint(lon, lat), 4326)::geography"))
+            conn.execute(text("ALTER TABLE sample ALTER COLUMN date_collected TYPE date USING date_collected::date"))
+            conn.execute(text("ALTER TABLE sampleimage ALTER COLUMN date_obtained TYPE date "
+                              "USING date_obtained::date"))
+        else:
+            conn.execute(text("CREATE INDEX sample_lat_lon ON Sample (lat, lon)"))
+            conn.execute(text("CREATE INDEX sampleimage_sample_id ON SampleImage (sample_id)"))
+
+# ------------------ SEM images ------------------
+
+def _pixels(rng, height, width):
+    # Smooth gradient plus noise: compresses and decodes like a real micrograph, not like white noise
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 64, width, dtype=np.float32)[None, :]
+    return np.clip(y * 0.7 + x + rng.normal(0, 12, (height, width)), 0, 255).astype(np.uint8)
+
+
+def write_fei_tiffs(folder, n, width=1024, height=768, seed=SEED):
+    """FEI-style TIFFs (text metadata in 34682, Zeiss block in 34118). Returns their paths."""
+    import tifffile
+
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(n):
+        path = folder / f"fei_{i:05d}.tif"
+        tifffile.imwrite(path, _pixels(rng, height, width), description="SEM image", metadata=None,
+                         extratags=[(34682, "s", 0, fei_block(i), True), (34118, "s", 0, zeiss_block(i), True)])
+        paths.append(str(path))
+    return paths
+
+
+def jeol_sidecar(i):
+    """A JEOL .txt sidecar: $CM_ common and $$SM_ instrument keys."""
+    lines = [
+        "$CM_FORMAT JEOL/SEM",
+        "$CM_VERSION 1.0",
+        "$CM_INSTRUMENT JSM-7001F",
+        f"$CM_DATE 2023/{i % 12 + 1:02d}/{i % 28 + 1:02d}",
+        f"$CM_TIME 10:{i % 60:02d}:00",
+        "$CM_OPERATOR operator",
+        f"$CM_TITLE Sample {i}",
+        "$CM_ACCEL_VOLT 15.00",
+        f"$CM_MAG {1000 * (i % 20 + 1)}",
+        "$CM_SIGNAL SEI",
+        "$CM_FULL_SIZE 1280 960",
+        f"$CM_MICRON_BAR {i % 50 + 10}",
+        "$CM_MICRON_MARKER 200",
+        "$$SM_MICRON_BAR 10",
+        "$$SM_WD 10.0",
+        "$$SM_SCAN_ROTATION 0.0",
+        "$$SM_EMISSION_CURRENT 81500",
+        "$$SM_FILAMENT_STATE ON",
+    ]
+    lines += [f"$$SM_PARAM_{j} {j * 0.25:.2f}" for j in range(60)]
+    return "\r\n".join(lines) + "\r\n"
+
+
+def write_jeol_pairs(folder, n, width=640, height=480, seed=SEED):
+    """JEOL image + sidecar pairs. Returns [(image_path, sidecar_path)]."""
+    from PIL import Image
+
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    pixels = _pixels(rng, height, width)  # the sidecars are what differs between pairs
+    pairs = []
+    for i in range(n):
+        image, sidecar = folder / f"jeol_{i:05d}.tif", folder / f"jeol_{i:05d}.txt"
+        Image.fromarray(pixels).save(image)
+        sidecar.write_text(jeol_sidecar(i), encoding="utf-8", newline="")
+        pairs.append((str(image), str(sidecar)))
+    return pairs
+
+# ------------------ PDFs ------------------
+
+def write_pdf(path, pages, figure_px=400):
+    """Multi-image report: a shared logo and a figure per page, every 10th page repeats one."""
+    from bench_pdf_extract import build_report  # needs PyMuPDF, only for this input
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    build_report(str(path), pages, figure_px)
+    return str(path)
+
+# ------------------ Main ------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the synthetic benchmark inputs to a folder.")
+    parser.add_argument("output", help="folder to write to")
+    parser.add_argument("--samples", type=int, default=10_000)
+    parser.add_argument("--tiffs", type=int, default=50)
+    parser.add_argument("--sidecars", type=int, default=500)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--db-url", help="SQLAlchemy URL to write the tables to (default: SQLite in output)")
+    args = parser.parse_args(argv)
+
+    from sqlalchemy import create_engine
+
+    out = Path(args.output)
+    out.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(args.db_url or f"sqlite:///{out / 'samples.db'}")
+    write_database(engine, sample_tables(args.samples))
+    write_fei_tiffs(out / "fei", args.tiffs)
+    write_jeol_pairs(out / "jeol", args.sidecars)
+    write_pdf(out / "report.pdf", args.pages)
+    print(f"✅ Wrote {args.samples} samples, {args.tiffs} FEI TIFFs, {args.sidecars} JEOL pairs "
+          f"and a {args.pages} page PDF to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+import os
+
+from sqlalchemy import URL, create_engine
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # optional, DB_* environment variables work without it
+    load_dotenv = None
+
+# -------------------------------
+# Database connection settings
+# -------------------------------
+# Shared by the map interface, the ingestion tool and the embedding job, so
+# every component reads the same DB_* variables the same way. URL.create
+# escapes the parts, so passwords containing "@", "/" or ":" work.
+
+
+def database_url():
+    """PostgreSQL URL from the DB_* environment variables."""
+    port = os.getenv("DB_PORT")
+    return URL.create(
+        "postgresql+psycopg2",
+        username=os.getenv("DB_USER"), password=os.getenv("DB_PASS"),
+        host=os.getenv("DB_HOST"), port=int(port) if port else None,
+        database=os.getenv("DB_NAME"),
+    )
+
+
+def engine_from_env(**kwargs):
+    """Engine for database_url(), after loading .env when python-dotenv is installed."""
+    if load_dotenv is not None:
+        load_dotenv()
+    return create_engine(database_url(), **kwargs)
@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+
+try:
+    import tifffile
+except ImportError:  # optional, callers fall back to a full PIL decode
+    tifffile = None
+
+# -------------------------------
+# Strip/tile-wise TIFF band reader
+# -------------------------------
+# Shared by the map interface's previews and deep zoom pyramids and by the
+# model tools' tiled inference. The TIFF is decoded one strip (or row of
+# tiles) at a time and each band is mapped to 8 bit on its own, so memory
+# stays around one band whatever the image size, and both components see
+# the same pixels.
+
+SEGMENT_BUFFER = 8 * 1024 * 1024  # bytes of compressed strips/tiles read per batch
+LUMA = np.array([19595, 38470, 7471], dtype=np.uint32)  # ITU-R 601 in 16.16 fixed point, as PIL's convert("L")
+
+
+def can_stream(path):
+    """True when the TIFF at path has a layout iter_bands can handle."""
+    if tifffile is None:
+        return False
+    try:
+        with tifffile.TiffFile(path) as tif:
+            return _supported(tif.pages[0])
+    except Exception:
+        return False
+
+
+def _supported(page):
+    if page.planarconfig != 1 or page.samplesperpixel not in (1, 3, 4):
+        return False
+    if page.photometric not in (0, 1, 2):  # min-is-white, min-is-black, RGB
+        return False
+    return page.dtype is not None and page.dtype.kind in "uif"
+
+
+def to_uint8(arr, photometric, gray=False):
+    """Maps a decoded segment to uint8 with 3 channels, or to one grey channel."""
+    if arr.dtype == np.uint8:
+        out = arr
+    elif arr.dtype.kind in "ui":
+        if arr.dtype.kind == "i":
+            # Negative samples are black and 0..max spans the full range;
+            # shifting them as they are would wrap negatives to white
+            arr = np.maximum(arr, 0).astype(f"u{arr.dtype.itemsize}") << 1
+        out = (arr >> (arr.dtype.itemsize * 8 - 8)).astype(np.uint8)
+    else:
+        out = (np.clip(arr, 0.0, 1.0) * 255).astype(np.uint8)
+    if photometric == 0:
+        out = 255 - out
+    if gray:
+        if out.shape[-1] >= 3:
+            return (((out[..., :3].astype(np.uint32) * LUMA).sum(axis=-1) + 0x8000) >> 16).astype(np.uint8)
+        return out[..., 0]
+    if out.shape[-1] == 1:
+        out = np.repeat(out, 3, axis=-1)
+    elif out.shape[-1] == 4:
+        out = out[..., :3]
+    return out
+
+
+def image_size(path):
+    """(width, height) of the first TIFF page, read from the header only."""
+    with tifffile.TiffFile(path) as tif:
+        page = tif.pages[0]
+        return page.imagewidth, page.imagelength
+
+
+def iter_bands(path, gray=False):
+    """
+    Yields (y, band) in top-to-bottom order, where band is a full-width
+    uint8 RGB array (2-D grey with gray=True) covering rows
+    y .. y + band.shape[0]. Each band is one strip, or one row of tiles for
+    tiled TIFFs.
+    """
+    with tifffile.TiffFile(path) as tif:
+        page = tif.pages[0]
+        if not _supported(page):
+            raise ValueError(f"Unsupported TIFF layout in {path}")
+        width, height = page.imagewidth, page.imagelength
+        per_band = math.ceil(width / page.chunks[1])
+        channels = () if gray else (3,)
+
+        pending = {}  # band y -> [array, segments still expected]
+        next_y = 0
+        # Small read buffer keeps tifffile from loading hundreds of MB of strips at once
+        for segment, (_, _, y, x, _), _ in page.segments(maxworkers=1, buffersize=SEGMENT_BUFFER):
+            if segment is None:
+                continue
+            seg = segment[0][: height - y, : width - x]  # crop edge padding
+            if y not in pending:
+                pending[y] = [np.empty((seg.shape[0], width, *channels), np.uint8), per_band]
+            band = pending[y]
+            band[0][:, x:x + seg.shape[1]] = to_uint8(seg, page.photometric, gray)
+            band[1] -= 1
+            # Emit completed bands in order; tifffile normally delivers them so
+            while next_y in pending and pending[next_y][1] == 0:
+                done = pending.pop(next_y)[0]
+                yield next_y, done
+                next_y += done.shape[0]
+            if not pending and next_y >= height:
+                break
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import folium
+
+# -------------------------------
+# Server-side marker clustering
+# -------------------------------
+# Samples are binned into a square lat/lon grid whose cell size follows the
+# map zoom (roughly CELL_PX screen pixels per cell). Cells holding a single
+# sample are drawn as normal markers, everything else becomes one cluster
+# marker, so the page only ever carries a few hundred objects.
+
+CELL_PX = 64          # approximate on-screen size of a cluster cell
+TILE_PX = 256         # leaflet tile size
+MAX_CLUSTER_ZOOM = 15 # from this zoom on every sample gets its own marker
+DRILL_DOWN_ZOOM_STEP = 2
+
+CLUSTER_TOOLTIP_PREFIX = "Cluster"
+
+
+def cell_size_deg(zoom, cell_px=CELL_PX):
+    """Width in degrees of one grid cell at the given map zoom."""
+    return 360.0 / (2 ** zoom) * (cell_px / TILE_PX)
+
+
+def in_bounds_mask(lat, lon, bounds):
+    """Vectorised test of which points fall inside [[south, west], [north, east]]."""
+    (south, west), (north, east) = bounds
+    return (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+
+
+def cluster_samples(samples, zoom, bounds=None, cell_px=CELL_PX):
+    """
+    Aggregates samples into zoom-dependent grid clusters.
+
+    Returns (clusters, singles): clusters is a DataFrame with one row per
+    cell holding more than one sample (centroid lat/lon and count), singles
+    is the subset of samples that should be drawn as individual markers.
+    Only samples inside bounds are considered.
+    """
+    if bounds is not None and not samples.empty:
+        samples = samples[in_bounds_mask(samples['lat'].to_numpy(), samples['lon'].to_numpy(), bounds)]
+
+    empty_clusters = pd.DataFrame(columns=["lat", "lon", "count"])
+    if samples.empty or zoom is None or zoom >= MAX_CLUSTER_ZOOM:
+        return empty_clusters, samples
+
+    lat = samples['lat'].to_numpy(dtype=np.float64)
+    lon = samples['lon'].to_numpy(dtype=np.float64)
+
+    # Grid anchored at (-90, -180) so cells stay put while panning
+    size = cell_size_deg(zoom, cell_px)
+    n_cols = int(np.ceil(360.0 / size)) + 1
+    ix = np.floor((lon + 180.0) / size).astype(np.int64)
+    iy = np.floor((lat + 90.0) / size).astype(np.int64)
+    cell = iy * n_cols + ix
+
+    _, inverse, counts = np.unique(cell, return_inverse=True, return_counts=True)
+    member_counts = counts[inverse]
+
+    singles = samples[member_counts == 1]
+    grouped = counts > 1
+    if not grouped.any():
+        return empty_clusters, singles
+
+    n_cells = len(counts)
+    lat_mean = np.bincount(inverse, weights=lat, minlength=n_cells) / counts
+    lon_mean = np.bincount(inverse, weights=lon, minlength=n_cells) / counts
+
+    clusters = pd.DataFrame({
+        "lat": lat_mean[grouped],
+        "lon": lon_mean[grouped],
+        "count": counts[grouped],
+    })
+    return clusters, singles
+
+
+def cluster_icon(count):
+    """Small round DivIcon with the member count, sized by magnitude."""
+    size = 26 if count < 100 else 34 if count < 1000 else 42
+    return folium.DivIcon(
+        icon_size=(size, size),
+        icon_anchor=(size // 2, size // 2),
+        html=(
+            f'<div style="width:{size}px;height:{size}px;line-height:{size}px;'
+            f'border-radius:50%;background:rgba(74,144,226,0.8);color:white;'
+            f'text-align:center;font:bold 12px sans-serif;">{count}</div>'
+        ),
+    )
+
+
+def add_clusters(feature_group, clusters):
+    """Adds one clickable marker per cluster to the feature group."""
+    for c in clusters.itertuples(index=False):
+        folium.Marker(
+            [c.lat, c.lon],
+            icon=cluster_icon(int(c.count)),
+            tooltip=f"{CLUSTER_TOOLTIP_PREFIX} of {int(c.count)} samples",
+        ).add_to(feature_group)
+
+
+def is_cluster_tooltip(tooltip):
+    return bool(tooltip) and tooltip.strip().startswith(CLUSTER_TOOLTIP_PREFIX)
+
+
+def drill_down_zoom(zoom):
+    """Zoom level to jump to after clicking a cluster."""
+    return min(MAX_CLUSTER_ZOOM, (zoom or 0) + DRILL_DOWN_ZOOM_STEP)
+
+
+def pad_bounds(bounds, ratio=0.5):
+    """Grows [[south, west], [north, east]] by ratio of its size on every side."""
+    (south, west), (north, east) = bounds
+    dlat, dlon = (north - south) * ratio, (east - west) * ratio
+    return [[max(-90.0, south - dlat), max(-180.0, west - dlon)],
+            [min(90.0, north + dlat), min(180.0, east + dlon)]]
+
+
+def bounds_contains(outer, inner):
+    """True when the inner bounds lie completely inside the outer bounds."""
+    if outer is None:
+        return False
+    (o_south, o_west), (o_north, o_east) = outer
+    (i_south, i_west), (i_north, i_east) = inner
+    return o_south <= i_south and o_west <= i_west and o_north >= i_north and o_east >= i_east
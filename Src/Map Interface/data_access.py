@@ -0,0 +1,474 @@
+import os
+import sys
+import threading
+import math
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import create_engine, event, make_url, text
+
+import metrics
+from filter_index import FilterIndex
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Common"))
+from database import database_url  # noqa: E402
+
+# -------------------------------
+# Viewport-driven query layer
+# -------------------------------
+# Instead of pulling every Sample / SampleImage / Reference row into pandas,
+# the map asks for the samples inside the current folium viewport only.
+# The viewport is snapped to a grid of tiles so neighbouring pans reuse
+# already fetched tiles, and the tiles are kept in a small LRU cache.
+
+SAMPLE_COLUMNS = ["sample_id", "name", "desc", "sample_image_url", "lat", "lon", "date"]
+
+STREAM_CHUNK_ROWS = 50_000       # rows fetched per round trip from a server-side cursor
+DATA_VERSION_POLL_SECONDS = 60   # the version check scans whole tables, so new data may take a minute to show
+
+MIN_TILE_ZOOM = 0
+MAX_TILE_ZOOM = 12
+
+TILE_QUERY = text("""
+    SELECT
+        s.id AS sample_id,
+        s.sample_name AS name,
+        s.description AS desc,
+        s.sample_image_url,
+        ST_Y(s.origin::geometry) AS lat,
+        ST_X(s.origin::geometry) AS lon,
+        s.date_collected::date AS date
+    FROM Sample s
+    WHERE s.origin && ST_MakeEnvelope(:west, :south, :east, :north, 4326)::geography
+""")
+
+SAMPLE_SQL = """
+    SELECT
+        id AS sample_id,
+        sample_name AS name,
+        description AS desc,
+        sample_image_url,
+        ST_Y(origin::geometry) AS lat,
+        ST_X(origin::geometry) AS lon,
+        date_collected::date AS date
+    FROM Sample
+    WHERE id = {sample_id}
+"""
+SAMPLE_QUERY = text(SAMPLE_SQL.format(sample_id=":sample_id"))
+
+# Images and references are only fetched for the selected sample
+SAMPLE_IMAGES_SQL = """
+    SELECT
+        si.id AS image_id,
+        si.sample_id,
+        si.image_url AS path,
+        si.caption,
+        e.name AS equipment,
+        e.type AS etype,
+        si.date_obtained::date AS date
+    FROM SampleImage si
+    LEFT JOIN Equipment e ON si.equipment_id = e.id
+    WHERE si.sample_id = {sample_id}
+    ORDER BY si.id
+"""
+SAMPLE_IMAGES_QUERY = text(SAMPLE_IMAGES_SQL.format(sample_id=":sample_id"))
+
+REFERENCES_SQL = """
+    SELECT
+        r.sample_id,
+        d.document_name AS name,
+        d.document_url AS link
+    FROM Reference r
+    JOIN Document d ON r.document_id = d.document_id
+    WHERE r.sample_id = {sample_id}
+"""
+REFERENCES_QUERY = text(REFERENCES_SQL.format(sample_id=":sample_id"))
+
+# Server-side prepared statements, created on every new pooled PostgreSQL
+# connection, so the per-sample lookups are planned once per connection
+# instead of once per click. psycopg2 itself never prepares.
+PREPARED_STATEMENTS = {
+    "sample_detail": ("bigint", SAMPLE_SQL.format(sample_id="$1")),
+    "sample_images": ("bigint", SAMPLE_IMAGES_SQL.format(sample_id="$1")),
+    "sample_references": ("bigint", REFERENCES_SQL.format(sample_id="$1")),
+}
+PREPARED_SAMPLE_QUERY = text("EXECUTE sample_detail(:sample_id)")
+PREPARED_SAMPLE_IMAGES_QUERY = text("EXECUTE sample_images(:sample_id)")
+PREPARED_REFERENCES_QUERY = text("EXECUTE sample_references(:sample_id)")
+
+# Everything the in-memory filter index is built from: one date per sample
+# and the distinct equipment types of its images
+INDEX_SAMPLES_QUERY = text("""
+    SELECT id AS sample_id, date_collected::date AS date FROM Sample
+""")
+
+INDEX_TYPES_QUERY = text("""
+    SELECT DISTINCT si.sample_id, e.type AS etype
+    FROM SampleImage si
+    JOIN Equipment e ON si.equipment_id = e.id
+    WHERE e.type IS NOT NULL
+""")
+
+# Whole-table reads for the offline catalogue snapshot (snapshot.py)
+ALL_IMAGES_QUERY = text("""
+    SELECT
+        si.id AS image_id,
+        si.sample_id,
+        si.image_url AS path,
+        si.caption,
+        e.name AS equipment,
+        e.type AS etype,
+        si.date_obtained::date AS date
+    FROM SampleImage si
+    LEFT JOIN Equipment e ON si.equipment_id = e.id
+""")
+
+ALL_REFERENCES_QUERY = text("""
+    SELECT
+        r.sample_id,
+        d.document_name AS name,
+        d.document_url AS link
+    FROM Reference r
+    JOIN Document d ON r.document_id = d.document_id
+""")
+
+# Cheap fingerprint of the tables; any insert or delete changes it
+DATA_VERSION_COLUMNS = [
+    "(SELECT COUNT(*) FROM Sample) AS samples",
+    "(SELECT MAX(id) FROM Sample) AS max_sample",
+    "(SELECT COUNT(*) FROM SampleImage) AS images",
+    "(SELECT MAX(id) FROM SampleImage) AS max_image",
+    "(SELECT COUNT(*) FROM Reference) AS refs",
+    "(SELECT COUNT(*) FROM Equipment) AS equipment",
+]
+DATA_VERSION_QUERY = text("SELECT " + ", ".join(DATA_VERSION_COLUMNS))
+
+# Tables whose MAX(updated_at), when they have that column, is added to the
+# fingerprint so edits to existing rows are picked up too
+VERSION_TABLES = ["Sample", "SampleImage", "Reference", "Equipment", "Document"]
+UPDATED_AT_TABLES_QUERY = text("""
+    SELECT table_name FROM information_schema.columns
+    WHERE column_name = 'updated_at' AND table_schema = current_schema()
+""")
+
+# Indexes the viewport and date-window queries rely on. GIST on the
+# geography column backs the `&&` bounding-box test.
+INDEX_STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS sample_origin_gist ON Sample USING GIST (origin)",
+    "CREATE INDEX IF NOT EXISTS sample_date_collected_idx ON Sample (date_collected)",
+    "CREATE INDEX IF NOT EXISTS sampleimage_sample_id_idx ON SampleImage (sample_id)",
+    "CREATE INDEX IF NOT EXISTS reference_sample_id_idx ON Reference (sample_id)",
+]
+
+
+# -------------------------------
+# Engine
+# -------------------------------
+# One pooled engine per process, shared by every Streamlit session (map.py
+# keeps it in st.cache_resource). Pool size and recycling can be tuned from
+# .env. LIFO checkout lets surplus connections sit idle long enough for the
+# server to close them, and pre-ping replaces connections the server dropped.
+
+def _prepare_statements(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, (arg_types, sql) in PREPARED_STATEMENTS.items():
+            cursor.execute(f"PREPARE {name} ({arg_types}) AS {sql}")
+    finally:
+        cursor.close()
+    # PREPARE ran in an implicit transaction; end it so the pool gets a clean connection
+    dbapi_connection.commit()
+
+
+def make_engine(url=None, **overrides):
+    """
+    Creates the pooled engine for url (default: database_url()). Pool
+    settings come from DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT and
+    DB_POOL_RECYCLE; keyword arguments override them.
+    """
+    url = make_url(url or database_url())
+    options = {"pool_pre_ping": True}
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        options.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+            pool_use_lifo=True,
+        )
+    if url.get_backend_name() == "postgresql":
+        options["connect_args"] = {"application_name": "sem-map"}
+    options.update(overrides)
+    engine = create_engine(url, **options)
+    if engine.dialect.name == "postgresql":
+        event.listen(engine, "connect", _prepare_statements)
+    return engine
+
+
+def read_frame(conn, query, params=None, chunksize=STREAM_CHUNK_ROWS):
+    """
+    pd.read_sql through a server-side cursor: rows arrive chunksize at a
+    time instead of the driver buffering the whole result before pandas
+    copies it.
+    """
+    conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+    chunks = list(pd.read_sql(query, conn, params=params, chunksize=chunksize))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def ensure_indexes(engine):
+    """
+    Creates the spatial and lookup indexes used by the viewport queries.
+    Safe to call on every start-up, existing indexes are left alone.
+    """
+    with engine.begin() as conn:
+        for statement in INDEX_STATEMENTS:
+            conn.execute(text(statement))
+
+
+# -------------------------------
+# Tile maths
+# -------------------------------
+
+def tile_zoom_for(map_zoom):
+    """
+    Picks the tile grid level for a folium zoom level. Tiles are two levels
+    coarser than the map so a typical viewport spans only a handful of tiles.
+    """
+    if map_zoom is None:
+        return MIN_TILE_ZOOM
+    return max(MIN_TILE_ZOOM, min(MAX_TILE_ZOOM, int(map_zoom) - 2))
+
+
+def tile_size_deg(tile_zoom):
+    return 360.0 / (2 ** tile_zoom)
+
+
+def tiles_for_bounds(bounds, tile_zoom):
+    """
+    Returns the (tile_zoom, x, y) keys of every tile that overlaps the
+    bounds [[south, west], [north, east]].
+    """
+    (south, west), (north, east) = bounds
+    south, north = max(-90.0, south), min(90.0, north)
+    west, east = max(-180.0, west), min(180.0, east)
+    size = tile_size_deg(tile_zoom)
+
+    x0 = math.floor((west + 180.0) / size)
+    x1 = math.floor((min(east, 179.999999) + 180.0) / size)
+    y0 = math.floor((south + 90.0) / size)
+    y1 = math.floor((min(north, 89.999999) + 90.0) / size)
+    return [(tile_zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def tile_envelope(tile):
+    """Returns (west, south, east, north) for a tile key."""
+    tile_zoom, x, y = tile
+    size = tile_size_deg(tile_zoom)
+    west = x * size - 180.0
+    south = y * size - 90.0
+    return west, south, min(west + size, 180.0), min(south + size, 90.0)
+
+
+def bounds_from_folium(folium_bounds):
+    """
+    Converts the `bounds` dict returned by st_folium into [[south, west], [north, east]].
+    Returns None when the map has not reported a viewport yet.
+    """
+    if not folium_bounds:
+        return None
+    try:
+        sw, ne = folium_bounds["_southWest"], folium_bounds["_northEast"]
+        if sw["lat"] is None or ne["lat"] is None:
+            return None
+        return [[sw["lat"], sw["lng"]], [ne["lat"], ne["lng"]]]
+    except (KeyError, TypeError):
+        return None
+
+
+# -------------------------------
+# Tile cache
+# -------------------------------
+
+class TileCache:
+    """
+    LRU cache of per-tile sample DataFrames keyed by tile and data version.
+    Evicts the least recently used tiles once either the tile count or the
+    total number of cached rows goes over budget. Shared between Streamlit
+    sessions, so access is guarded by a lock.
+    """
+
+    def __init__(self, max_tiles=512, max_rows=250_000):
+        self.max_tiles = max_tiles
+        self.max_rows = max_rows
+        self._tiles = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            df = self._tiles.get(key)
+            if df is None:
+                self.misses += 1
+                metrics.count("cache_misses", cache="tile")
+                return None
+            self._tiles.move_to_end(key)
+            self.hits += 1
+        metrics.count("cache_hits", cache="tile")
+        return df
+
+    def put(self, key, df):
+        with self._lock:
+            old = self._tiles.pop(key, None)
+            if old is not None:
+                self._rows -= len(old)
+            self._tiles[key] = df
+            self._rows += len(df)
+            while self._tiles and (len(self._tiles) > self.max_tiles or self._rows > self.max_rows):
+                if len(self._tiles) == 1:
+                    break  # always keep the tile that was just added
+                _, evicted = self._tiles.popitem(last=False)
+                self._rows -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self._rows = 0
+
+    def __len__(self):
+        return len(self._tiles)
+
+
+# -------------------------------
+# Queries
+# -------------------------------
+
+def _read_tile(conn, tile):
+    west, south, east, north = tile_envelope(tile)
+    with metrics.span("tile_sql", tile=tile):
+        df = pd.read_sql(TILE_QUERY, conn, params={"west": west, "south": south, "east": east, "north": north})
+    metrics.count("rows_loaded", len(df), query="tile")
+    if df.empty:
+        return pd.DataFrame(columns=SAMPLE_COLUMNS)
+    df['date'] = pd.to_datetime(df['date']).dt.date
+    # Samples sitting exactly on a shared tile edge match both envelopes,
+    # keep them only in the tile that owns their lower-left corner.
+    size = tile_size_deg(tile[0])
+    owned = (
+        (((df['lon'] + 180.0) // size) == tile[1]) |
+        (df['lon'] >= 180.0)
+    ) & (
+        (((df['lat'] + 90.0) // size) == tile[2]) |
+        (df['lat'] >= 90.0)
+    )
+    return df[owned].reset_index(drop=True)
+
+
+def load_viewport_samples(engine, cache, bounds, map_zoom, version=None):
+    """
+    Returns every sample inside the viewport as a DataFrame; date and
+    equipment filters are applied afterwards with the FilterIndex. Only
+    tiles not already cached for this data version hit the database.
+    """
+    tiles = tiles_for_bounds(bounds, tile_zoom_for(map_zoom))
+    frames, missing = [], []
+    for tile in tiles:
+        df = cache.get((tile, version))
+        if df is None:
+            missing.append(tile)
+        else:
+            frames.append(df)
+
+    if missing:
+        with engine.connect() as conn:
+            for tile in missing:
+                df = _read_tile(conn, tile)
+                cache.put((tile, version), df)
+                frames.append(df)
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=SAMPLE_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def data_version_query(engine):
+    """
+    DATA_VERSION_QUERY plus MAX(updated_at) of every VERSION_TABLES table
+    that has an updated_at column (PostgreSQL only).
+    """
+    if engine.dialect.name != "postgresql":
+        return DATA_VERSION_QUERY
+    with engine.connect() as conn:
+        found = set(conn.execute(UPDATED_AT_TABLES_QUERY).scalars())
+    columns = DATA_VERSION_COLUMNS + [
+        f"(SELECT MAX(updated_at) FROM {table}) AS {table.lower()}_updated"
+        for table in VERSION_TABLES if table.lower() in found
+    ]
+    return text("SELECT " + ", ".join(columns))
+
+
+def load_data_version(engine, query=DATA_VERSION_QUERY):
+    """Tuple that changes whenever samples, images, references or equipment are added or removed."""
+    with metrics.span("version_sql"), engine.connect() as conn:
+        return tuple(conn.execute(query).one())
+
+
+class DataVersionWatcher:
+    """
+    The current data version, shared by every session. The database is
+    asked at most once per poll_seconds however many sessions rerun;
+    everything cached per version is invalidated as soon as it changes.
+    """
+
+    def __init__(self, engine, poll_seconds=DATA_VERSION_POLL_SECONDS):
+        self.engine = engine
+        self.poll_seconds = poll_seconds
+        self.query = data_version_query(engine)
+        self._version = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._version is None or time.monotonic() - self._checked >= self.poll_seconds:
+                self._version = load_data_version(self.engine, self.query)
+                self._checked = time.monotonic()
+            return self._version
+
+
+def load_filter_index(engine, version=None):
+    """Reads the sample dates and equipment types into a FilterIndex."""
+    with metrics.span("index_sql"), engine.connect() as conn:
+        samples = read_frame(conn, INDEX_SAMPLES_QUERY)
+        sample_types = read_frame(conn, INDEX_TYPES_QUERY)
+    with metrics.span("index_build"):
+        return FilterIndex(samples['sample_id'], samples['date'], sample_types, version)
+
+
+def load_sample(engine, sample_id):
+    """Fetches a single sample as a dict, or None if it does not exist."""
+    query = PREPARED_SAMPLE_QUERY if engine.dialect.name == "postgresql" else SAMPLE_QUERY
+    with metrics.span("sample_sql"), engine.connect() as conn:
+        sample = pd.read_sql(query, conn, params={"sample_id": int(sample_id)})
+    if sample.empty:
+        return None
+    sample['date'] = pd.to_datetime(sample['date']).dt.date
+    return sample.iloc[0].to_dict()
+
+
+def load_sample_details(engine, sample_id):
+    """Fetches the images and references of one sample as (images, references) DataFrames."""
+    prepared = engine.dialect.name == "postgresql"
+    params = {"sample_id": int(sample_id)}
+    with metrics.span("sample_sql"), engine.connect() as conn:
+        images = pd.read_sql(PREPARED_SAMPLE_IMAGES_QUERY if prepared else SAMPLE_IMAGES_QUERY, conn, params=params)
+        references = pd.read_sql(PREPARED_REFERENCES_QUERY if prepared else REFERENCES_QUERY, conn, params=params)
+    images['date'] = pd.to_datetime(images['date']).dt.date
+    return images, references
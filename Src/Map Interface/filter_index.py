@@ -0,0 +1,161 @@
+import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------
+# In-memory filter index
+# -------------------------------
+# Built once per data version and shared by every session. Samples are kept
+# in date order so a date window is two binary searches, and each equipment
+# type has a packed bitmap over that order, so "has an image taken with any
+# of these types" is a bitwise OR of a few bitmaps. Only sample ids, dates
+# and the bitmaps are held; a sample's images and references are fetched
+# when it is selected, so the index stays small as the catalogue grows.
+
+NO_DATE = np.iinfo(np.int64).min  # NaT as int64, sorts before every real date
+RESULT_CACHE_SIZE = 64
+DENSE_ID_RATIO = 4  # use a direct id -> position table while max id <= ratio * samples
+
+
+def to_days(values):
+    """Dates (date objects, strings, datetime64) as int64 days since 1970-01-01; missing -> NO_DATE."""
+    return pd.to_datetime(pd.Series(values, dtype=object)).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def _day(value, default):
+    # None leaves that side of the window open (samples without a date still never match)
+    if value is None:
+        return default
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(np.datetime64(pd.Timestamp(value).date(), "D").astype(np.int64))
+
+
+def _start_day(value):
+    return _day(value, NO_DATE + 1)
+
+
+def _end_day(value):
+    return _day(value, np.iinfo(np.int64).max)
+
+
+class FilterIndex:
+    """
+    Date and equipment type index over all samples.
+
+    sample_ids and dates describe every sample, sample_types has one
+    (sample_id, etype) row per equipment type a sample has images for.
+    """
+
+    def __init__(self, sample_ids, dates, sample_types, version=None):
+        self.version = version
+        ids = np.asarray(sample_ids, dtype=np.int64)
+        days = to_days(dates)
+        order = np.argsort(days, kind="stable")
+        self.ids = ids[order]      # sample ids in date order
+        self.dates = days[order]   # sorted, NO_DATE first
+
+        # sample_id -> position in date order. Database ids are usually dense,
+        # then a plain lookup table beats binary search (random access into it
+        # is one cache miss instead of ~20).
+        self._pos_by_id = None
+        if len(ids) and ids.min() >= 0 and ids.max() <= DENSE_ID_RATIO * len(ids):
+            self._pos_by_id = np.full(int(ids.max()) + 1, -1, dtype=np.int64)
+            self._pos_by_id[self.ids] = np.arange(len(ids))
+        else:
+            self._id_order = np.argsort(self.ids, kind="stable")
+            self._ids_sorted = self.ids[self._id_order]
+
+        self.bitmaps = {}
+        n = len(self.ids)
+        if len(sample_types):
+            pos = self.positions(sample_types["sample_id"].to_numpy())
+            etypes = sample_types["etype"].to_numpy()
+            for etype in pd.unique(etypes):
+                bits = np.zeros(n, dtype=bool)
+                p = pos[(etypes == etype) & (pos >= 0)]
+                bits[p] = True
+                self.bitmaps[etype] = np.packbits(bits)
+        self.types = sorted(self.bitmaps)
+
+        # Streamlit reruns ask for the same filters over and over
+        self._combined = lru_cache(maxsize=RESULT_CACHE_SIZE)(self._combine)
+        self._ids_for = lru_cache(maxsize=RESULT_CACHE_SIZE)(self._filter_ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def date_bounds(self):
+        """(first, last) sample date as datetime.date, or (None, None) when no sample has one."""
+        valid = self.dates[self.dates != NO_DATE]
+        if not len(valid):
+            return None, None
+        epoch = datetime.date(1970, 1, 1)
+        return epoch + datetime.timedelta(days=int(valid[0])), epoch + datetime.timedelta(days=int(valid[-1]))
+
+    def positions(self, sample_ids):
+        """Positions in date order of the given ids, -1 for ids the index does not know."""
+        q = np.asarray(sample_ids, dtype=np.int64)
+        if self._pos_by_id is not None:
+            inside = (q >= 0) & (q < len(self._pos_by_id))
+            return np.where(inside, self._pos_by_id[np.where(inside, q, 0)], -1)
+        if not len(self._ids_sorted):
+            return np.full(len(q), -1, dtype=np.int64)
+        i = np.minimum(np.searchsorted(self._ids_sorted, q), len(self._ids_sorted) - 1)
+        return np.where(self._ids_sorted[i] == q, self._id_order[i], -1)
+
+    def date_slice(self, start, end):
+        """[lo, hi) range of date-ordered positions with start <= date <= end."""
+        lo = np.searchsorted(self.dates, _start_day(start), side="left")
+        hi = np.searchsorted(self.dates, _end_day(end), side="right")
+        return int(lo), int(max(lo, hi))
+
+    def _combine(self, types):
+        """Packed bitmap of samples with at least one image of any of types."""
+        out = np.zeros((len(self.ids) + 7) // 8, dtype=np.uint8)
+        for etype in types:
+            bitmap = self.bitmaps.get(etype)
+            if bitmap is not None:
+                np.bitwise_or(out, bitmap, out=out)
+        return out
+
+    @staticmethod
+    def _key(types):
+        # No equipment selection means no equipment filter
+        return tuple(sorted(types)) if types else None
+
+    def _filter_ids(self, start_day, end_day, types):
+        lo, hi = self.date_slice(start_day, end_day)
+        ids = self.ids[lo:hi]
+        if types is not None and hi > lo:
+            packed = self._combined(types)[lo >> 3:(hi + 7) >> 3]
+            bits = np.unpackbits(packed)[lo & 7:(lo & 7) + (hi - lo)]
+            ids = ids[bits.astype(bool)]
+        ids = np.sort(ids)
+        ids.flags.writeable = False  # shared through the result cache
+        return ids
+
+    def sample_ids(self, start, end, types=None):
+        """Sorted ids of all samples matching the date window and equipment types."""
+        return self._ids_for(_start_day(start), _end_day(end), self._key(types))
+
+    def mask(self, sample_ids, start, end, types=None):
+        """
+        Boolean mask over sample_ids (e.g. the samples in the viewport) of
+        those matching the filters. The cost grows with len(sample_ids), not
+        with the size of the index. Ids unknown to the index never match.
+        """
+        pos = self.positions(sample_ids)
+        known = pos >= 0
+        p = pos[known]
+        d = self.dates[p]
+        keep = (d >= _start_day(start)) & (d <= _end_day(end))
+        key = self._key(types)
+        if key is not None:
+            bitmap = self._combined(key)
+            keep &= ((bitmap[p >> 3] >> (7 - (p & 7))) & 1).astype(bool)
+        out = np.zeros(len(pos), dtype=bool)
+        out[np.flatnonzero(known)[keep]] = True
+        return out
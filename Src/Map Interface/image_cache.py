@@ -0,0 +1,377 @@
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+import requests
+from PIL import Image
+
+import metrics
+from tiff_stream import stream_downsample, build_dzi
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Common"))
+from tiff_bands import can_stream  # noqa: E402
+
+# -------------------------------
+# Persistent TIFF -> JPEG derivative cache
+# -------------------------------
+# Converted images are stored on disk under a content address built from the
+# image URL and the validators the server reports (ETag, size, Last-Modified),
+# so they survive restarts and are shared by every Streamlit process pointing
+# at the same directory. Each source image is decoded once and all renditions
+# are written from that single decode. The directory is kept under a byte
+# budget by deleting the least recently used files.
+#
+# Deep zoom pyramids live elsewhere (Streamlit serves them from ./static)
+# but count against the same budget: each one has a small marker file in the
+# cache directory holding its folder and size, whose mtime is its last use.
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "sem_image_cache")
+DEFAULT_CACHE_MAX_MB = 2048
+
+# name -> longest side in pixels
+RENDITIONS = {
+    "thumb": 320,
+    "preview": 1600,
+}
+JPEG_QUALITY = 85
+DOWNLOAD_TIMEOUT = 10
+DOWNLOAD_CHUNK = 1024 * 1024
+LOCK_TIMEOUT = 120  # seconds before another writer's lock is treated as stale
+KEY_TTL = 300       # seconds a URL's validators are trusted before re-checking
+
+_key_memo = {}
+
+
+class ImageCacheError(Exception):
+    """Raised when an image cannot be downloaded or converted."""
+
+
+def cache_dir_setting():
+    # Read at call time so values loaded from .env after import are honoured
+    return os.getenv("IMAGE_CACHE_DIR") or DEFAULT_CACHE_DIR
+
+
+def cache_max_bytes_setting():
+    return int(float(os.getenv("IMAGE_CACHE_MAX_MB") or DEFAULT_CACHE_MAX_MB) * 1024 * 1024)
+
+
+def cache_key(url, session=None):
+    """
+    Content address for a remote image: URL plus the validators returned by
+    a HEAD request. Falls back to the URL alone when the server gives none.
+    """
+    memo = _key_memo.get(url)
+    if memo and time.monotonic() - memo[1] < KEY_TTL:
+        return memo[0]
+
+    http = session or requests
+    validators = ""
+    try:
+        with metrics.span("image_head"):
+            head = http.head(url, timeout=DOWNLOAD_TIMEOUT, allow_redirects=True)
+        if head.ok:
+            validators = "|".join(
+                head.headers.get(h, "") for h in ("ETag", "Content-Length", "Last-Modified")
+            )
+    except requests.exceptions.RequestException:
+        pass
+    key = hashlib.sha256(f"{url}|{validators}".encode("utf-8")).hexdigest()
+    _key_memo[url] = (key, time.monotonic())
+    return key
+
+
+def rendition_path(key, rendition, cache_dir):
+    return os.path.join(cache_dir, key[:2], f"{key}_{rendition}.jpeg")
+
+
+def pyramid_marker_path(key, cache_dir):
+    return os.path.join(cache_dir, key[:2], f"{key}_dzi.pyramid")
+
+
+def _tree_size(path):
+    total = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+def _write_marker(marker, out_dir, size):
+    os.makedirs(os.path.dirname(marker), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(marker), suffix=".part")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(f"{size}\n{os.path.abspath(out_dir)}\n")
+    os.replace(tmp, marker)
+
+
+def _read_marker(marker):
+    """(size in bytes, pyramid folder) from a marker file, or None if it is gone or unreadable."""
+    try:
+        with open(marker, encoding="utf-8") as f:
+            size, out_dir = f.read().splitlines()[:2]
+        return int(size), out_dir
+    except (OSError, ValueError):
+        return None
+
+
+def _touch(path):
+    # mtime doubles as the "last used" time for LRU eviction
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def _acquire_lock(lock_path):
+    """
+    Cross-process lock via an exclusively created lock file. Returns True once
+    held, or False if the other writer still holds it after LOCK_TIMEOUT.
+    """
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > LOCK_TIMEOUT:
+                    os.remove(lock_path)  # stale lock left by a crashed writer
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.2)
+
+
+def _release_lock(lock_path):
+    try:
+        os.remove(lock_path)
+    except OSError:
+        pass
+
+
+def _write_atomic(img, path):
+    # Write next to the target and rename, so readers never see partial files
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, "jpeg", quality=JPEG_QUALITY)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class DownloadCancelled(ImageCacheError):
+    """Raised when a download is abandoned because its cancel event was set."""
+
+
+def _download(url, dest_dir, session=None, cancel_event=None):
+    """
+    Streams the remote file into a temporary file in dest_dir and returns its
+    path. Checks cancel_event between chunks so abandoned work stops early.
+    """
+    http = session or requests
+    fd, tmp = tempfile.mkstemp(dir=dest_dir, suffix=".download")
+    size = 0
+    try:
+        with metrics.span("image_download", url=url), os.fdopen(fd, "wb") as f, \
+                http.get(url, timeout=DOWNLOAD_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise DownloadCancelled(f"Download cancelled: {url}")
+                f.write(chunk)
+                size += len(chunk)
+    except requests.exceptions.RequestException as e:
+        os.remove(tmp)
+        raise ImageCacheError(f"Error downloading TIFF from URL: {url}. Error: {e}") from e
+    except Exception:
+        os.remove(tmp)
+        raise
+    finally:
+        metrics.count("download_bytes", size)
+    return tmp
+
+
+def build_renditions(source, key, cache_dir):
+    """
+    Decodes the image once and writes every rendition for the key. source is
+    a file path or raw bytes. Module level so it can run in a process pool.
+    """
+    try:
+        if isinstance(source, str) and can_stream(source):
+            # Large TIFFs are reduced strip by strip instead of decoded whole
+            rgb = stream_downsample(source, max(RENDITIONS.values()))
+        else:
+            if isinstance(source, bytes):
+                source = BytesIO(source)
+            with Image.open(source) as img:
+                rgb = img.convert('RGB')
+    except Exception as e:
+        raise ImageCacheError(f"Error processing TIFF image data: {e}") from e
+
+    # Largest first so each smaller rendition is resized from the previous one
+    for name, max_side in sorted(RENDITIONS.items(), key=lambda r: -r[1]):
+        rgb.thumbnail((max_side, max_side), Image.LANCZOS)
+        _write_atomic(rgb, rendition_path(key, name, cache_dir))
+
+
+def get_rendition(url, rendition="preview", cache_dir=None, max_bytes=None, session=None,
+                  decode=None, cancel_event=None):
+    """
+    Returns the path of a cached JPEG rendition of the remote image,
+    downloading and converting it on a miss. Raises ImageCacheError.
+
+    decode replaces build_renditions (e.g. to run it in a process pool) and
+    cancel_event aborts the download when set.
+    """
+    cache_dir = cache_dir or cache_dir_setting()
+    max_bytes = cache_max_bytes_setting() if max_bytes is None else max_bytes
+    if rendition not in RENDITIONS:
+        raise ValueError(f"Unknown rendition {rendition!r}, expected one of {sorted(RENDITIONS)}")
+
+    key = cache_key(url, session)
+    path = rendition_path(key, rendition, cache_dir)
+    if os.path.exists(path):
+        _touch(path)
+        metrics.count("cache_hits", cache="image")
+        return path
+    metrics.count("cache_misses", cache="image")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock_path = os.path.join(os.path.dirname(path), f"{key}.lock")
+    locked = _acquire_lock(lock_path)
+    try:
+        # Another process may have converted it while we waited for the lock
+        if os.path.exists(path):
+            _touch(path)
+            return path
+        tmp = _download(url, os.path.dirname(path), session, cancel_event)
+        try:
+            with metrics.span("image_decode", url=url):
+                (decode or build_renditions)(tmp, key, cache_dir)
+        finally:
+            os.remove(tmp)
+    finally:
+        if locked:
+            _release_lock(lock_path)
+
+    evict(cache_dir, max_bytes, keep=key)
+    return path
+
+
+def get_pyramid(url, out_root, session=None, cache_dir=None, max_bytes=None):
+    """
+    Returns the path of a Deep Zoom (.dzi) pyramid for the remote TIFF,
+    building it under out_root/<cache key>/ on first use. The pyramid counts
+    against the rendition cache budget in cache_dir. Raises ImageCacheError.
+    """
+    cache_dir = cache_dir or cache_dir_setting()
+    max_bytes = cache_max_bytes_setting() if max_bytes is None else max_bytes
+    key = cache_key(url, session)
+    out_dir = os.path.join(out_root, key)
+    dzi_path = os.path.join(out_dir, "image.dzi")
+    marker = pyramid_marker_path(key, cache_dir)
+    if os.path.exists(dzi_path):
+        if os.path.exists(marker):
+            _touch(marker)
+        else:  # built before pyramids were tracked, or the cache dir was cleared
+            _write_marker(marker, out_dir, _tree_size(out_dir))
+        metrics.count("cache_hits", cache="dzi")
+        return dzi_path
+    metrics.count("cache_misses", cache="dzi")
+
+    os.makedirs(out_root, exist_ok=True)
+    lock_path = os.path.join(out_root, f"{key}.lock")
+    locked = _acquire_lock(lock_path)
+    try:
+        if os.path.exists(dzi_path):
+            return dzi_path
+        tmp = _download(url, out_root, session)
+        build_dir = tempfile.mkdtemp(dir=out_root, suffix=".building")
+        try:
+            if not can_stream(tmp):
+                raise ImageCacheError(f"Deep zoom is not supported for this TIFF layout: {url}")
+            with metrics.span("dzi_build", url=url):
+                build_dzi(tmp, build_dir)
+            size = _tree_size(build_dir)
+            os.replace(build_dir, out_dir)  # publish the finished pyramid in one step
+            _write_marker(marker, out_dir, size)
+        finally:
+            os.remove(tmp)
+            if os.path.isdir(build_dir):
+                shutil.rmtree(build_dir, ignore_errors=True)
+    finally:
+        if locked:
+            _release_lock(lock_path)
+
+    evict(cache_dir, max_bytes, keep=key)
+    return dzi_path
+
+
+def _remove_pyramid(marker, out_dir):
+    # Rename first so the viewer never loads a half-deleted pyramid
+    doomed = f"{out_dir}.{time.time_ns()}.evicting"
+    try:
+        os.replace(out_dir, doomed)
+    except FileNotFoundError:
+        pass
+    shutil.rmtree(doomed, ignore_errors=True)
+    os.remove(marker)
+
+
+def evict(cache_dir, max_bytes, keep=None):
+    """
+    Deletes least recently used renditions and deep zoom pyramids until the
+    cache fits in max_bytes. Entries belonging to keep (a cache key) are
+    never removed. Returns the number of bytes freed.
+    """
+    entries = []
+    total = 0
+    for sub in os.scandir(cache_dir) if os.path.isdir(cache_dir) else ():
+        if not sub.is_dir():
+            continue
+        for f in os.scandir(sub.path):
+            if f.name.endswith(".jpeg"):
+                pyramid = None
+            elif f.name.endswith(".pyramid"):
+                pyramid = _read_marker(f.path)
+                if pyramid is None:
+                    continue
+            else:
+                continue
+            try:
+                st = f.stat()
+            except OSError:
+                continue  # removed by another process
+            size = st.st_size if pyramid is None else pyramid[0]
+            entries.append((st.st_mtime, size, f.path, f.name, pyramid))
+            total += size
+
+    freed = 0
+    for _, size, path, name, pyramid in sorted(entries, key=lambda e: e[0]):
+        if total - freed <= max_bytes:
+            break
+        if keep and name.startswith(keep):
+            continue
+        try:
+            if pyramid is None:
+                os.remove(path)
+            else:
+                _remove_pyramid(path, pyramid[1])
+            freed += size
+        except OSError:
+            pass
+    return freed
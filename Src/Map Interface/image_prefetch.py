@@ -0,0 +1,108 @@
+import multiprocessing
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from image_cache import get_rendition, build_renditions, DownloadCancelled
+
+# -------------------------------
+# Concurrent image prefetch
+# -------------------------------
+# When a sample is selected all of its images are fetched at once: downloads
+# run on a bounded thread pool sharing one pooled HTTP session, and the PIL
+# decode/resize runs in a process pool so it doesn't hold the GIL. Each host
+# gets a limited number of concurrent requests. A batch can be cancelled when
+# the user selects another sample, which stops queued and in-flight downloads.
+
+FETCH_WORKERS = 8
+DECODE_WORKERS = None  # default: one per CPU
+PER_HOST_LIMIT = 4
+
+
+class PrefetchBatch:
+    """The in-flight renditions for one sample, in submission order."""
+
+    def __init__(self, futures, cancel_event):
+        self.futures = futures  # list of (item, future)
+        self._cancel_event = cancel_event
+
+    def cancel(self):
+        """Drops queued work and asks running downloads to stop."""
+        self._cancel_event.set()
+        for _, future in self.futures:
+            future.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def as_completed(self):
+        """
+        Yields (index, item, path, error) as each image finishes, where index
+        is the item's position in the submitted list.
+        """
+        index = {future: (i, item) for i, (item, future) in enumerate(self.futures)}
+        for future in as_completed(index):
+            i, item = index[future]
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if isinstance(error, DownloadCancelled):
+                continue
+            yield i, item, (None if error else future.result()), error
+
+
+class ImagePrefetcher:
+    """Shared fetch/decode pools. Create one per process and reuse it."""
+
+    def __init__(self, fetch_workers=FETCH_WORKERS, decode_workers=DECODE_WORKERS, per_host=PER_HOST_LIMIT):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=fetch_workers, pool_maxsize=fetch_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="image-fetch")
+        # spawn, not fork: the Streamlit server process is multi-threaded
+        self.decode_pool = ProcessPoolExecutor(
+            max_workers=decode_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.per_host = per_host
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+        self._host_lock = threading.Lock()
+
+    def _slot(self, url):
+        with self._host_lock:
+            return self._host_slots[urlsplit(url).netloc]
+
+    def _decode(self, source, key, cache_dir):
+        return self.decode_pool.submit(build_renditions, source, key, cache_dir).result()
+
+    def _fetch(self, url, rendition, cancel_event):
+        if cancel_event.is_set():
+            raise DownloadCancelled(f"Download cancelled: {url}")
+        with self._slot(url):
+            return get_rendition(
+                url, rendition, session=self.session,
+                decode=self._decode, cancel_event=cancel_event,
+            )
+
+    def submit(self, items, url_of, rendition="thumb"):
+        """
+        Starts fetching a rendition for every item (url_of(item) gives its
+        URL) and returns a PrefetchBatch.
+        """
+        cancel_event = threading.Event()
+        futures = [
+            (item, self.fetch_pool.submit(self._fetch, url_of(item), rendition, cancel_event))
+            for item in items
+        ]
+        return PrefetchBatch(futures, cancel_event)
+
+    def shutdown(self):
+        self.fetch_pool.shutdown(wait=False, cancel_futures=True)
+        self.decode_pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
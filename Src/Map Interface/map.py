@@ -1,104 +1,210 @@
 import streamlit as st
+import streamlit.components.v1 as components
 from streamlit_folium import st_folium
 import folium
-from sqlalchemy import create_engine, text
 import pandas as pd
-from PIL import Image
-from io import BytesIO
-import tempfile
 import os
-import requests 
+import time
 from dotenv import load_dotenv
-import os
+import metrics
+from data_access import (
+    TileCache, DataVersionWatcher, make_engine, ensure_indexes, load_viewport_samples,
+    load_filter_index, load_sample, load_sample_details, bounds_from_folium,
+)
+from snapshot import Snapshot, refresh_snapshot
+from similarity import SimilarityIndex, current_index
+from image_cache import get_rendition, get_pyramid, ImageCacheError
+from image_prefetch import ImagePrefetcher
+from clustering import (
+    cluster_samples, add_clusters, is_cluster_tooltip, drill_down_zoom,
+    pad_bounds, bounds_contains,
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
-DB_USER = os.getenv("DB_USER")
-DB_PASS = os.getenv("DB_PASS")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
+# Timings and cache counters, off unless MAP_METRICS is set (see metrics.py)
+metrics.configure()
+metrics.start_run()
+run_start = time.perf_counter()
+
+# One connection pool per process, shared by every session and rerun
+# (connection settings come from the DB_* variables in .env)
+@st.cache_resource(show_spinner=False)
+def get_engine():
+    return make_engine()
+
 
-engine = create_engine(f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
+engine = get_engine()
 
 # --- TIFF Conversion Function ---
-# This function converts a TIFF file (from a local path) to a temporary JPEG file
-@st.cache_data(show_spinner=False)
-def convert_tiff_to_jpeg(tiff_url, image_id):
+# Converted JPEGs live in a persistent on-disk cache shared by all processes
+def convert_tiff_to_jpeg(tiff_url, rendition="preview"):
     """
-    Downloads a TIFF image from a remote URL, converts it to JPEG in memory,
-    and returns the path to the temporary JPEG file.
+    Returns the path of a cached JPEG rendition ("thumb" or "preview") of a
+    remote TIFF, downloading and converting it only on a cache miss.
     """
-    # 1. Download the TIFF image data
     try:
-        response = requests.get(tiff_url, timeout=10) # Set a timeout for safety
-        response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-        image_data = response.content
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error downloading TIFF from URL: {tiff_url}. Error: {e}")
+        with metrics.span("convert_tiff", rendition=rendition):
+            return get_rendition(tiff_url, rendition)
+    except ImageCacheError as e:
+        st.error(str(e))
         return None
 
+
+# --- Deep zoom viewer ---
+# Pyramids are written under ./static so Streamlit can serve the tiles
+# (needs server.enableStaticServing, see .streamlit/config.toml)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DZI_DIR = os.path.join(STATIC_DIR, "dzi")
+OSD_CDN = "https://cdn.jsdelivr.net/npm/openseadragon@4.1/build/openseadragon"
+
+
+def show_deep_zoom(tiff_url, height=600):
+    """
+    Embeds an OpenSeadragon viewer for a TIFF so only the tiles in view
+    are fetched by the browser.
+    """
     try:
-        # 2. Open the image from the in-memory binary data
-        img = Image.open(BytesIO(image_data))
-        
-        # 3. Create a temporary file path for the JPEG output
-        temp_dir = tempfile.gettempdir()
-        temp_jpeg_path = os.path.join(temp_dir, f"temp_img_{image_id}.jpeg")
+        with st.spinner("Building deep zoom tiles..."):
+            dzi_path = get_pyramid(tiff_url, DZI_DIR)
+    except ImageCacheError as e:
+        st.error(str(e))
+        return
+    tile_source = "/app/static/" + os.path.relpath(dzi_path, STATIC_DIR).replace(os.sep, "/")
+    components.html(f"""
+        <div id="osd" style="width:100%;height:{height - 10}px;background:#111"></div>
+        <script src="{OSD_CDN}/openseadragon.min.js"></script>
+        <script>
+            OpenSeadragon({{id: "osd", prefixUrl: "{OSD_CDN}/images/", tileSources: "{tile_source}"}});
+        </script>
+    """, height=height)
 
-        # 4. Convert and save as JPEG
-        img.convert('RGB').save(temp_jpeg_path, 'jpeg', quality=85)
-        
-        return temp_jpeg_path
-    
+
+def is_tiff(path):
+    return path.lower().endswith(('.tif', '.tiff'))
+
+
+# One set of fetch/decode pools per process, shared by all sessions
+@st.cache_resource(show_spinner=False)
+def get_prefetcher():
+    return ImagePrefetcher()
+
+
+def prefetch_images(batch_key, images, panel="prefetch"):
+    """
+    Starts fetching thumbnails for all TIFF images of the selected sample.
+    Work still running for a previous selection in the same panel is
+    cancelled first.
+    """
+    current = st.session_state.get(panel)
+    if current and current[0] == batch_key:
+        return current[1]
+    if current:
+        current[1].cancel()
+    batch = get_prefetcher().submit(images, lambda img: img["path"], "thumb")
+    st.session_state[panel] = (batch_key, batch)
+    return batch
+
+
+# --- Data access ---
+# Samples are fetched per viewport tile and cached across reruns and sessions.
+# Date / equipment filtering and the images and references of a sample come
+# from an in-memory index, rebuilt only when the data version changes.
+@st.cache_resource(show_spinner=False)
+def get_tile_cache():
+    try:
+        ensure_indexes(engine)
+    except Exception as e:
+        st.warning(f"Could not create spatial indexes: {e}")
+    return TileCache()
+
+
+# Everything below is cached per data version, so new or edited rows show up
+# as soon as the shared version check sees them
+@st.cache_resource(show_spinner=False)
+def get_version_watcher():
+    return DataVersionWatcher(engine)
+
+
+# With MAP_SNAPSHOT_DIR set, the catalogue comes from a memory-mapped Arrow
+# snapshot (see snapshot.py) instead of full-table queries; it is brought up
+# to date incrementally whenever the data version changes
+SNAPSHOT_DIR = os.getenv("MAP_SNAPSHOT_DIR")
+
+
+@st.cache_resource(max_entries=2, show_spinner="Loading catalogue snapshot...")
+def get_snapshot(version):
+    try:
+        refresh_snapshot(engine, SNAPSHOT_DIR)
     except Exception as e:
-        st.error(f"Error processing TIFF image data: {e}")
+        st.warning(f"Could not refresh the catalogue snapshot: {e}")
+    try:
+        return Snapshot(SNAPSHOT_DIR)
+    except FileNotFoundError:
         return None
 
 
-def load_data():
-    with engine.connect() as conn:
-        samples = pd.read_sql("""
-            SELECT 
-                id AS sample_id,
-                sample_name AS name,
-                description AS desc,
-                sample_image_url,
-                ST_Y(origin::geometry) AS lat,
-                ST_X(origin::geometry) AS lon,
-                date_collected::date AS date
-            FROM Sample
-        """, conn)
-        samples['date'] = pd.to_datetime(samples['date']).dt.date
-
-        sample_images = pd.read_sql("""
-            SELECT 
-                si.id AS image_id,
-                si.sample_id,
-                si.image_url AS path,
-                si.caption,
-                e.name AS equipment,
-                e.type AS etype,
-                si.date_obtained::date AS date
-            FROM SampleImage si
-            LEFT JOIN Equipment e ON si.equipment_id = e.id
-        """, conn)
-        sample_images['date'] = pd.to_datetime(sample_images['date']).dt.date
-
-        references = pd.read_sql("""
-            SELECT 
-                r.sample_id,
-                d.document_name AS name,
-                d.document_url AS link
-            FROM Reference r
-            JOIN Document d ON r.document_id = d.document_id
-        """, conn)
-
-    return samples, sample_images, references
-
-
-samples_df, sample_images_df, references_df = load_data()
+@st.cache_resource(max_entries=2, show_spinner="Building filter index...")
+def get_filter_index(version):
+    catalogue = get_snapshot(version) if SNAPSHOT_DIR else None
+    if catalogue is not None:
+        return catalogue.filter_index(version)
+    return load_filter_index(engine, version)
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def get_sample(sample_id, version):
+    catalogue = get_snapshot(version) if SNAPSHOT_DIR else None
+    if catalogue is not None:
+        return catalogue.sample(sample_id)
+    return load_sample(engine, sample_id)
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def get_sample_details(sample_id, version):
+    catalogue = get_snapshot(version) if SNAPSHOT_DIR else None
+    if catalogue is not None:
+        return catalogue.sample_details(sample_id)
+    return load_sample_details(engine, sample_id)
+
+
+# With MAP_SIMILARITY_DIR set, the details panel lists the most similar SEM
+# images across the catalogue (ViT embeddings, see similarity.py and
+# Src/Model/embed_images.py). Keyed by the index folder, so a new index
+# published by the embedding job is picked up on the next rerun.
+SIMILARITY_DIR = os.getenv("MAP_SIMILARITY_DIR")
+SIMILAR_IMAGES = 6
+
+
+@st.cache_resource(max_entries=2, show_spinner="Loading similarity index...")
+def get_similarity_index(folder):
+    try:
+        return SimilarityIndex.load_folder(folder)
+    except (OSError, ValueError, KeyError) as e:
+        st.warning(f"Could not load the similarity index: {e}")
+        return None
+
+
+# Prometheus text endpoint, one per process
+@st.cache_resource(show_spinner=False)
+def start_metrics_server(port):
+    try:
+        return metrics.serve(port, os.getenv("MAP_METRICS_HOST", "127.0.0.1"))
+    except OSError as e:
+        st.warning(f"Could not serve metrics on port {port}: {e}")
+        return None
+
+
+tile_cache = get_tile_cache()
+data_version = get_version_watcher().get()
+catalogue = get_snapshot(data_version) if SNAPSHOT_DIR else None
+filter_index = get_filter_index(data_version)
+similarity_folder = current_index(SIMILARITY_DIR) if SIMILARITY_DIR else None
+similarity = get_similarity_index(similarity_folder) if similarity_folder else None
+
+if metrics.ENABLED and os.getenv("MAP_METRICS_PORT"):
+    start_metrics_server(int(os.getenv("MAP_METRICS_PORT")))
 
 
 
@@ -117,10 +223,9 @@ if "selected_sample" not in st.session_state:
 # -------------------------------
 st.sidebar.header("Filters")
 
-# Correctly extract unique dates and equipment types from DataFrames
-all_dates = samples_df['date'].unique()
-min_date, max_date = samples_df['date'].min(), samples_df['date'].max()
-all_types = sorted(sample_images_df['etype'].dropna().unique())
+# Date limits and equipment types come from the filter index
+min_date, max_date = filter_index.date_bounds()
+all_types = filter_index.types
 
 if "date_range" not in st.session_state:
     st.session_state.date_range = [min_date, max_date]
@@ -144,49 +249,65 @@ st.session_state.date_range = date_range
 st.session_state.eq_type_filter = eq_type_filter
 
 # -------------------------------
-# Apply Filters (using Pandas for efficiency)
+# Apply Filters
 # -------------------------------
+australia_bounds = [[-44.0, 112.0], [-10.0, 154.0]]
+
+# Viewport reported by the map on the previous run
+if "map_bounds" not in st.session_state:
+    st.session_state.map_bounds = australia_bounds
+    st.session_state.map_center = [-27.0, 133.0]
+    st.session_state.map_zoom = 4
+    st.session_state.last_view = None
+    st.session_state.last_click = None
+
+# Draw a margin around the viewport so small pans don't need a redraw
+drawn_bounds = pad_bounds(st.session_state.map_bounds)
 
-# 1. Filter by Date
 if len(date_range) == 2:
-    start_date = date_range[0]
-    end_date = date_range[1]
-    date_filtered_samples_df = samples_df[
-        (samples_df['date'] >= start_date) & 
-        (samples_df['date'] <= end_date)
-    ]
+    start_date, end_date = date_range[0], date_range[1]
 else:
-    date_filtered_samples_df = samples_df.copy()
-
-# 2. Filter by Equipment Type
-if eq_type_filter:
-    # Get a list of sample_ids that have at least one image with the selected equipment type
-    valid_sample_ids = sample_images_df[
-        sample_images_df['etype'].isin(eq_type_filter)
-    ]['sample_id'].unique()
-    
-    # Filter the date-filtered samples by these valid IDs
-    filtered_samples_df = date_filtered_samples_df[
-        date_filtered_samples_df['sample_id'].isin(valid_sample_ids)
+    start_date, end_date = min_date, max_date
+
+with metrics.span("load_viewport"):
+    if catalogue is not None:
+        samples_df = catalogue.viewport(drawn_bounds)
+    else:
+        samples_df = load_viewport_samples(
+            engine, tile_cache, drawn_bounds, st.session_state.map_zoom, data_version
+        )
+
+# 1.+2. Filter by Date and Equipment Type with the index (binary search + bitmaps)
+with metrics.span("filter"):
+    filtered_samples_df = samples_df[
+        filter_index.mask(samples_df['sample_id'], start_date, end_date, eq_type_filter)
     ]
-else:
-    # If no equipment type filter, use the date-filtered samples
-    filtered_samples_df = date_filtered_samples_df
+    match_count = len(filter_index.sample_ids(start_date, end_date, eq_type_filter))
+st.sidebar.caption(f"{match_count:,} of {len(filter_index):,} samples match")
+
+# 3. Group nearby samples into clusters for the current zoom
+with metrics.span("cluster"):
+    clusters_df, single_samples_df = cluster_samples(
+        filtered_samples_df, st.session_state.map_zoom, drawn_bounds
+    )
 
 # Convert to list of dicts for simpler iteration in the map section
-filtered_samples = filtered_samples_df.to_dict('records')
+filtered_samples = single_samples_df.to_dict('records')
 
 
 # -------------------------------
 # Map
 # -------------------------------
-australia_bounds = [[-44.0, 112.0], [-10.0, 154.0]]
-
 m = folium.Map(tiles="Cartodb Positron")
 m.fit_bounds(australia_bounds)
 
+# Markers go in a feature group so st_folium can swap them without
+# resetting the base map (and the user's current viewport).
+markers = folium.FeatureGroup(name="Samples")
+add_clusters(markers, clusters_df)
 
-
+# Timed as one span: timing each marker would cost more than building it
+markers_start = time.perf_counter()
 for s in filtered_samples:
     # Use tooltip as a clean identifier
     folium.Marker(
@@ -194,9 +315,39 @@ for s in filtered_samples:
         tooltip=f"""
         Name: {s['name']}; SampleID: {s['sample_id']}
         """
-    ).add_to(m)
-
-map_data = st_folium(m, width=1050, height=600)
+    ).add_to(markers)
+metrics.observe("markers", time.perf_counter() - markers_start)
+metrics.count("markers_drawn", len(filtered_samples) + len(clusters_df))
+
+with metrics.span("st_folium"):
+    map_data = st_folium(
+        m, feature_group_to_add=markers,
+        center=st.session_state.map_center, zoom=st.session_state.map_zoom,
+        width=1050, height=600, key="samples_map"
+    )
+
+# Redraw when the user zoomed or panned outside the drawn margin. Only react
+# to viewports the map actually reported since the last run.
+new_bounds = bounds_from_folium(map_data.get("bounds")) if map_data else None
+view = (new_bounds, map_data.get("zoom")) if map_data else None
+if new_bounds and view != st.session_state.last_view:
+    st.session_state.last_view = view
+    new_zoom = map_data.get("zoom") or st.session_state.map_zoom
+    redraw = new_zoom != st.session_state.map_zoom or not bounds_contains(drawn_bounds, new_bounds)
+    st.session_state.map_bounds = new_bounds
+    st.session_state.map_zoom = new_zoom
+    if map_data.get("center"):
+        st.session_state.map_center = [map_data["center"]["lat"], map_data["center"]["lng"]]
+    if redraw:
+        st.rerun()
+
+# Clicking a cluster zooms in on it
+clicked = map_data.get("last_object_clicked") if map_data else None
+if clicked and clicked != st.session_state.last_click and is_cluster_tooltip(map_data.get("last_object_clicked_tooltip")):
+    st.session_state.last_click = clicked
+    st.session_state.map_center = [clicked["lat"], clicked["lng"]]
+    st.session_state.map_zoom = drill_down_zoom(st.session_state.map_zoom)
+    st.rerun()
 
 st.divider()
 
@@ -205,8 +356,12 @@ st.divider()
 # -------------------------------
 sid = None # Initialize sid
 
-if map_data and map_data.get("last_object_clicked_tooltip"):
+# After jumping to a sample from "Similar images" the map still reports the
+# marker clicked before, so that tooltip must not select it again
+if map_data and map_data.get("last_object_clicked_tooltip") and not is_cluster_tooltip(map_data["last_object_clicked_tooltip"]) \
+        and map_data["last_object_clicked_tooltip"] != st.session_state.get("jumped_from"):
     tmp_tt = map_data["last_object_clicked_tooltip"]
+    st.session_state.jumped_from = None
     # Extract the SampleID from the tooltip string
     try:
         # Find the part that contains "SampleID: X" and extract X
@@ -220,27 +375,24 @@ if map_data and map_data.get("last_object_clicked_tooltip"):
 if st.session_state.selected_sample is not None:
     sid = st.session_state.selected_sample
     
-    # Retrieve the selected sample's details
-    sample_row = samples_df[samples_df['sample_id'] == sid]
+    # Retrieve the selected sample's details; images and references are fetched for it alone
+    with metrics.span("details"):
+        sample = get_sample(sid, data_version)
+        images_df, refs_df = get_sample_details(sid, data_version)
 
-    if not sample_row.empty:
-        # Convert row to dictionary for easy access, should only be one row
-        sample = sample_row.iloc[0].to_dict() 
-        
+    if sample is not None:
 
         st.header(f"{sample['name']} (SampleID : {sample['sample_id']})")
         if sample['sample_image_url']:
-            if sample['sample_image_url'].lower().endswith(('.tif', '.tiff')):
+            display_path = sample['sample_image_url']
+            if display_path.lower().endswith(('.tif', '.tiff')):
                 # Convert TIFF to JPEG and use the temporary path
-                display_path = convert_tiff_to_jpeg(sample['sample_image_url'], f"sample_{sid}")
+                display_path = convert_tiff_to_jpeg(display_path)
             if display_path:
                 st.image(display_path, use_container_width ='auto')
         st.write(f"**Description:** {sample['desc']}")
         st.write(f"**Collected on:** {sample['date']}")
 
-        # Get images for the selected sample
-        images_df = sample_images_df[sample_images_df['sample_id'] == sid]
-
         with st.expander("**Images**"):
             if not images_df.empty:
                 eq_types = sorted(images_df['etype'].dropna().unique())
@@ -252,31 +404,80 @@ if st.session_state.selected_sample is not None:
                 else:
                     filtered_images_df = images_df
                 
-                # Iterate over the filtered images DataFrame
-                for _, img in filtered_images_df.iterrows():
-
-                    # --- TIFF HANDLING LOGIC ---
-                    if img["path"].lower().endswith(('.tif', '.tiff')):
-                        # Convert TIFF to JPEG and use the temporary path
-                        display_path = convert_tiff_to_jpeg(img["path"], img["image_id"])
-                        if display_path:
-                            st.image(
-                                display_path,
-                                caption=f"{img['caption']} (Equipment: {img['equipment']}, Type: {img['etype']}, Date: {img['date']}) - Converted from TIFF"
-                            )
+                images = filtered_images_df.to_dict('records')
+                tiff_images = [img for img in images if is_tiff(img["path"])]
+                batch = prefetch_images((sid, eq_filter), tiff_images)
+
+                # Reserve a slot per image so panels keep their order while
+                # they are filled in as each conversion finishes
+                slots = {}
+                for img in images:
+                    slot = st.empty()
+                    if is_tiff(img["path"]):
+                        slot.caption(f"Loading {img['caption']}...")
+                        slots[img["image_id"]] = slot
                     else:
                         # Display non-TIFF images directly
-                        st.image(
+                        slot.image(
                             img["path"],
                             caption=f"{img['caption']} (Equipment: {img['equipment']}, Type: {img['etype']}, Date: {img['date']})"
                         )
-                    # --- END TIFF HANDLING LOGIC ---
+
+                # --- TIFF HANDLING LOGIC ---
+                for _, img, display_path, error in batch.as_completed():
+                    with slots[img["image_id"]].container():
+                        if error:
+                            st.error(str(error))
+                            continue
+                        # List shows the thumbnail, the larger preview is on demand
+                        st.image(
+                            display_path,
+                            caption=f"{img['caption']} (Equipment: {img['equipment']}, Type: {img['etype']}, Date: {img['date']}) - Converted from TIFF"
+                        )
+                        if st.toggle("Show preview", key=f"preview_{img['image_id']}"):
+                            preview_path = convert_tiff_to_jpeg(img["path"], "preview")
+                            if preview_path:
+                                st.image(preview_path)
+                        if st.toggle("Deep zoom", key=f"dzi_{img['image_id']}"):
+                            show_deep_zoom(img["path"])
+                # --- END TIFF HANDLING LOGIC ---
             else:
                 st.write("No images available for this sample.")
 
 
-        # Get references for the selected sample
-        refs_df = references_df[references_df['sample_id'] == sid]
+        if similarity is not None and not images_df.empty:
+            with st.expander("**Similar images**"):
+                indexed = [int(i) for i in images_df["image_id"] if similarity.row(i) is not None]
+                if indexed:
+                    captions = dict(zip(images_df["image_id"].astype(int), images_df["caption"]))
+                    image_id = st.selectbox("Similar to", indexed, format_func=lambda i: captions[i],
+                                            key=f"similar_to_{sid}")
+                    similar = similarity.similar(image_id, SIMILAR_IMAGES).to_dict("records")
+                    batch = prefetch_images((sid, image_id), [img for img in similar if is_tiff(img["path"])],
+                                            panel="prefetch_similar")
+                    columns = st.columns(3)
+                    slots = {}
+                    for n, img in enumerate(similar):
+                        with columns[n % 3]:
+                            slot = st.empty()
+                            if is_tiff(img["path"]):
+                                slot.caption(f"Loading {img['caption']}...")
+                                slots[img["image_id"]] = slot
+                            else:
+                                slot.image(img["path"])
+                            st.caption(f"{img['caption']} (SampleID: {img['sample_id']}, "
+                                       f"similarity {img['similarity']:.2f})")
+                            if st.button("Show sample", key=f"similar_{sid}_{img['image_id']}"):
+                                st.session_state.selected_sample = int(img["sample_id"])
+                                st.session_state.jumped_from = map_data.get("last_object_clicked_tooltip") if map_data else None
+                                st.rerun()
+                    for _, img, display_path, error in batch.as_completed():
+                        if error:
+                            slots[img["image_id"]].error(str(error))
+                        else:
+                            slots[img["image_id"]].image(display_path)
+                else:
+                    st.write("None of this sample's images have been embedded yet.")
 
         with st.expander("**References**"):
             if not refs_df.empty:
@@ -290,4 +491,27 @@ if st.session_state.selected_sample is not None:
         st.session_state.selected_sample = None
         st.info("The selected sample is no longer visible due to the current filters.")
 else:
-    st.info("Click a marker on the map to see sample details.")
\ No newline at end of file
+    st.info("Click a marker on the map to see sample details.")
+
+
+# -------------------------------
+# Debug panel
+# -------------------------------
+# Spans of this run plus the process-wide counters; only drawn when the
+# instrumentation is on.
+if metrics.ENABLED:
+    metrics.observe("script_run", time.perf_counter() - run_start)
+    with st.sidebar.expander("Performance"):
+        spans = pd.DataFrame(
+            [(stage, seconds * 1000) for stage, seconds, _ in metrics.run_spans()],
+            columns=["stage", "ms"],
+        )
+        if not spans.empty:
+            st.dataframe(
+                spans.groupby("stage", sort=False)["ms"].agg(["count", "sum", "max"]).round(2),
+                use_container_width=True,
+            )
+        st.caption("Counters (all sessions)")
+        st.json(metrics.counters())
+        st.caption(f"Tile cache: {len(tile_cache)} tiles, {tile_cache.hits} hits, {tile_cache.misses} misses")
+        st.caption(f"Connection pool: {engine.pool.status()}")
@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -------------------------------
+# Timings and counters for the map's hot paths
+# -------------------------------
+# Off by default. When off, span() hands back one shared no-op context
+# manager and count() returns straight away, so instrumented code pays a
+# function call and a flag check. When on, every span feeds a histogram per
+# stage, spans of the current script run are kept for the debug sidebar, and
+# everything can be scraped as Prometheus text and/or appended to a JSON
+# lines log. Settings (read by configure(), after .env is loaded):
+#
+#   MAP_METRICS=1            turn the instrumentation on
+#   MAP_METRICS_PORT=9464    serve Prometheus text on http://host:port/metrics
+#   MAP_METRICS_HOST=0.0.0.0 address to serve it on (default: localhost only)
+#   MAP_METRICS_LOG=path     append one JSON line per span to path
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "map"
+
+ENABLED = False
+
+_NOOP = nullcontext()
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # stage -> [bucket counts..., count, sum]
+_local = threading.local()
+_log = None
+
+
+def configure(enabled=None, log_path=None):
+    """
+    Turns the instrumentation on or off. Arguments left as None are read
+    from MAP_METRICS / MAP_METRICS_LOG.
+    """
+    global ENABLED, _log
+    if enabled is None:
+        enabled = os.getenv("MAP_METRICS", "").lower() in ("1", "true", "yes", "on")
+    if log_path is None:
+        log_path = os.getenv("MAP_METRICS_LOG") or None
+    log_path = log_path if enabled else None
+    with _lock:
+        # map.py calls this on every rerun; keep the log open while it is unchanged
+        if (_log.name if _log is not None else None) != log_path:
+            if _log is not None:
+                _log.close()
+            _log = open(log_path, "a", buffering=1, encoding="utf-8") if log_path else None
+        ENABLED = bool(enabled)
+    return ENABLED
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+class _Span:
+    __slots__ = ("stage", "labels", "start")
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def span(stage, **labels):
+    """Times the with-block as one observation of stage. labels only go to the log and the run list."""
+    if not ENABLED:
+        return _NOOP
+    return _Span(stage, labels)
+
+
+def observe(stage, seconds, **labels):
+    if not ENABLED:
+        return
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[-2] += 1
+        hist[-1] += seconds
+        if _log is not None:
+            _log.write(json.dumps({"ts": round(time.time(), 3), "stage": stage,
+                                   "seconds": round(seconds, 6), **labels}, default=str) + "\n")
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run.append((stage, seconds, labels))
+
+
+def count(name, value=1, **labels):
+    """Adds value to the counter name{labels}."""
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+# -------------------------------
+# Per-run spans (debug sidebar)
+# -------------------------------
+# Streamlit runs each session's script on its own thread, so the spans of
+# the current run are collected thread-locally. Spans from the image
+# prefetch pools only reach the histograms and counters.
+
+def start_run():
+    """Starts collecting the spans of this script run."""
+    _local.run = [] if ENABLED else None
+
+
+def run_spans():
+    """(stage, seconds, labels) for every span of the current run so far."""
+    return list(getattr(_local, "run", None) or ())
+
+
+def counters():
+    """{"name{label=value}": value} snapshot of every counter."""
+    with _lock:
+        return {_series(name, labels): value for (name, labels), value in sorted(_counters.items())}
+
+# -------------------------------
+# Export
+# -------------------------------
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def render_prometheus():
+    """All counters and stage histograms in the Prometheus text format."""
+    with _lock:
+        counter_items = sorted(_counters.items())
+        histogram_items = sorted((stage, list(h)) for stage, h in _histograms.items())
+
+    lines = []
+    seen = set()
+    for (name, labels), value in counter_items:
+        full = f"{PREFIX}_{name}_total"
+        if full not in seen:
+            seen.add(full)
+            lines.append(f"# TYPE {full} counter")
+        lines.append(f"{_series(full, labels)} {value}")
+
+    if histogram_items:
+        full = f"{PREFIX}_stage_seconds"
+        lines.append(f"# HELP {full} Time spent in each instrumented stage.")
+        lines.append(f"# TYPE {full} histogram")
+        for stage, hist in histogram_items:
+            for bound, n in zip(BUCKETS, hist):
+                lines.append(f'{full}_bucket{{stage="{stage}",le="{bound}"}} {n}')
+            lines.append(f'{full}_bucket{{stage="{stage}",le="+Inf"}} {hist[-2]}')
+            lines.append(f'{full}_count{{stage="{stage}"}} {hist[-2]}')
+            lines.append(f'{full}_sum{{stage="{stage}"}} {hist[-1]:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # keep scrapes out of the Streamlit console
+
+
+def serve(port, host="127.0.0.1"):
+    """
+    Serves render_prometheus() at /metrics on a daemon thread (Streamlit
+    has no custom routes). Returns the server.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="map-metrics").start()
+    return server
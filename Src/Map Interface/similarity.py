@@ -0,0 +1,287 @@
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from versioned_folder import MANIFEST_NAME, current_folder, publish
+
+# -------------------------------
+# Image similarity index
+# -------------------------------
+# Nearest neighbours over the ViT embeddings that Src/Model/embed_images.py
+# computes for every SampleImage. Embeddings are stored L2-normalised as one
+# float16 matrix, so cosine similarity is a dot product.
+#
+# The approximate index is an inverted file: spherical k-means splits the
+# vectors into about sqrt(n) lists, and a query is scored against the list
+# centroids and then only against the vectors of the nprobe closest lists.
+# New images are assigned to their nearest existing centroid and appended,
+# so adding images never re-clusters or re-embeds the rest. Centroids are
+# retrained only once the index has grown RETRAIN_GROWTH times past the
+# size they were trained on (or on request). Small indexes are searched
+# exhaustively.
+#
+# Each save goes to a new index_<ns>/ folder and the CURRENT file is then
+# switched to it (versioned_folder.py), so the map never loads a half-written index. This module
+# only needs numpy and pandas, so the map can load it without TensorFlow.
+
+INDEX_FORMAT = 1
+ARRAYS = ("vectors", "image_ids", "sample_ids", "lists", "centroids")
+IMAGES_NAME = "images.csv"  # image_id, sample_id, caption, path of each row, for display
+KEEP_INDEXES = 2
+EXACT_BELOW = 4_096          # brute force while the index is this small
+DEFAULT_NPROBE = 16
+RETRAIN_GROWTH = 4
+KMEANS_ITERATIONS = 20
+KMEANS_POINTS_PER_LIST = 64  # training sample size per centroid
+ASSIGN_CHUNK = 16_384        # rows scored against the centroids at a time
+
+
+def normalise(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def default_nlist(n):
+    return max(1, int(np.sqrt(n)))
+
+
+def train_centroids(vectors, nlist, iterations=KMEANS_ITERATIONS, seed=0):
+    """Spherical k-means on a sample of vectors; returns (nlist, d) float32 unit centroids."""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    sample = vectors[np.sort(rng.choice(n, min(n, nlist * KMEANS_POINTS_PER_LIST), replace=False))]
+    sample = np.asarray(sample, dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = ~sums.any(axis=1)
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]  # reseed empty lists
+        centroids = normalise(sums)
+    return centroids
+
+
+def assign(vectors, centroids):
+    """Nearest centroid (list number) of each vector, as int32."""
+    out = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        chunk = np.asarray(vectors[start:start + ASSIGN_CHUNK], dtype=np.float32)
+        out[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return out
+
+
+class SimilarityIndex:
+    """
+    Image embeddings with an inverted-file index over them. Rows are kept in
+    insertion order; images holds the display columns of each row.
+    """
+
+    def __init__(self, vectors, image_ids, sample_ids, images=None, centroids=None, lists=None,
+                 trained_on=0, model=None):
+        self.vectors = vectors                      # float16 (n, d), unit rows
+        self.image_ids = np.asarray(image_ids, dtype=np.int64)
+        self.sample_ids = np.asarray(sample_ids, dtype=np.int64)
+        self.images = images if images is not None else pd.DataFrame({"image_id": self.image_ids})
+        self.centroids = centroids                  # float32 (nlist, d) or None
+        self.lists = lists                          # int32 (n,) or None
+        self.trained_on = trained_on
+        self.model = model
+        self._refresh()
+
+    @classmethod
+    def build(cls, vectors, image_ids, sample_ids, images=None, nlist=None, seed=0, model=None):
+        """New index over vectors (any float dtype, normalised here)."""
+        vectors = normalise(vectors).astype(np.float16)
+        index = cls(vectors, image_ids, sample_ids, images, model=model)
+        index.train(nlist, seed)
+        return index
+
+    def _refresh(self):
+        """Posting lists and the id lookup, derived from the stored arrays."""
+        self._by_id = np.argsort(self.image_ids, kind="stable")
+        self._sorted_ids = self.image_ids[self._by_id]
+        if self.lists is None or len(self.vectors) < EXACT_BELOW:
+            # Small enough to keep a float32 copy and search it all with one BLAS call
+            self._order = self._offsets = None
+            self._exact = np.asarray(self.vectors, dtype=np.float32)
+            return
+        self._exact = None
+        self._order = np.argsort(self.lists, kind="stable")
+        self._offsets = np.searchsorted(self.lists[self._order], np.arange(len(self.centroids) + 1))
+
+    def __len__(self):
+        return len(self.image_ids)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1] if self.vectors.ndim == 2 else 0
+
+    @property
+    def needs_retrain(self):
+        return len(self) >= EXACT_BELOW and (self.centroids is None or len(self) > RETRAIN_GROWTH * self.trained_on)
+
+    # ---- updates ----
+
+    def train(self, nlist=None, seed=0):
+        """(Re)clusters every vector. Only needed once, and after large growth."""
+        n = len(self)
+        if n < EXACT_BELOW:
+            self.centroids = self.lists = None
+            self.trained_on = 0
+        else:
+            with metrics.span("similarity_train"):
+                self.centroids = train_centroids(self.vectors, min(nlist or default_nlist(n), n), seed=seed)
+                self.lists = assign(self.vectors, self.centroids)
+            self.trained_on = n
+        self._refresh()
+
+    def add(self, vectors, image_ids, sample_ids, images=None):
+        """
+        Adds (or replaces, by image id) rows. New vectors join their nearest
+        existing list; nothing already indexed is touched.
+        """
+        image_ids = np.asarray(image_ids, dtype=np.int64)
+        self.remove(image_ids)
+        vectors = normalise(vectors).astype(np.float16)
+        self.vectors = np.concatenate([np.asarray(self.vectors), vectors]) if len(self) else vectors
+        self.image_ids = np.concatenate([self.image_ids, image_ids])
+        self.sample_ids = np.concatenate([self.sample_ids, np.asarray(sample_ids, dtype=np.int64)])
+        if images is None:
+            images = pd.DataFrame({"image_id": image_ids})
+        self.images = pd.concat([self.images, images], ignore_index=True)
+        if self.lists is not None:
+            self.lists = np.concatenate([self.lists, assign(vectors, self.centroids)])
+        if self.needs_retrain:
+            self.train()
+        else:
+            self._refresh()
+
+    def remove(self, image_ids):
+        """Drops the rows of image_ids (ids not in the index are ignored)."""
+        keep = ~np.isin(self.image_ids, np.asarray(image_ids, dtype=np.int64))
+        if keep.all():
+            return
+        self.vectors = np.asarray(self.vectors)[keep]
+        self.image_ids, self.sample_ids = self.image_ids[keep], self.sample_ids[keep]
+        self.images = self.images[keep].reset_index(drop=True)
+        if self.lists is not None:
+            self.lists = self.lists[keep]
+        self._refresh()
+
+    def relabel(self, catalogue):
+        """
+        Refreshes the display columns and sample ids of indexed rows from
+        catalogue (image_id plus the images columns), e.g. after an image
+        was captioned or moved to another sample. Vectors are untouched.
+        """
+        images = self.images[["image_id"]].merge(catalogue, on="image_id", how="left")
+        self.images = images
+        self.sample_ids = images["sample_id"].fillna(-1).to_numpy(np.int64)
+
+    # ---- queries ----
+
+    def row(self, image_id):
+        """Row of image_id, or None."""
+        i = int(np.searchsorted(self._sorted_ids, image_id))
+        if i >= len(self._sorted_ids) or self._sorted_ids[i] != image_id:
+            return None
+        return int(self._by_id[i])
+
+    def _candidates(self, query, nprobe):
+        if self._order is None:
+            return np.arange(len(self))
+        probe = np.argsort(self.centroids @ query)[::-1][:nprobe]
+        return np.concatenate([self._order[self._offsets[p]:self._offsets[p + 1]] for p in probe])
+
+    def search(self, query, k=10, nprobe=DEFAULT_NPROBE, exclude_samples=()):
+        """
+        The k rows most similar to query (a vector), best first, as
+        (rows, cosine similarities). Rows of samples in exclude_samples are
+        skipped.
+        """
+        query = normalise(query)
+        rows = self._candidates(query, nprobe)
+        if len(exclude_samples):
+            rows = rows[~np.isin(self.sample_ids[rows], np.asarray(exclude_samples, dtype=np.int64))]
+        if self._exact is not None:
+            scores = self._exact[rows] @ query
+        else:
+            scores = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+        top = np.argpartition(-scores, k - 1)[:k] if len(rows) > k else np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return rows[top], scores[top]
+
+    def similar(self, image_id, k=10, nprobe=DEFAULT_NPROBE, other_samples=True):
+        """
+        Images most similar to an indexed image, as a DataFrame of
+        self.images rows plus a similarity column. With other_samples, images
+        of the same sample are left out. Empty when image_id is not indexed.
+        """
+        row = self.row(image_id)
+        if row is None:
+            return self.images.iloc[:0].assign(similarity=pd.Series(dtype="float32"))
+        with metrics.span("similarity_search"):
+            exclude = [self.sample_ids[row]] if other_samples else []
+            rows, scores = self.search(self.vectors[row], k + (0 if other_samples else 1), nprobe, exclude)
+            keep = rows != row
+            rows, scores = rows[keep][:k], scores[keep][:k]
+        return self.images.iloc[rows].assign(similarity=scores).reset_index(drop=True)
+
+    # ---- storage ----
+
+    def save(self, path):
+        """Writes the index as a new folder under path and makes it the current one."""
+        with publish(path, "index", KEEP_INDEXES) as tmp:
+            for array in ARRAYS:
+                value = getattr(self, array)
+                if value is not None:
+                    np.save(os.path.join(tmp, f"{array}.npy"), np.asarray(value))
+            self.images.to_csv(os.path.join(tmp, IMAGES_NAME), index=False)
+            manifest = {
+                "format": INDEX_FORMAT,
+                "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "model": self.model,
+                "images": len(self),
+                "dim": self.dim,
+                "lists": None if self.centroids is None else len(self.centroids),
+                "trained_on": self.trained_on,
+            }
+            with open(os.path.join(tmp, MANIFEST_NAME), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+        return manifest
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """The current index under path (vectors memory-mapped by default)."""
+        folder = current_index(path)
+        if folder is None:
+            raise FileNotFoundError(f"No similarity index in {path}")
+        return cls.load_folder(folder, mmap)
+
+    @classmethod
+    def load_folder(cls, folder, mmap=True):
+        """One saved index folder (see current_index)."""
+        with open(os.path.join(folder, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+        with metrics.span("similarity_load"):
+            arrays = {}
+            for array in ARRAYS:
+                file = os.path.join(folder, f"{array}.npy")
+                arrays[array] = np.load(file, mmap_mode="r" if mmap and array == "vectors" else None) \
+                    if os.path.exists(file) else None
+            images = pd.read_csv(os.path.join(folder, IMAGES_NAME))
+            index = cls(arrays["vectors"], arrays["image_ids"], arrays["sample_ids"], images,
+                        arrays["centroids"], arrays["lists"], manifest["trained_on"], manifest["model"])
+        index.folder = folder
+        return index
+
+
+def current_index(path):
+    """Folder of the current index under path, or None when there is none."""
+    return current_folder(path)
@@ -0,0 +1,343 @@
+import datetime
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import text
+
+import metrics
+from clustering import in_bounds_mask
+from data_access import (
+    SAMPLE_COLUMNS, ALL_IMAGES_QUERY, ALL_REFERENCES_QUERY, data_version_query, read_frame,
+)
+from filter_index import FilterIndex
+from versioned_folder import MANIFEST_NAME, current_folder, publish
+
+# -------------------------------
+# Columnar catalogue snapshot
+# -------------------------------
+# The samples (with lat/lon already extracted from the PostGIS point), their
+# images joined with equipment, and their references are written to Arrow
+# IPC files. A new Streamlit process memory-maps them instead of running the
+# full-table queries, so the first render needs no large result sets. The
+# tables stay in Arrow: lookups run on the mapped columns and only the rows
+# they return are converted to pandas. Equipment names and types are
+# dictionary encoded and arrive in pandas as categoricals.
+#
+# Each export goes to a new snapshot_<ns>/ folder and the CURRENT file is
+# then switched to it in one rename (versioned_folder.py), so a process
+# never reads a half-written set. refresh_snapshot() brings a snapshot up
+# to date by fetching only the rows added (higher id) or changed (newer
+# updated_at) since it was taken, merges them into the mapped tables, and
+# falls back to a full export when rows were deleted.
+#
+#     python snapshot.py export SNAPSHOT_DIR     # full export (uses the DB_* settings in .env)
+#     python snapshot.py refresh SNAPSHOT_DIR    # incremental
+
+SNAPSHOT_FORMAT = 1
+TABLES = ("samples", "images", "references")
+KEEP_SNAPSHOTS = 2           # older snapshot folders are deleted after a refresh
+DEFAULT_COMPRESSION = None   # uncompressed files map straight into memory; "lz4" / "zstd" trade that for size
+
+SNAPSHOT_SAMPLES_SQL = """
+    SELECT
+        s.id AS sample_id,
+        s.sample_name AS name,
+        s.description AS desc,
+        s.sample_image_url,
+        ST_Y(s.origin::geometry) AS lat,
+        ST_X(s.origin::geometry) AS lon,
+        s.date_collected::date AS date
+    FROM Sample s
+"""
+
+# Arrow types of the snapshot columns; the dictionary columns become categoricals
+SCHEMAS = {
+    "samples": pa.schema([
+        ("sample_id", pa.int64()), ("name", pa.string()), ("desc", pa.string()),
+        ("sample_image_url", pa.string()), ("lat", pa.float64()), ("lon", pa.float64()),
+        ("date", pa.date32()),
+    ]),
+    "images": pa.schema([
+        ("image_id", pa.int64()), ("sample_id", pa.int64()), ("path", pa.string()),
+        ("caption", pa.string()), ("equipment", pa.dictionary(pa.int32(), pa.string())),
+        ("etype", pa.dictionary(pa.int32(), pa.string())), ("date", pa.date32()),
+    ]),
+    "references": pa.schema([
+        ("sample_id", pa.int64()), ("name", pa.string()), ("link", pa.string()),
+    ]),
+}
+ROW_KEYS = {"samples": "sample_id", "images": "image_id"}
+# Rows are stored in sample_id order, so a sample's images and references
+# are found by binary search without sorting on load
+SORT_KEYS = {"samples": ["sample_id"], "images": ["sample_id", "image_id"], "references": ["sample_id"]}
+
+
+def _jsonable(state):
+    return {k: v.isoformat() if isinstance(v, (datetime.date, datetime.datetime)) else v
+            for k, v in state.items()}
+
+
+def _to_arrow(df, schema):
+    arrays = []
+    for field in schema:
+        values = df[field.name]
+        if pa.types.is_date32(field.type):
+            values = pd.to_datetime(values).dt.date
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values.astype(object), type=pa.string(), from_pandas=True).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+# -------------------------------
+# Writing
+# -------------------------------
+
+def write_snapshot(path, frames, state, compression=DEFAULT_COMPRESSION):
+    """
+    Writes frames ({"samples": ..., "images": ..., "references": ...}, each a
+    DataFrame or an Arrow table) as a new snapshot under path and makes it
+    the current one. state is the data version row (column name -> value)
+    the frames correspond to.
+    """
+    with publish(path, "snapshot", KEEP_SNAPSHOTS) as tmp:
+        rows, high_water = {}, {}
+        for table in TABLES:
+            arrow = frames[table]
+            if not isinstance(arrow, pa.Table):
+                arrow = _to_arrow(arrow, SCHEMAS[table])
+            # One batch with one dictionary per column, as the IPC file format requires
+            arrow = arrow.sort_by([(key, "ascending") for key in SORT_KEYS[table]])
+            arrow = arrow.unify_dictionaries().combine_chunks()
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            with pa.OSFile(os.path.join(tmp, f"{table}.arrow"), "wb") as sink, \
+                    pa.ipc.new_file(sink, arrow.schema, options=options) as writer:
+                writer.write_table(arrow)
+            rows[table] = arrow.num_rows
+            if table in ROW_KEYS:
+                high_water[table] = int(pc.max(arrow[ROW_KEYS[table]]).as_py() or 0)
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "state": _jsonable(state),
+            "rows": rows,
+            "high_water": high_water,
+            "compression": compression,
+        }
+        with open(os.path.join(tmp, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def current_snapshot(path):
+    """Folder of the current snapshot under path, or None when there is none."""
+    return current_folder(path)
+
+# -------------------------------
+# Reading
+# -------------------------------
+
+def _read_tables(folder):
+    """The snapshot's tables, memory-mapped."""
+    return {
+        table: pa.ipc.open_file(pa.memory_map(os.path.join(folder, f"{table}.arrow"), "r")).read_all()
+        for table in TABLES
+    }
+
+
+def _numpy(table, name):
+    """A column as a numpy array, zero-copy from the memory map unless it has nulls."""
+    column = table.column(name)
+    array = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+    return array.to_numpy(zero_copy_only=array.null_count == 0)
+
+
+class Snapshot:
+    """
+    The current snapshot under path, memory-mapped. All three tables are
+    sorted by sample_id and stay Arrow tables (self.tables); the lookups
+    return pandas for the rows they select.
+    """
+
+    def __init__(self, path):
+        folder = current_snapshot(path)
+        if folder is None:
+            raise FileNotFoundError(f"No snapshot in {path}")
+        self.folder = folder
+        with open(os.path.join(folder, MANIFEST_NAME), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        with metrics.span("snapshot_load"):
+            self.tables = _read_tables(folder)
+        samples = self.tables["samples"]
+        self._ids = _numpy(samples, "sample_id")
+        self._image_keys = _numpy(self.tables["images"], "sample_id")
+        self._reference_keys = _numpy(self.tables["references"], "sample_id")
+        self._lat = _numpy(samples, "lat")
+        self._lon = _numpy(samples, "lon")
+
+    @property
+    def state(self):
+        return self.manifest["state"]
+
+    def __len__(self):
+        return self.tables["samples"].num_rows
+
+    def filter_index(self, version=None):
+        """A FilterIndex over the whole snapshot, without touching the database."""
+        images = self.tables["images"].select(["sample_id", "etype"])
+        images = images.filter(pc.is_valid(images["etype"]))
+        sample_types = images.to_pandas().drop_duplicates()
+        sample_types = sample_types.assign(etype=sample_types["etype"].astype(object))
+        return FilterIndex(self._ids, self.tables["samples"].column("date").to_numpy(), sample_types, version)
+
+    def viewport(self, bounds):
+        """Samples inside [[south, west], [north, east]], like load_viewport_samples."""
+        rows = np.flatnonzero(in_bounds_mask(self._lat, self._lon, bounds))
+        return self.tables["samples"].take(rows).to_pandas()
+
+    def sample(self, sample_id):
+        """One sample as a dict (like load_sample), or None."""
+        i = int(np.searchsorted(self._ids, sample_id))
+        if i >= len(self._ids) or self._ids[i] != sample_id:
+            return None
+        return self.tables["samples"].slice(i, 1).select(SAMPLE_COLUMNS).to_pylist()[0]
+
+    def sample_details(self, sample_id):
+        """The sample's (images, references), like load_sample_details."""
+        return (_rows_for(self.tables["images"], self._image_keys, sample_id),
+                _rows_for(self.tables["references"], self._reference_keys, sample_id))
+
+
+def _rows_for(table, keys, sample_id):
+    lo = np.searchsorted(keys, sample_id, side="left")
+    hi = np.searchsorted(keys, sample_id, side="right")
+    return table.slice(lo, hi - lo).to_pandas()
+
+# -------------------------------
+# Export and incremental refresh
+# -------------------------------
+
+def _read_state(conn, engine):
+    return conn.execute(data_version_query(engine)).one()._asdict()
+
+
+def _delta_query(sql, id_column, updated_column, since):
+    where = f" WHERE {id_column} > :max_id"
+    if since is not None:
+        where += f" OR {updated_column} > :since"
+    return text(sql + where)
+
+
+def _fix_dates(df):
+    if "date" in df:
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+    return df
+
+
+def export_snapshot(engine, path, compression=DEFAULT_COMPRESSION):
+    """Full export of the catalogue into a new snapshot under path. Returns the manifest."""
+    with metrics.span("snapshot_export"), engine.connect() as conn:
+        state = _read_state(conn, engine)
+        frames = {
+            "samples": _fix_dates(read_frame(conn, text(SNAPSHOT_SAMPLES_SQL))),
+            "images": _fix_dates(read_frame(conn, ALL_IMAGES_QUERY)),
+            "references": read_frame(conn, ALL_REFERENCES_QUERY),
+        }
+    return write_snapshot(path, frames, state, compression)
+
+
+def merge_rows(old, delta, key):
+    """The Arrow table old with the rows of delta added, replacing rows with the same key."""
+    if not delta.num_rows:
+        return old
+    kept = old.filter(pc.invert(pc.is_in(old[key], value_set=delta[key].combine_chunks())))
+    return pa.concat_tables([kept, delta])
+
+
+def refresh_snapshot(engine, path, compression=DEFAULT_COMPRESSION):
+    """
+    Brings the snapshot under path up to date. New and updated samples and
+    images are fetched by id / updated_at, references are re-read only when
+    they changed. Returns "current", "incremental" or "full".
+    """
+    folder = current_snapshot(path)
+    if folder is None:
+        export_snapshot(engine, path, compression)
+        return "full"
+    with open(os.path.join(folder, MANIFEST_NAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+    old_state = manifest["state"]
+
+    with engine.connect() as conn:
+        state = _read_state(conn, engine)
+        new_state = _jsonable(state)
+        if new_state == old_state:
+            return "current"
+        # Equipment and documents are joined into the image and reference rows;
+        # when they change every row may be affected
+        if any(new_state.get(k) != old_state.get(k) for k in ("equipment", "equipment_updated", "document_updated")):
+            export_snapshot(engine, path, compression)
+            return "full"
+
+        with metrics.span("snapshot_refresh"):
+            old = _read_tables(folder)
+            high = manifest["high_water"]
+            samples = read_frame(conn, _delta_query(
+                SNAPSHOT_SAMPLES_SQL, "s.id", "s.updated_at", old_state.get("sample_updated")),
+                params={"max_id": high["samples"], "since": old_state.get("sample_updated")})
+            images = read_frame(conn, _delta_query(
+                ALL_IMAGES_QUERY.text, "si.id", "si.updated_at", old_state.get("sampleimage_updated")),
+                params={"max_id": high["images"], "since": old_state.get("sampleimage_updated")})
+            references = old["references"]
+            if any(new_state.get(k) != old_state.get(k) for k in ("refs", "reference_updated")):
+                references = read_frame(conn, ALL_REFERENCES_QUERY)
+
+    frames = {
+        "samples": merge_rows(old["samples"], _to_arrow(_fix_dates(samples), SCHEMAS["samples"]), "sample_id"),
+        "images": merge_rows(old["images"], _to_arrow(_fix_dates(images), SCHEMAS["images"]), "image_id"),
+        "references": references,
+    }
+    # Rows deleted since the snapshot can't be seen in a delta; the counts give them away
+    if frames["samples"].num_rows != state["samples"] or frames["images"].num_rows != state["images"]:
+        export_snapshot(engine, path, compression)
+        return "full"
+    write_snapshot(path, frames, state, compression)
+    return "incremental"
+
+# -------------------------------
+# Main
+# -------------------------------
+
+def main(argv=None):
+    import argparse
+    from dotenv import load_dotenv
+    from data_access import make_engine
+
+    parser = argparse.ArgumentParser(description="Export or refresh the map's columnar catalogue snapshot.")
+    parser.add_argument("command", choices=("export", "refresh"))
+    parser.add_argument("path", help="snapshot folder (MAP_SNAPSHOT_DIR)")
+    parser.add_argument("--compression", choices=("lz4", "zstd"), default=DEFAULT_COMPRESSION)
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    engine = make_engine()
+    start = time.perf_counter()
+    if args.command == "export":
+        export_snapshot(engine, args.path, args.compression)
+        result = "full"
+    else:
+        result = refresh_snapshot(engine, args.path, args.compression)
+    snap = Snapshot(args.path)
+    print(f"✅ {result} snapshot: {len(snap):,} samples, {snap.tables['images'].num_rows:,} images, "
+          f"{snap.tables['references'].num_rows:,} references in {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import math
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Common"))
+from tiff_bands import image_size, iter_bands  # noqa: E402
+
+# -------------------------------
+# Streaming, strip/tile-wise TIFF decoding
+# -------------------------------
+# Large-area SEM maps can be several hundred megapixels. Instead of decoding
+# the whole image into memory (and converting it to RGB on top), the TIFF is
+# read one strip/tile band at a time with tifffile (Common/tiff_bands.py),
+# converted to 8-bit and reduced on the fly. Peak memory is a few bands plus
+# the (small) output, whatever the size of the source image.
+
+DZI_TILE_SIZE = 256
+DZI_FORMAT = "jpeg"
+DZI_QUALITY = 85
+
+
+class _RowReducer:
+    """Box-filters a stream of full-width row blocks by an integer factor."""
+
+    def __init__(self, width, factor):
+        self.factor = factor
+        self.width = (width // factor) * factor
+        self._buffer = None
+        self.rows = []
+
+    def push(self, block):
+        if self._buffer is not None:
+            block = np.concatenate([self._buffer, block], axis=0)
+        usable = (block.shape[0] // self.factor) * self.factor
+        if usable:
+            self.rows.append(self._reduce(block[:usable]))
+        self._buffer = block[usable:] if usable < block.shape[0] else None
+
+    def _reduce(self, block):
+        f = self.factor
+        block = block[:, : self.width].astype(np.uint32)
+        h, w = block.shape[0] // f, self.width // f
+        return (block.reshape(h, f, w, f, 3).sum(axis=(1, 3)) // (f * f)).astype(np.uint8)
+
+    def result(self):
+        return np.concatenate(self.rows, axis=0) if self.rows else None
+
+
+def stream_downsample(path, max_side):
+    """
+    Returns an RGB PIL image of the TIFF at path whose longest side is at
+    most max_side, without holding the full-resolution image in memory.
+    """
+    width, height = image_size(path)
+    # Never more than the short side, or a thin strip would reduce to no rows
+    factor = max(1, min(max(width, height) // max_side, width, height))
+    reducer = _RowReducer(width, factor)
+    for _, band in iter_bands(path):
+        reducer.push(band)
+    img = Image.fromarray(reducer.result(), "RGB")
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+    return img
+
+
+# -------------------------------
+# Deep-zoom (DZI) pyramid
+# -------------------------------
+
+class _LevelWriter:
+    """
+    Receives the rows of one pyramid level in order, writes them out as
+    tiles and forwards a 2x reduced copy to the next (coarser) level.
+    """
+
+    def __init__(self, level, width, height, tiles_dir, tile_size, next_level):
+        self.level = level
+        self.width, self.height = width, height
+        self.dir = os.path.join(tiles_dir, str(level))
+        os.makedirs(self.dir, exist_ok=True)
+        self.tile_size = tile_size
+        self.next = next_level
+        self._rows = None
+        self._tile_row = 0
+        self._pair = None  # odd row waiting for its partner in the 2x reduction
+
+    def push(self, block):
+        self._rows = block if self._rows is None else np.concatenate([self._rows, block], axis=0)
+        while self._rows.shape[0] >= self.tile_size:
+            self._write_tiles(self._rows[: self.tile_size])
+            self._rows = self._rows[self.tile_size:]
+        if self.next is not None:
+            self._forward(block)
+
+    def _write_tiles(self, rows):
+        for col, x in enumerate(range(0, self.width, self.tile_size)):
+            tile = Image.fromarray(np.ascontiguousarray(rows[:, x:x + self.tile_size]), "RGB")
+            tile.save(os.path.join(self.dir, f"{col}_{self._tile_row}.{DZI_FORMAT}"), quality=DZI_QUALITY)
+        self._tile_row += 1
+
+    def _forward(self, block):
+        if self._pair is not None:
+            block = np.concatenate([self._pair, block], axis=0)
+            self._pair = None
+        if block.shape[0] % 2:
+            self._pair, block = block[-1:], block[:-1]
+        if block.shape[0]:
+            self.next.push(_halve(block))
+
+    def close(self):
+        if self._rows is not None and self._rows.shape[0]:
+            self._write_tiles(self._rows)
+        if self.next is not None:
+            if self._pair is not None:
+                self.next.push(_halve(np.concatenate([self._pair, self._pair], axis=0)))
+            self.next.close()
+
+
+def _halve(block):
+    """2x2 box reduction; an odd last column is averaged with itself."""
+    if block.shape[1] % 2:
+        block = np.concatenate([block, block[:, -1:]], axis=1)
+    h, w = block.shape[0] // 2, block.shape[1] // 2
+    return (block.astype(np.uint16).reshape(h, 2, w, 2, 3).sum(axis=(1, 3)) // 4).astype(np.uint8)
+
+
+def build_dzi(path, out_dir, name="image", tile_size=DZI_TILE_SIZE):
+    """
+    Streams the TIFF at path into a Deep Zoom pyramid:
+    out_dir/name.dzi plus out_dir/name_files/<level>/<col>_<row>.jpeg.
+    Returns the path of the .dzi descriptor.
+    """
+    width, height = image_size(path)
+    tiles_dir = os.path.join(out_dir, f"{name}_files")
+    max_level = math.ceil(math.log2(max(width, height))) if max(width, height) > 1 else 0
+
+    # Chain the writers from level 0 (1x1) up to full resolution
+    writer = None
+    for level in range(max_level + 1):
+        scale = 2 ** (max_level - level)
+        writer = _LevelWriter(
+            level, math.ceil(width / scale), math.ceil(height / scale),
+            tiles_dir, tile_size, writer,
+        )
+
+    for _, band in iter_bands(path):
+        writer.push(band)
+    writer.close()
+
+    dzi_path = os.path.join(out_dir, f"{name}.dzi")
+    with open(dzi_path, "w", encoding="utf-8") as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{tile_size}" '
+            f'Overlap="0" Format="{DZI_FORMAT}"><Size Width="{width}" Height="{height}"/></Image>\n'
+        )
+    return dzi_path
@@ -0,0 +1,54 @@
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+# -------------------------------
+# Versioned folders behind a CURRENT pointer
+# -------------------------------
+# Used by the catalogue snapshot and the similarity index. A writer fills a
+# new <prefix>_<ns>/ folder, then the CURRENT file is switched to it in one
+# rename, so a reader never opens a half-written set. Each folder holds a
+# manifest.json, written last; only the newest few folders are kept.
+
+CURRENT_NAME = "CURRENT"
+MANIFEST_NAME = "manifest.json"
+
+
+@contextmanager
+def publish(path, prefix, keep=2):
+    """
+    Yields an empty temporary folder under path to write into. When the block
+    succeeds the folder becomes <prefix>_<ns>/, CURRENT points at it and all
+    but the newest keep <prefix>_ folders are deleted. When it fails the
+    folder is removed and CURRENT is left alone.
+    """
+    os.makedirs(path, exist_ok=True)
+    name = f"{prefix}_{time.time_ns()}"
+    tmp = os.path.join(path, name + ".tmp")
+    os.makedirs(tmp)
+    try:
+        yield tmp
+        os.replace(tmp, os.path.join(path, name))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    # Switch readers over in one step, then drop folders nobody will open again
+    pointer = os.path.join(path, CURRENT_NAME + ".tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(path, CURRENT_NAME))
+    old = sorted(d for d in os.listdir(path) if d.startswith(prefix + "_") and not d.endswith(".tmp"))
+    for d in old[:-keep]:
+        shutil.rmtree(os.path.join(path, d), ignore_errors=True)
+
+
+def current_folder(path):
+    """The folder CURRENT under path points at, or None when there is none."""
+    try:
+        with open(os.path.join(path, CURRENT_NAME), encoding="utf-8") as f:
+            folder = os.path.join(path, f.read().strip())
+    except OSError:
+        return None
+    return folder if os.path.isfile(os.path.join(folder, MANIFEST_NAME)) else None
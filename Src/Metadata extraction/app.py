@@ -1,108 +1,25 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
-from PIL import Image
 from pathlib import Path
-import xml.etree.ElementTree as ET
-import json, re, os, datetime
-from sem_meta import SEMMeta
-import fitz  # PyMuPDF
-import pandas as pd
+import json, os, datetime
+from jobs import JobManager, image_job, sidecar_job, pdf_job, QUEUED, RUNNING, DONE, FAILED, CANCELLED, FINISHED
 
 # ------------------ Helper Functions ------------------
 
-image_path = ""
-image_path2 = ""
-meta_path2 = ""
-pdf_path = ""
+image_paths = []
+image_paths2 = []
+meta_paths2 = []
+pdf_paths = []
 output_folder = ""
 
-def strip_ns_key(key): return key.split('}')[-1] if '}' in key else key
-
-def xml_to_dict(elem):
-    children = list(elem)
-    if not children:
-        t = elem.text.strip() if elem.text and elem.text.strip() else None
-        return t
-    r = {}
-    for c in children:
-        d = xml_to_dict(c)
-        t = strip_ns_key(c.tag)
-        if t in r:
-            if not isinstance(r[t], list): r[t] = [r[t]]
-            r[t].append(d)
-        else:
-            r[t] = d
-    return r
-
-def strip_ns(d):
-    if isinstance(d, dict):  return {strip_ns_key(k): strip_ns(v) for k,v in d.items()}
-    if isinstance(d, list):  return [strip_ns(i) for i in d]
-    return d
-
-def parse_value(v):
-    if v is None: return None
-    if isinstance(v,(tuple,list)): return [parse_value(i) for i in v]
-    if isinstance(v,bytes):
-        try: v=v.decode("utf-8",errors="ignore")
-        except: return None
-    if isinstance(v,str):
-        try:
-            r=ET.fromstring(v)
-            return {strip_ns_key(r.tag):xml_to_dict(r)}
-        except ET.ParseError: pass
-        if "=" in v:
-            kv={}
-            for line in v.splitlines():
-                if "=" in line:
-                    k,val=line.split("=",1)
-                    kv[k.strip()]=val.strip()
-            if kv: return {"plain":kv}
-    try: json.dumps(v); return v
-    except: return None
-
-def convert_meta_to_json(meta):
-    c={}
-    for k,v in meta.items():
-        try: c[str(k)]=strip_ns(parse_value(v))
-        except: c[str(k)]=None
-    return c
-
-def parse_jeol_metadata(meta_path):
-    d={}
-    try:
-        with open(meta_path,"r",encoding="utf-8",errors="ignore") as f:
-            for line in f:
-                line=line.strip()
-                if line.startswith("$"):
-                    m=re.match(r"^\$+([A-Z0-9_%]+)\s*(.*)$",line)
-                    if m: k,v=m.groups(); d[k.strip()]=v.strip()
-    except Exception as e:
-        d={"Error":f"Failed to parse metadata: {e}"}
-    return d
-
-# ------------------ SEM Extraction ------------------
-
-def extract_from_image(image_path):
-    with Image.open(image_path) as im:
-        meta,_=SEMMeta.ImageMetadata(im)
-        return {"image":Path(image_path).name,"metadata":convert_meta_to_json(meta)}
-
-def extract_from_image_and_text(image_path,meta_path):
-    m=parse_jeol_metadata(meta_path)
-    b=Path(image_path).stem
-    mach=m.get("CM_INSTRUMENT","Unknown").strip()
-    date=m.get("CM_DATE","Unknown").replace("/","-")
-    u=f"{b}_{mach}_{date}"
-    return {"id":b,"image_file":f"{u}.tif","metadata_file":f"{u}.txt",
-            "machine":mach,"date_taken":date,"metadata":m}
-
-def save_json(output_box, image_path):
-    text=output_box.get(1.0,tk.END).strip()
-    if not text: return messagebox.showwarning("No Data","Nothing to save.")
-    try: data=json.loads(text)
-    except: return messagebox.showerror("Error","Invalid JSON.")
-    base=Path(image_path).stem+"_metadata.json" if image_path else "metadata.json"
-    init_dir=str(Path(image_path).parent) if image_path else os.getcwd()
+IMAGE_TYPES = [("SEM Images", "*.tif *.tiff *.bmp *.jpg *.jpeg *.png")]
+
+def save_json(results, image_paths):
+    if not results: return messagebox.showwarning("No Data","Nothing to save.")
+    data=results[0] if len(results)==1 else results
+    first=image_paths[0] if image_paths else ""
+    base=Path(first).stem+"_metadata.json" if len(results)==1 and first else "metadata.json"
+    init_dir=str(Path(first).parent) if first else os.getcwd()
     path=filedialog.asksaveasfilename(defaultextension=".json",
         filetypes=[("JSON","*.json")],initialfile=base,initialdir=init_dir)
     if not path: return
@@ -112,71 +29,116 @@ def save_json(output_box, image_path):
     except Exception as e:
         messagebox.showerror("Error",f"Failed to save:\n{e}")
 
-def clear_all(entries,box):
+def set_entry(entry, paths):
+    entry.config(state="normal"); entry.delete(0, tk.END)
+    entry.insert(0, paths[0] if len(paths)==1 else f"{len(paths)} selected: " + "; ".join(Path(p).name for p in paths))
+    entry.config(state="readonly")
+
+def clear_all(entries, tab, selections):
     for e in entries:
         e.config(state="normal"); e.delete(0,tk.END); e.config(state="readonly")
-    box.delete(1.0,tk.END)
+    for selection in selections:
+        selection.clear()
+    tab_logs[tab].clear(); tab_results[tab].clear()
+    output_box.delete(1.0,tk.END)
+
+def pair_sidecars(images, metas):
+    """Pairs images with metadata files of the same name; a single image and file always pair."""
+    if len(images)==1 and len(metas)==1: return [(images[0], metas[0])], []
+    by_stem={Path(m).stem.lower(): m for m in metas}
+    pairs=[(i, by_stem[Path(i).stem.lower()]) for i in images if Path(i).stem.lower() in by_stem]
+    return pairs, [i for i in images if Path(i).stem.lower() not in by_stem]
+
+# ------------------ Background Jobs ------------------
+# Extraction runs on JobManager worker threads (images and PDFs in child
+# processes). The GUI only drains the job messages every 100 ms, so the
+# window stays responsive while whole folders are queued.
+
+jobs = JobManager()
+tab_logs = {}     # tab -> text shown in the output box for that tab
+tab_results = {}  # tab -> extracted metadata dicts, for Save JSON
+
+STATE_LABELS = {QUEUED: "⏳ queued", RUNNING: "▶ running", DONE: "✅ done", FAILED: "❌ failed", CANCELLED: "⏹ cancelled"}
+
+def current_tab():
+    return root.nametowidget(notebook.select())
+
+def show(tab, text):
+    """Appends text to a tab's log, and to the output box if that tab is open."""
+    tab_logs[tab].append(text)
+    if current_tab() is tab:
+        output_box.insert(tk.END, text); output_box.see(tk.END)
+
+def job_row(job, status=None, progress=None):
+    iid=str(job.id)
+    if not job_list.exists(iid):
+        job_list.insert("", tk.END, iid=iid, values=(job.title, STATE_LABELS[job.state], ""))
+    if status is not None: job_list.set(iid, "status", status)
+    if progress is not None: job_list.set(iid, "progress", progress)
+
+def handle_state(job, msg, tab):
+    job_row(job, status=STATE_LABELS[msg["state"]])
+    if msg["state"]==FAILED: show(tab, f"❌ {job.title} failed: {msg['error']}\n")
+    elif msg["state"]==CANCELLED: show(tab, f"⏹ {job.title} cancelled\n")
+
+def metadata_handler(tab):
+    """Shows each image's metadata in the tab's output as soon as it arrives."""
+    def handle(job, msg):
+        if "state" in msg: return handle_state(job, msg, tab)
+        job_row(job, progress=f"{msg['processed']}/{msg['total']} images")
+        if msg.get("unchanged"): return
+        if msg.get("error"):
+            return show(tab, f"❌ {Path(msg['path']).name}: {msg['error']}\n")
+        tab_results[tab].append(msg["result"])
+        show(tab, f"── {Path(msg['path']).name} ──\n{json.dumps(msg['result'], indent=2)}\n")
+    return handle
+
+def pdf_handler(tab, pdf_path, full_output_path):
+    def handle(job, msg):
+        if "state" in msg:
+            if msg["state"]==RUNNING: show(tab, f"⏳ Extracting images from {Path(pdf_path).name}...\n")
+            return handle_state(job, msg, tab)
+        if msg.get("done"):
+            show(tab, f"✅ {Path(pdf_path).name}: extracted {msg['images']} images "
+                      f"({msg['unique']} unique, {msg['duplicates']} duplicates)\n")
+            show(tab, f"📁 Saved in: {full_output_path}\n")
+            return show(tab, f"🧾 Metadata: {msg['metadata_path']}\n")
+        job_row(job, progress=f"{msg['pages_done']}/{msg['pages']} pages, {msg['images']} images")
+    return handle
+
+def poll_jobs():
+    """Runs on the Tk main thread every 100 ms."""
+    jobs.dispatch()
+    root.after(100, poll_jobs)
+
+def cancel_selected():
+    for iid in job_list.selection():
+        job=next((j for j in jobs.jobs if str(j.id)==iid), None)
+        if job is not None and job.state not in FINISHED: job.cancel()
+
+def on_close():
+    if jobs.active() and not messagebox.askokcancel("Quit", "Jobs are still running. Cancel them and quit?"):
+        return
+    jobs.shutdown()
+    root.destroy()
 
 # ------------------ PDF Extraction ------------------
 
-def extract_images_from_pdf(pdf_path, output_folder, output_box):
-    """Extract all images and metadata from PDF into auto-created subfolder."""
-    if not pdf_path:
+def extract_images_from_pdf(pdf_paths, output_folder):
+    """Queues one background job per PDF, each into its own auto-created subfolder."""
+    if not pdf_paths:
         return messagebox.showerror("Error", "Please select a PDF file first.")
     if not output_folder:
         return messagebox.showerror("Error", "Please select a base output folder.")
 
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    full_output_path = os.path.join(output_folder, f"Extracted_Images_{timestamp}")
-    os.makedirs(full_output_path, exist_ok=True)
-
-    try:
-        doc = fitz.open(pdf_path)
-        metadata_list = []
-
-        for page_index in range(len(doc)):
-            page = doc[page_index]
-            for img_index, img in enumerate(page.get_images(full=True)):
-                xref = img[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                width = base_image["width"]
-                height = base_image["height"]
-                colorspace = base_image["colorspace"]
-                bpc = base_image["bpc"]
-
-                image_filename = f"page{page_index+1}_img{img_index+1}.{image_ext}"
-                image_path = os.path.join(full_output_path, image_filename)
-
-                with open(image_path, "wb") as f:
-                    f.write(image_bytes)
-
-                metadata_list.append({
-                    "Page": page_index + 1,
-                    "Image Number": img_index + 1,
-                    "Filename": image_filename,
-                    "Width (px)": width,
-                    "Height (px)": height,
-                    "Extension": image_ext,
-                    "Color Space": colorspace,
-                    "Bits per Component": bpc,
-                    "File Path": image_path
-                })
-
-        df = pd.DataFrame(metadata_list)
-        excel_path = os.path.join(full_output_path, "image_metadata.xlsx")
-        df.to_excel(excel_path, index=False)
-
-        output_box.delete(1.0, tk.END)
-        output_box.insert(tk.END, f"✅ Extracted {len(metadata_list)} images\n")
-        output_box.insert(tk.END, f"📁 Saved in: {full_output_path}\n")
-        output_box.insert(tk.END, f"🧾 Metadata Excel: {excel_path}\n")
-
-        messagebox.showinfo("Success", f"Extracted {len(metadata_list)} images.\nSaved to:\n{full_output_path}")
-
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to extract images:\n{e}")
+    for pdf_path in pdf_paths:
+        name = f"Extracted_Images_{timestamp}" if len(pdf_paths) == 1 else f"Extracted_Images_{timestamp}_{Path(pdf_path).stem}"
+        full_output_path = os.path.join(output_folder, name)
+        os.makedirs(full_output_path, exist_ok=True)
+        job = jobs.submit(f"PDF: {Path(pdf_path).name}", pdf_job(pdf_path, full_output_path),
+                          pdf_handler(tab3, pdf_path, full_output_path))
+        job_row(job)
 
 # ------------------ GUI Layout ------------------
 
@@ -185,6 +147,7 @@ root.title("SEM + PDF Metadata Extractor")
 root.geometry("1080x820")
 root.configure(bg="#EAF0FB")
 style = ttk.Style(); style.theme_use("clam")
+root.protocol("WM_DELETE_WINDOW", on_close)
 
 header = tk.Frame(root, bg="#4A90E2", height=70)
 header.pack(fill="x")
@@ -203,77 +166,100 @@ notebook.add(tab1, text="🖼 Image Only")
 notebook.add(tab2, text="🧾 Image + Metadata File")
 notebook.add(tab3, text="📘 PDF Image Extractor")
 
+# Job list
+jobs_frame = tk.Frame(root, bg="#EAF0FB")
+jobs_frame.pack(padx=20, fill="x")
+job_list = ttk.Treeview(jobs_frame, columns=("job", "status", "progress"), show="headings", height=4)
+for col, width in (("job", 520), ("status", 130), ("progress", 260)):
+    job_list.heading(col, text=col.title()); job_list.column(col, width=width, anchor="w")
+job_list.pack(side="left", fill="x", expand=True)
+job_buttons = tk.Frame(jobs_frame, bg="#EAF0FB")
+job_buttons.pack(side="left", padx=10)
+ttk.Button(job_buttons, text="Cancel Selected", command=cancel_selected).pack(fill="x", pady=2)
+ttk.Button(job_buttons, text="Cancel All", command=jobs.cancel_all).pack(fill="x", pady=2)
+
 # Shared Output
 output_box = scrolledtext.ScrolledText(root, wrap=tk.WORD, width=120, height=25,
     bg="#1E1E1E", fg="#00FF7F", insertbackground="white", relief="solid", bd=2,
     font=("Consolas", 11))
 output_box.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
 
-# Clear output when tab changes
+for tab in (tab1, tab2, tab3):
+    tab_logs[tab] = []; tab_results[tab] = []
+
+# Show the selected tab's own output when tabs change
 def on_tab_change(event):
     output_box.delete(1.0, tk.END)
+    output_box.insert(tk.END, "".join(tab_logs[current_tab()])); output_box.see(tk.END)
 notebook.bind("<<NotebookTabChanged>>", on_tab_change)
 
 # ------------------ Tab 1: Image Only ------------------
 
-tk.Label(tab1, text="Select SEM Image:", bg="#EAF0FB", font=("Helvetica", 12, "bold")).grid(row=0, column=0, padx=10, sticky="e")
+tk.Label(tab1, text="Select SEM Images:", bg="#EAF0FB", font=("Helvetica", 12, "bold")).grid(row=0, column=0, padx=10, sticky="e")
 entry_img1 = tk.Entry(tab1, width=70, font=("Arial", 11), bg="#FFF8DC", relief="solid", bd=1, state="readonly")
 entry_img1.grid(row=0, column=1, padx=10)
 
 def browse_img1():
-    global image_path
-    image_path = filedialog.askopenfilename(title="Select SEM Image",
-        filetypes=[("SEM Images", "*.tif *.tiff *.bmp *.jpg *.jpeg *.png")])
-    if image_path:
-        entry_img1.config(state="normal"); entry_img1.delete(0, tk.END)
-        entry_img1.insert(0, image_path); entry_img1.config(state="readonly")
+    paths = filedialog.askopenfilenames(title="Select SEM Images", filetypes=IMAGE_TYPES)
+    if paths:
+        image_paths[:] = paths; set_entry(entry_img1, image_paths)
+
+def browse_folder1():
+    folder = filedialog.askdirectory(title="Select Folder of SEM Images")
+    if folder:
+        image_paths[:] = [folder]; set_entry(entry_img1, image_paths)
+
+def extract_images1():
+    if not image_paths: return messagebox.showerror("Error","Select an image first.")
+    title = f"Images: {Path(image_paths[0]).name}" + (f" (+{len(image_paths)-1})" if len(image_paths) > 1 else "")
+    job_row(jobs.submit(title, image_job(list(image_paths)), metadata_handler(tab1)))
 
 tk.Button(tab1, text="📂 Browse", command=browse_img1, bg="#AED6F1", font=("Helvetica", 10, "bold")).grid(row=0, column=2, padx=5)
+tk.Button(tab1, text="📁 Folder", command=browse_folder1, bg="#F5B7B1", font=("Helvetica", 10, "bold")).grid(row=0, column=3, padx=5)
 
-ttk.Button(tab1, text="Extract & Show", command=lambda: (
-    output_box.delete(1.0, tk.END),
-    output_box.insert(tk.END, json.dumps(extract_from_image(image_path), indent=2)) if image_path else messagebox.showerror("Error","Select an image first.")
-)).grid(row=1, column=0, padx=10, pady=10)
-ttk.Button(tab1, text="Save JSON", command=lambda: save_json(output_box, image_path)).grid(row=1, column=1, padx=10)
-ttk.Button(tab1, text="Clear", command=lambda: clear_all([entry_img1], output_box)).grid(row=1, column=2, padx=10)
+ttk.Button(tab1, text="Extract & Show", command=extract_images1).grid(row=1, column=0, padx=10, pady=10)
+ttk.Button(tab1, text="Save JSON", command=lambda: save_json(tab_results[tab1], image_paths)).grid(row=1, column=1, padx=10)
+ttk.Button(tab1, text="Clear", command=lambda: clear_all([entry_img1], tab1, [image_paths])).grid(row=1, column=2, padx=10)
 
 # ------------------ Tab 2: Image + Metadata ------------------
 
-tk.Label(tab2, text="Select SEM Image:", bg="#EAF0FB", font=("Helvetica", 12, "bold")).grid(row=0, column=0, padx=10, sticky="e")
+tk.Label(tab2, text="Select SEM Images:", bg="#EAF0FB", font=("Helvetica", 12, "bold")).grid(row=0, column=0, padx=10, sticky="e")
 entry_img2 = tk.Entry(tab2, width=70, font=("Arial", 11), bg="#FFF8DC", relief="solid", bd=1, state="readonly")
 entry_img2.grid(row=0, column=1, padx=10)
 
-tk.Label(tab2, text="Select Metadata File:", bg="#EAF0FB", font=("Helvetica", 12, "bold")).grid(row=1, column=0, padx=10, sticky="e")
+tk.Label(tab2, text="Select Metadata Files:", bg="#EAF0FB", font=("Helvetica", 12, "bold")).grid(row=1, column=0, padx=10, sticky="e")
 entry_meta2 = tk.Entry(tab2, width=70, font=("Arial", 11), bg="#FDEBD0", relief="solid", bd=1, state="readonly")
 entry_meta2.grid(row=1, column=1, padx=10)
 
 def browse_img2():
-    global image_path2
-    image_path2 = filedialog.askopenfilename(title="Select SEM Image", filetypes=[("SEM Images", "*.tif *.tiff *.bmp *.jpg *.jpeg *.png")])
-    if image_path2:
-        entry_img2.config(state="normal"); entry_img2.delete(0, tk.END)
-        entry_img2.insert(0, image_path2); entry_img2.config(state="readonly")
+    paths = filedialog.askopenfilenames(title="Select SEM Images", filetypes=IMAGE_TYPES)
+    if paths:
+        image_paths2[:] = paths; set_entry(entry_img2, image_paths2)
 
 def browse_meta2():
-    global meta_path2
-    meta_path2 = filedialog.askopenfilename(title="Select Metadata File", filetypes=[("Text files", "*.txt")])
-    if meta_path2:
-        entry_meta2.config(state="normal"); entry_meta2.delete(0, tk.END)
-        entry_meta2.insert(0, meta_path2); entry_meta2.config(state="readonly")
+    paths = filedialog.askopenfilenames(title="Select Metadata Files", filetypes=[("Text files", "*.txt")])
+    if paths:
+        meta_paths2[:] = paths; set_entry(entry_meta2, meta_paths2)
+
+def extract_images2():
+    if not (image_paths2 and meta_paths2): return messagebox.showerror("Error","Select both image and metadata file.")
+    pairs, unpaired = pair_sidecars(image_paths2, meta_paths2)
+    if unpaired:
+        messagebox.showwarning("Unpaired images", "No metadata file with the same name for:\n" + "\n".join(Path(i).name for i in unpaired))
+    if pairs:
+        title = f"Image + metadata: {Path(pairs[0][0]).name}" + (f" (+{len(pairs)-1})" if len(pairs) > 1 else "")
+        job_row(jobs.submit(title, sidecar_job(pairs), metadata_handler(tab2)))
 
 tk.Button(tab2, text="📂 Browse", command=browse_img2, bg="#AED6F1", font=("Helvetica", 10, "bold")).grid(row=0, column=2, padx=5)
 tk.Button(tab2, text="📁 Browse", command=browse_meta2, bg="#F5B7B1", font=("Helvetica", 10, "bold")).grid(row=1, column=2, padx=5)
 
-ttk.Button(tab2, text="Extract & Show", command=lambda: (
-    output_box.delete(1.0, tk.END),
-    output_box.insert(tk.END, json.dumps(extract_from_image_and_text(image_path2, meta_path2), indent=2)) if (image_path2 and meta_path2) else messagebox.showerror("Error","Select both image and metadata file.")
-)).grid(row=2, column=0, padx=10, pady=10)
-ttk.Button(tab2, text="Save JSON", command=lambda: save_json(output_box, globals().get("image_path2",""))).grid(row=2, column=1, padx=10)
-ttk.Button(tab2, text="Clear", command=lambda: clear_all([entry_img2, entry_meta2], output_box)).grid(row=2, column=2, padx=10)
+ttk.Button(tab2, text="Extract & Show", command=extract_images2).grid(row=2, column=0, padx=10, pady=10)
+ttk.Button(tab2, text="Save JSON", command=lambda: save_json(tab_results[tab2], image_paths2)).grid(row=2, column=1, padx=10)
+ttk.Button(tab2, text="Clear", command=lambda: clear_all([entry_img2, entry_meta2], tab2, [image_paths2, meta_paths2])).grid(row=2, column=2, padx=10)
 
 # ------------------ Tab 3: PDF Extractor ------------------
 
-tk.Label(tab3, text="Select PDF File:", bg="#EAF0FB", font=("Helvetica", 12, "bold")).grid(row=0, column=0, padx=10, sticky="e")
+tk.Label(tab3, text="Select PDF Files:", bg="#EAF0FB", font=("Helvetica", 12, "bold")).grid(row=0, column=0, padx=10, sticky="e")
 entry_pdf = tk.Entry(tab3, width=70, font=("Arial", 11), bg="#E8F8F5", relief="solid", bd=1, state="readonly")
 entry_pdf.grid(row=0, column=1, padx=10)
 
@@ -282,11 +268,9 @@ entry_output = tk.Entry(tab3, width=70, font=("Arial", 11), bg="#FDEBD0", relief
 entry_output.grid(row=1, column=1, padx=10)
 
 def browse_pdf():
-    global pdf_path
-    pdf_path = filedialog.askopenfilename(title="Select PDF File", filetypes=[("PDF files", "*.pdf")])
-    if pdf_path:
-        entry_pdf.config(state="normal"); entry_pdf.delete(0, tk.END)
-        entry_pdf.insert(0, pdf_path); entry_pdf.config(state="readonly")
+    paths = filedialog.askopenfilenames(title="Select PDF Files", filetypes=[("PDF files", "*.pdf")])
+    if paths:
+        pdf_paths[:] = paths; set_entry(entry_pdf, pdf_paths)
 
 def browse_output_folder():
     global output_folder
@@ -297,7 +281,8 @@ def browse_output_folder():
 
 tk.Button(tab3, text="📘 Browse PDF", command=browse_pdf, bg="#AED6F1", font=("Helvetica", 10, "bold")).grid(row=0, column=2, padx=5)
 tk.Button(tab3, text="📂 Choose Folder", command=browse_output_folder, bg="#F5B7B1", font=("Helvetica", 10, "bold")).grid(row=1, column=2, padx=5)
-ttk.Button(tab3, text="Extract Images + Metadata", command=lambda: extract_images_from_pdf(pdf_path, output_folder, output_box)).grid(row=2, column=1, pady=15)
-ttk.Button(tab3, text="Clear", command=lambda: clear_all([entry_pdf, entry_output], output_box)).grid(row=2, column=2, padx=10)
+ttk.Button(tab3, text="Extract Images + Metadata", command=lambda: extract_images_from_pdf(pdf_paths, output_folder)).grid(row=2, column=1, pady=15)
+ttk.Button(tab3, text="Clear", command=lambda: clear_all([entry_pdf, entry_output], tab3, [pdf_paths])).grid(row=2, column=2, padx=10)
 
+poll_jobs()
 root.mainloop()
@@ -0,0 +1,319 @@
+"""
+Headless batch SEM metadata extraction.
+
+Walks one or more directory trees, pairs each image with a JEOL `.txt`
+sidecar of the same name when there is one, and extracts metadata across a
+process pool. Results go either to an NDJSON file (one record per line,
+appended) or to a folder of per-image JSON files.
+
+A manifest records the size and mtime (and with --hash, the content hash)
+of every processed file, so reruns only process new or changed images.
+Files whose size and mtime still match are skipped without being read.
+With --hash, files whose size or mtime changed are hashed in the workers
+and only re-extracted when their content changed too.
+
+    python batch_extract.py SEM_DATA/ --output results.ndjson
+    python batch_extract.py SEM_DATA/ --output json_out/ --workers 8 --hash
+    python batch_extract.py //share/SEM --output results.ndjson --header-only
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from sem_extract import extract_from_image, extract_from_image_and_text
+from tiff_header import extract_header_only
+
+IMAGE_EXTS = {".tif", ".tiff", ".bmp", ".jpg", ".jpeg", ".png"}
+TIFF_EXTS = {".tif", ".tiff"}
+SIDECAR_EXT = ".txt"
+MANIFEST_SUFFIX = ".manifest.json"
+
+# ------------------ Discovery ------------------
+
+def find_images(roots):
+    """Yields (image_path, sidecar_path or None) for every image under roots."""
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            files = [root]
+        else:
+            files = sorted(p for p in root.rglob("*") if p.is_file())
+        for p in files:
+            if p.suffix.lower() not in IMAGE_EXTS:
+                continue
+            sidecar = p.with_suffix(SIDECAR_EXT)
+            if not sidecar.exists():
+                sidecar = p.with_suffix(SIDECAR_EXT.upper())
+            yield str(p), (str(sidecar) if sidecar.exists() else None)
+
+# ------------------ Manifest ------------------
+
+def file_hash(path, chunk=1024 * 1024):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint(image_path, sidecar_path, use_hash=False):
+    """
+    Identity of an image (and its sidecar) used to detect changes: size and
+    mtime of each file, plus their SHA-1 when use_hash is set.
+    """
+    fp = {}
+    for name, path in (("image", image_path), ("sidecar", sidecar_path)):
+        if path is None:
+            continue
+        st = os.stat(path)
+        fp[name] = [st.st_size, st.st_mtime_ns]
+        if use_hash:
+            fp[f"{name}_sha1"] = file_hash(path)
+    return fp
+
+
+def same_stat(old, new):
+    """True when both fingerprints have the same size and mtime for the same files."""
+    keys = ("image", "sidecar")
+    return all(old.get(k) == new.get(k) for k in keys)
+
+
+def same_content(old, new):
+    """True when both fingerprints carry hashes of the same files and the hashes match."""
+    keys = ("image_sha1", "sidecar_sha1")
+    return "image_sha1" in new and all(old.get(k) == new.get(k) for k in keys)
+
+
+def load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest, path):
+    # Write then rename so an interrupted run never leaves a truncated manifest
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+# ------------------ Workers ------------------
+
+def extract_one(image_path, sidecar_path, header_only=False):
+    """
+    Returns (result, bytes_read). bytes_read is only measured for header-only
+    TIFF reads and is None otherwise.
+    """
+    if sidecar_path:
+        return extract_from_image_and_text(image_path, sidecar_path), None
+    if header_only and Path(image_path).suffix.lower() in TIFF_EXTS:
+        return extract_header_only(image_path)
+    return extract_from_image(image_path), None
+
+
+def process_chunk(chunk, use_hash=False, header_only=False):
+    """
+    Runs in a worker process. chunk is a list of (image, sidecar, previous
+    fingerprint or None); returns one dict per pair with the result or the
+    error message. With use_hash, a pair whose content hash matches its
+    previous fingerprint is not extracted again and comes back "unchanged".
+    """
+    out = []
+    for image_path, sidecar_path, previous in chunk:
+        start = time.perf_counter()
+        record = {"path": image_path, "sidecar": sidecar_path, "unchanged": False}
+        bytes_read = None
+        try:
+            record["fingerprint"] = fingerprint(image_path, sidecar_path, use_hash)
+            if use_hash and previous and same_content(previous, record["fingerprint"]):
+                record["unchanged"] = True
+            else:
+                record["result"], bytes_read = extract_one(image_path, sidecar_path, header_only)
+            record["ok"] = True
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            record["ok"] = False
+        record["seconds"] = time.perf_counter() - start
+        record["bytes"] = os.path.getsize(image_path) if os.path.exists(image_path) else 0
+        record["bytes_read"] = record["bytes"] if bytes_read is None else bytes_read
+        out.append(record)
+    return out
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+# ------------------ Output ------------------
+
+class ResultWriter:
+    """
+    Appends NDJSON records, or writes one JSON file per image into a folder.
+    With truncate, an existing NDJSON file is emptied first.
+    """
+
+    def __init__(self, output, roots, truncate=False):
+        self.output = Path(output)
+        self.ndjson = self.output.suffix.lower() in (".ndjson", ".jsonl")
+        self.roots = [Path(r).resolve() for r in roots]
+        if self.ndjson:
+            self.output.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.output, "w" if truncate else "a", encoding="utf-8")
+        else:
+            self.output.mkdir(parents=True, exist_ok=True)
+            self._fh = None
+
+    def _json_path(self, image_path):
+        p = Path(image_path).resolve()
+        for root in self.roots:
+            if root.is_dir() and root in p.parents:
+                return self.output / p.relative_to(root).with_suffix(".json")
+        return self.output / (p.stem + ".json")
+
+    def write(self, record):
+        if self.ndjson:
+            self._fh.write(json.dumps({"path": record["path"], **record["result"]}) + "\n")
+            return
+        json_path = self._json_path(record["path"])
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(record["result"], f, indent=2)
+
+    def flush(self):
+        if self._fh:
+            self._fh.flush()
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+
+# ------------------ Main ------------------
+
+def run(roots, output, manifest_path=None, workers=None, chunk_size=16, use_hash=False, force=False,
+        header_only=False, progress=None):
+    """
+    Extracts every image under roots. output may be None when only
+    progress is wanted; then there is no manifest and everything is
+    processed. progress, if given, is called as progress(record, done, total)
+    for every image as results come in, including those --hash finds
+    unchanged (record["unchanged"] is then True and there is no result).
+    With force, an NDJSON output is rewritten instead of appended to.
+    """
+    if output is None:
+        manifest_path, manifest = None, {}
+    else:
+        manifest_path = manifest_path or str(Path(output)) + MANIFEST_SUFFIX
+        manifest = {} if force else load_manifest(manifest_path)
+
+    # Only stat() here; hashing, when asked for, happens in the workers and
+    # only for files whose size or mtime changed
+    pairs = list(find_images(roots))
+    todo = []
+    for image_path, sidecar_path in pairs:
+        entry = manifest.get(image_path)
+        previous = entry.get("fingerprint") if entry and entry.get("ok") else None
+        if previous and same_stat(previous, fingerprint(image_path, sidecar_path)):
+            continue
+        todo.append((image_path, sidecar_path, previous))
+
+    skipped = len(pairs) - len(todo)
+    print(f"Found {len(pairs)} images, {skipped} unchanged since last run, {len(todo)} to check")
+
+    writer = ResultWriter(output, roots, truncate=force) if output is not None else None
+    ok, failures, unchanged, total_bytes, total_read = 0, [], 0, 0, 0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(process_chunk, c, use_hash, header_only) for c in chunked(todo, chunk_size)]
+            for future in as_completed(futures):
+                for record in future.result():
+                    manifest[record["path"]] = {
+                        "ok": record["ok"],
+                        "fingerprint": record.get("fingerprint"),
+                        "error": record.get("error"),
+                    }
+                    if record["unchanged"]:  # touched or copied, same content
+                        unchanged += 1
+                    else:
+                        total_bytes += record["bytes"]
+                        total_read += record["bytes_read"]
+                        if record["ok"]:
+                            if writer is not None:
+                                writer.write(record)
+                            ok += 1
+                        else:
+                            failures.append((record["path"], record["error"]))
+                    if progress is not None:
+                        progress(record, ok + len(failures) + unchanged, len(todo))
+                # Persist progress per chunk so an interrupted run can resume
+                if writer is not None:
+                    writer.flush()
+                    save_manifest(manifest, manifest_path)
+    finally:
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - start
+    skipped += unchanged
+
+    # ===== SUMMARY =====
+    rate = (ok + len(failures)) / elapsed if elapsed > 0 else 0.0  # images actually extracted
+    print("\n===== Summary =====")
+    print(f"✅ Succeeded: {ok}")
+    print(f"❌ Failed: {len(failures)}")
+    print(f"⏭ Skipped (unchanged): {skipped}")
+    print(f"⏱ {elapsed:.1f} s, {rate:.1f} images/s, {total_bytes / 1e6 / elapsed if elapsed > 0 else 0:.1f} MB/s")
+    if header_only:
+        share = 100 * total_read / total_bytes if total_bytes else 0.0
+        print(f"📖 Header-only reads: {total_read / 1e6:.2f} MB of {total_bytes / 1e6:.1f} MB ({share:.2f}%)")
+    for path, error in failures:
+        print(f"  {path}: {error}")
+    return ok, failures, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch SEM metadata extraction.")
+    parser.add_argument("paths", nargs="+", help="image files or folders to scan recursively")
+    parser.add_argument("-o", "--output",
+                        help="NDJSON file (.ndjson/.jsonl, appended) or folder for per-image JSON")
+    parser.add_argument("--manifest", help=f"manifest path (default: <output>{MANIFEST_SUFFIX})")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=16, help="images per work unit")
+    parser.add_argument("--hash", action="store_true",
+                        help="when size or mtime changed, compare content hashes before extracting again")
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and process everything (an NDJSON output is rewritten)")
+    parser.add_argument("--header-only", action="store_true",
+                        help="read only the TIFF header and tag data (memory-mapped) and report bytes read")
+    parser.add_argument("--json-progress", action="store_true",
+                        help="print every result as a JSON line (used by the GUI)")
+    args = parser.parse_args(argv)
+    if args.output is None and not args.json_progress:
+        parser.error("--output is required unless --json-progress is given")
+
+    if args.json_progress:
+        # stdout carries only the JSON lines; "Found ..." and the summary go to stderr
+        out = sys.stdout
+        report = contextlib.redirect_stdout(sys.stderr)
+
+        def progress(record, done, total):
+            print(json.dumps({"processed": done, "total": total, "path": record["path"], "sidecar": record["sidecar"],
+                              "unchanged": record["unchanged"], "result": record.get("result"),
+                              "error": record.get("error")}), file=out, flush=True)
+    else:
+        progress, report = None, contextlib.nullcontext()
+
+    with report:
+        _, failures, _ = run(args.paths, args.output, args.manifest, args.workers,
+                             args.chunk_size, args.hash, args.force, args.header_only, progress)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,476 @@
+"""
+Bulk loading of extracted SEM metadata into the map database.
+
+Reads extraction results (batch_extract NDJSON files, folders of per-image
+JSON, JSON saved from the GUI, and the image_metadata .xlsx/.csv/.parquet
+sheets written by the PDF extractor) and upserts them into the Sample / SampleImage /
+Equipment / Document / Reference tables that the map interface queries.
+
+Each batch is one transaction. The SampleImage rows are staged in a temporary
+table (COPY on PostgreSQL, executemany elsewhere), then merged with one
+UPDATE and one INSERT ... WHERE NOT EXISTS keyed on image_url. Equipment,
+Sample and Document ids are resolved through in-memory lookup caches, and
+missing rows are created with multi-row inserts. Re-running on the same input
+changes nothing.
+
+    python ingest.py results.ndjson --root SEM_DATA/ --url-prefix https://data.example.org/sem/
+    python ingest.py json_out/ --db sqlite:///standin.db --locations samples.csv
+    python ingest.py Extracted_Images_2024-05-01/ --document "Smith et al. 2021" --sample Smith2021
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import bindparam, create_engine, text
+
+from batch_extract import MANIFEST_SUFFIX
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Common"))
+from database import engine_from_env  # noqa: E402
+
+DEFAULT_BATCH_SIZE = 20_000
+DEFAULT_EQUIPMENT_TYPE = "SEM"
+LOOKUP_CHUNK = 500  # keys per IN (...) when reading back generated ids
+
+# Where the instrument name and acquisition date live in the extracted records.
+# JEOL records carry them at the top level, TIFF tag blocks nest them.
+INSTRUMENT_KEYS = ("machine", "CM_INSTRUMENT", "SystemType", "Instrument")
+DATE_KEYS = ("date_taken", "CM_DATE", "Date")
+# Metadata files written by the PDF extractors (app.py before, pdf_extract.py now)
+PDF_SHEETS = ("image_metadata.xlsx", "image_metadata.csv", "image_metadata.parquet")
+
+STAGE_COLUMNS = ["image_url", "sample_id", "caption", "equipment_id", "date_obtained", "metadata"]
+
+# Tables for a local SQLite stand-in. Same names and columns as the PostGIS
+# schema, with origin stored as WKT text.
+SQLITE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS Equipment (
+        id INTEGER PRIMARY KEY, name TEXT, type TEXT)""",
+    """CREATE TABLE IF NOT EXISTS Sample (
+        id INTEGER PRIMARY KEY, sample_name TEXT, description TEXT,
+        sample_image_url TEXT, origin TEXT, date_collected DATE)""",
+    """CREATE TABLE IF NOT EXISTS SampleImage (
+        id INTEGER PRIMARY KEY, sample_id INTEGER REFERENCES Sample(id), image_url TEXT,
+        caption TEXT, equipment_id INTEGER REFERENCES Equipment(id), date_obtained DATE, metadata TEXT)""",
+    """CREATE TABLE IF NOT EXISTS Document (
+        document_id INTEGER PRIMARY KEY, document_name TEXT, document_url TEXT)""",
+    """CREATE TABLE IF NOT EXISTS Reference (
+        sample_id INTEGER REFERENCES Sample(id), document_id INTEGER REFERENCES Document(document_id))""",
+]
+
+# Additions to the PostGIS schema: somewhere to keep the metadata itself, and
+# indexes on the natural keys the merge looks rows up by.
+POSTGRES_STATEMENTS = [
+    "ALTER TABLE SampleImage ADD COLUMN IF NOT EXISTS metadata JSONB",
+]
+INGEST_INDEX_STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS sampleimage_image_url_idx ON SampleImage (image_url)",
+    "CREATE INDEX IF NOT EXISTS sample_sample_name_idx ON Sample (sample_name)",
+    "CREATE INDEX IF NOT EXISTS equipment_name_idx ON Equipment (name)",
+    "CREATE INDEX IF NOT EXISTS reference_document_id_idx ON Reference (document_id)",
+]
+
+# Dialect differences used by the merge statements
+DIALECTS = {
+    "postgresql": {
+        "json": "CAST(st.metadata AS JSONB)",
+        "date": "CAST(st.date_obtained AS DATE)",
+        "distinct": "IS DISTINCT FROM",
+        "origin": "ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography",
+        "stage": "CREATE TEMP TABLE ingest_stage ({}) ON COMMIT DROP",
+    },
+    "sqlite": {
+        "json": "st.metadata",
+        "date": "st.date_obtained",
+        "distinct": "IS NOT",
+        "origin": "'POINT(' || :lon || ' ' || :lat || ')'",
+        "stage": "CREATE TEMP TABLE ingest_stage ({})",
+    },
+}
+
+
+def dialect_sql(conn):
+    return DIALECTS.get(conn.dialect.name, DIALECTS["postgresql"])
+
+
+def ensure_schema(engine):
+    """
+    Creates the stand-in tables on SQLite, or adds the metadata column on
+    PostgreSQL, plus the lookup indexes. Safe to call on every run.
+    """
+    with engine.begin() as conn:
+        statements = SQLITE_SCHEMA if conn.dialect.name == "sqlite" else POSTGRES_STATEMENTS
+        for statement in statements + INGEST_INDEX_STATEMENTS:
+            conn.execute(text(statement))
+
+# ------------------ Reading extraction output ------------------
+
+def iter_input_files(paths):
+    for path in paths:
+        path = Path(path)
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for p in files:
+            if p.name.endswith(MANIFEST_SUFFIX):
+                continue
+            if p.suffix.lower() in (".ndjson", ".jsonl", ".json") or p.name in PDF_SHEETS:
+                yield p
+
+
+def iter_records(paths):
+    """
+    Yields (image_path, record) for every extraction result found in paths.
+    image_path is the best known location of the source image.
+    """
+    for p in iter_input_files(paths):
+        suffix = p.suffix.lower()
+        if suffix in (".ndjson", ".jsonl"):
+            with open(p, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        yield record.pop("path", None) or str(p.parent / _image_name(record)), record
+        elif suffix == ".json":
+            with open(p, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for record in data if isinstance(data, list) else [data]:
+                if isinstance(record, dict):
+                    yield str(p.parent / _image_name(record)), record
+        else:
+            # Sheet written by the PDF extractor, one row per extracted image
+            readers = {".xlsx": pd.read_excel, ".csv": pd.read_csv, ".parquet": pd.read_parquet}
+            df = readers[suffix](p)
+            for row in df.astype(object).where(pd.notna(df), None).to_dict("records"):
+                yield row.get("File Path") or str(p.parent / row["Filename"]), {
+                    "image": row.get("Filename"), "metadata": row}
+
+
+def _image_name(record):
+    return record.get("image") or record.get("image_file") or f"{record.get('id', 'unknown')}.tif"
+
+
+def find_value(data, keys):
+    """First non-empty value stored under any of keys, searching nested dicts and lists."""
+    if isinstance(data, dict):
+        for key in keys:
+            value = data.get(key)
+            if isinstance(value, (str, int, float)) and str(value).strip() not in ("", "Unknown"):
+                return str(value).strip()
+        children = data.values()
+    elif isinstance(data, list):
+        children = data
+    else:
+        return None
+    for child in children:
+        if isinstance(child, (dict, list)):
+            found = find_value(child, keys)
+            if found is not None:
+                return found
+    return None
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """ISO date string for a date as written by the instruments, or None."""
+    if not value:
+        return None
+    value = value.replace("/", "-")
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    # Anything else, e.g. FEI's month-first 05-01-2024
+    parsed = pd.to_datetime(value, errors="coerce")
+    return None if pd.isna(parsed) else parsed.date().isoformat()
+
+
+class RowBuilder:
+    """Maps (image_path, record) pairs to SampleImage rows."""
+
+    def __init__(self, roots=None, url_prefix=None, sample=None):
+        # Plain string prefixes, this runs once per row
+        self.roots = [os.path.join(os.path.abspath(r), "") for r in roots or []]
+        self.url_prefix = url_prefix.rstrip("/") if url_prefix else None
+        self.sample = sample
+
+    def relative(self, abs_path):
+        """Path parts below the first matching root, or None."""
+        for root in self.roots:
+            if abs_path.startswith(root):
+                return abs_path[len(root):].split(os.sep)
+        return None
+
+    def image_url(self, abs_path, rel):
+        if self.url_prefix and rel is not None:
+            return f"{self.url_prefix}/{'/'.join(rel)}"
+        return abs_path.replace(os.sep, "/")
+
+    def sample_name(self, abs_path, rel):
+        # Default: images are organised in one folder per sample
+        if self.sample:
+            return self.sample
+        if rel is not None and len(rel) > 1:
+            return rel[0]
+        return os.path.basename(os.path.dirname(abs_path))
+
+    def __call__(self, image_path, record):
+        abs_path = os.path.abspath(image_path)
+        rel = self.relative(abs_path)
+        return {
+            "image_url": self.image_url(abs_path, rel),
+            "sample_name": self.sample_name(abs_path, rel),
+            "caption": os.path.basename(abs_path),
+            "equipment": find_value(record, INSTRUMENT_KEYS),
+            "date_obtained": parse_date(find_value(record, DATE_KEYS)),
+            "metadata": json.dumps(record.get("metadata", record), default=str),
+        }
+
+# ------------------ Lookup caches ------------------
+
+class LookupCache:
+    """
+    In-memory natural key -> id map for one table. Loaded once, then kept
+    up to date as missing rows are inserted, so each batch only touches the
+    database for keys it has not seen before.
+    """
+
+    def __init__(self, table, key_column, id_column="id", defaults=None):
+        self.table = table
+        self.key_column = key_column
+        self.id_column = id_column
+        self.defaults = defaults or {}
+        self.ids = None
+        self.inserted = 0
+
+    def load(self, conn):
+        rows = conn.execute(text(
+            f"SELECT {self.key_column}, {self.id_column} FROM {self.table} WHERE {self.key_column} IS NOT NULL"))
+        self.ids = {}
+        for key, id_ in rows:
+            self.ids.setdefault(key, id_)  # keep the first id if a name is duplicated
+
+    def resolve(self, conn, keys):
+        """Returns {key: id} for keys, inserting the missing ones in one multi-row insert."""
+        if self.ids is None:
+            self.load(conn)
+        missing = sorted({k for k in keys if k is not None and k not in self.ids})
+        if missing:
+            columns = [self.key_column, *self.defaults]
+            conn.execute(
+                text(f"INSERT INTO {self.table} ({', '.join(columns)}) "
+                     f"VALUES ({', '.join(':' + c for c in columns)})"),
+                [{self.key_column: k, **self.defaults} for k in missing],
+            )
+            select = text(
+                f"SELECT {self.key_column}, {self.id_column} FROM {self.table} "
+                f"WHERE {self.key_column} IN :keys"
+            ).bindparams(bindparam("keys", expanding=True))
+            for i in range(0, len(missing), LOOKUP_CHUNK):
+                for key, id_ in conn.execute(select, {"keys": missing[i:i + LOOKUP_CHUNK]}):
+                    self.ids.setdefault(key, id_)
+            self.inserted += len(missing)
+        return {k: self.ids.get(k) for k in keys}
+
+    def reset(self):
+        # After a rolled back transaction the cached ids may not exist
+        self.ids = None
+
+# ------------------ Merge ------------------
+
+def _copy_stage(conn, rows):
+    """Loads the staged rows with COPY when the driver supports it."""
+    raw = conn.connection.dbapi_connection
+    cursor = raw.cursor()
+    if not hasattr(cursor, "copy_expert"):  # not psycopg2
+        return False
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in STAGE_COLUMNS])
+    buf.seek(0)
+    cursor.copy_expert(f"COPY ingest_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+    return True
+
+
+def merge_images(conn, rows):
+    """Upserts SampleImage rows keyed on image_url. Returns (inserted, updated)."""
+    sql = dialect_sql(conn)
+    conn.execute(text("DROP TABLE IF EXISTS ingest_stage"))
+    conn.execute(text(sql["stage"].format(
+        "image_url TEXT, sample_id INTEGER, caption TEXT, equipment_id INTEGER, "
+        "date_obtained TEXT, metadata TEXT")))
+    if conn.dialect.name != "postgresql" or not _copy_stage(conn, rows):
+        conn.execute(
+            text(f"INSERT INTO ingest_stage ({', '.join(STAGE_COLUMNS)}) "
+                 f"VALUES ({', '.join(':' + c for c in STAGE_COLUMNS)})"),
+            [{c: row[c] for c in STAGE_COLUMNS} for row in rows],
+        )
+
+    columns = ("sample_id", "caption", "equipment_id", "date_obtained", "metadata")
+    staged = {"sample_id": "st.sample_id", "caption": "st.caption", "equipment_id": "st.equipment_id",
+              "date_obtained": sql["date"], "metadata": sql["json"]}
+    updated = conn.execute(text(f"""
+        UPDATE SampleImage SET {', '.join(f'{c} = {staged[c]}' for c in columns)}
+        FROM ingest_stage st
+        WHERE SampleImage.image_url = st.image_url
+          AND ({', '.join(f'SampleImage.{c}' for c in columns)})
+              {sql['distinct']} ({', '.join(staged[c] for c in columns)})
+    """)).rowcount
+    inserted = conn.execute(text(f"""
+        INSERT INTO SampleImage (image_url, {', '.join(columns)})
+        SELECT st.image_url, {', '.join(staged[c] for c in columns)}
+        FROM ingest_stage st
+        WHERE NOT EXISTS (SELECT 1 FROM SampleImage si WHERE si.image_url = st.image_url)
+    """)).rowcount
+    conn.execute(text("DROP TABLE IF EXISTS ingest_stage"))
+    return inserted, updated
+
+
+def link_document(conn, sample_ids, document_id):
+    """Adds the missing Reference rows between the samples and the document."""
+    new = [{"sample_id": s, "document_id": document_id} for s in sorted(set(sample_ids))]
+    if not new:
+        return 0
+    existing = {r[0] for r in conn.execute(
+        text("SELECT sample_id FROM Reference WHERE document_id = :document_id"),
+        {"document_id": document_id})}
+    new = [r for r in new if r["sample_id"] not in existing]
+    if new:
+        conn.execute(text("INSERT INTO Reference (sample_id, document_id) VALUES (:sample_id, :document_id)"), new)
+    return len(new)
+
+
+def load_locations(path):
+    """
+    Reads a CSV with sample_name plus any of lat, lon, date_collected and
+    description. Returns {sample_name: row}.
+    """
+    df = pd.read_csv(path, dtype={"sample_name": str})
+    df = df.astype(object).where(pd.notna(df), None)
+    return {row["sample_name"]: row for row in df.to_dict("records")}
+
+
+def update_locations(conn, locations, sample_ids):
+    sql = dialect_sql(conn)
+    params = []
+    for name, row in locations.items():
+        if sample_ids.get(name) is None:
+            continue
+        params.append({
+            "id": sample_ids[name],
+            "lat": row.get("lat"), "lon": row.get("lon"),
+            "date_collected": parse_date(str(row["date_collected"])) if row.get("date_collected") else None,
+            "description": row.get("description"),
+        })
+    if params:
+        conn.execute(text(f"""
+            UPDATE Sample SET
+                origin = CASE WHEN :lat IS NULL OR :lon IS NULL THEN origin ELSE {sql['origin']} END,
+                date_collected = COALESCE(:date_collected, date_collected),
+                description = COALESCE(:description, description)
+            WHERE id = :id
+        """), params)
+    return len(params)
+
+# ------------------ Main ------------------
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest(engine, paths, roots=None, url_prefix=None, sample=None, locations=None, document=None,
+           document_url=None, equipment_type=DEFAULT_EQUIPMENT_TYPE, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Loads every extraction result under paths. Returns a dict of counts and
+    timings. Each batch commits on its own; a failing batch rolls back
+    without affecting the batches already loaded.
+    """
+    ensure_schema(engine)
+    build = RowBuilder(roots, url_prefix, sample)
+    equipment = LookupCache("Equipment", "name", defaults={"type": equipment_type})
+    samples = LookupCache("Sample", "sample_name")
+    documents = LookupCache("Document", "document_name", "document_id", defaults={"document_url": document_url})
+    locations = load_locations(locations) if locations else {}
+
+    stats = {"records": 0, "inserted": 0, "updated": 0, "references": 0, "seconds": 0.0}
+    start = time.perf_counter()
+    for batch in batches(iter_records(paths), batch_size):
+        # Last record wins when the same image shows up more than once
+        rows = list({row["image_url"]: row for row in (build(p, r) for p, r in batch)}.values())
+        try:
+            with engine.begin() as conn:
+                equipment_ids = equipment.resolve(conn, [r["equipment"] for r in rows])
+                sample_names = {r["sample_name"] for r in rows} | set(locations)
+                sample_ids = samples.resolve(conn, sorted(sample_names))
+                for row in rows:
+                    row["equipment_id"] = equipment_ids.get(row["equipment"])
+                    row["sample_id"] = sample_ids[row["sample_name"]]
+                update_locations(conn, locations, sample_ids)
+                inserted, updated = merge_images(conn, rows)
+                if document:
+                    document_id = documents.resolve(conn, [document])[document]
+                    stats["references"] += link_document(conn, [r["sample_id"] for r in rows], document_id)
+        except Exception:
+            for cache in (equipment, samples, documents):
+                cache.reset()
+            raise
+        locations = {}  # applied once, in the first batch
+        stats["records"] += len(rows)
+        stats["inserted"] += inserted
+        stats["updated"] += updated
+        elapsed = time.perf_counter() - start
+        print(f"  {stats['records']} rows, {stats['records'] / elapsed if elapsed > 0 else 0:.0f} rows/s")
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["new_equipment"] = equipment.inserted
+    stats["new_samples"] = samples.inserted
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load extracted SEM metadata into the map database.")
+    parser.add_argument("paths", nargs="+", help="NDJSON/JSON files, PDF image_metadata sheets or folders of them")
+    parser.add_argument("--db", help="SQLAlchemy URL (default: PostgreSQL from DB_* in .env)")
+    parser.add_argument("--root", action="append", default=[],
+                        help="image root folder; sample names and URLs are taken relative to it")
+    parser.add_argument("--url-prefix", help="base URL the image roots are served from")
+    parser.add_argument("--sample", help="put every image under this sample instead of one sample per folder")
+    parser.add_argument("--locations", help="CSV of sample_name, lat, lon, date_collected, description")
+    parser.add_argument("--document", help="link the ingested samples to this document")
+    parser.add_argument("--document-url", help="URL stored for a newly created document")
+    parser.add_argument("--equipment-type", default=DEFAULT_EQUIPMENT_TYPE, help="type given to new equipment")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per transaction")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.db) if args.db else engine_from_env()
+    stats = ingest(engine, args.paths, args.root, args.url_prefix, args.sample, args.locations,
+                   args.document, args.document_url, args.equipment_type, args.batch_size)
+
+    # ===== SUMMARY =====
+    rate = stats["records"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    print("\n===== Summary =====")
+    print(f"✅ Images inserted: {stats['inserted']}")
+    print(f"🔄 Images updated: {stats['updated']}")
+    print(f"⏭ Unchanged: {stats['records'] - stats['inserted'] - stats['updated']}")
+    print(f"🧪 New samples: {stats['new_samples']}, new equipment: {stats['new_equipment']}, "
+          f"new references: {stats['references']}")
+    print(f"⏱ {stats['seconds']:.1f} s, {rate:.0f} rows/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""
+Single-pass JEOL sidecar parsing with typed values and bulk columnar output.
+
+A JEOL .txt sidecar is one "$KEY value" pair per line: common keys as
+$CM_*, instrument keys as $$SM_* (or $SM_* on later instruments). This
+module reads each file once as bytes, splits it into lines and tokens with
+str methods instead of a regex per line, and converts the keys in SCHEMA
+into numbers, dates and pixel sizes once, so nothing downstream has to
+re-parse "15.00" or "2023/05/14".
+
+Dialects handled:
+
+- $$SM_ and $SM_ instrument keys (leading "$" are stripped, so both map
+  to SM_*)
+- space or tab between key and value, CRLF / LF / CR line endings
+- UTF-8 (with or without BOM), UTF-16 with BOM, and Shift-JIS (cp932)
+  from Japanese-locale acquisition PCs
+- dates written yyyy/mm/dd, yyyy-mm-dd, yyyy.mm.dd or dd/mm/yyyy, and
+  accelerating voltage in kV or V
+
+parse_folder turns a directory of sidecars into one typed DataFrame (a
+column per schema field) and, given the previous table, re-parses only
+new or changed files.
+
+    python jeol_sidecar.py SEM_DATA/ --output sidecars.parquet
+    python jeol_sidecar.py SEM_DATA/ --output sidecars.csv --raw
+"""
+import argparse
+import codecs
+import datetime
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # optional, only needed for Parquet output
+    pyarrow = None
+
+SIDECAR_SUFFIX = ".txt"
+LENGTH_UNITS_UM = {"nm": 1e-3, "um": 1.0, "µm": 1.0, "μm": 1.0, "mm": 1e3}
+BOOKKEEPING = ["path", "size", "mtime_ns", "dialect", "keys", "error"]
+KEY_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_%")
+
+# ------------------ Value Converters ------------------
+# Each takes the raw value string and returns a value, a tuple of values for
+# multi-column fields, or None when the string does not parse.
+
+def _quantity(s):
+    """'15.00' -> (15.0, ''), '10um' -> (10.0, 'um'), '15.0 kV' -> (15.0, 'kV')."""
+    s = s.strip()
+    end = len(s)
+    while end and not (s[end - 1].isdigit() or s[end - 1] == "."):
+        end -= 1
+    try:
+        return float(s[:end]), s[end:].strip()
+    except ValueError:
+        return None, ""
+
+def to_float(s):
+    return _quantity(s)[0]
+
+def to_kilovolts(s):
+    v, unit = _quantity(s)
+    if v is None: return None
+    # Most instruments write kV; some write volts, with or without the unit
+    return v / 1000 if unit.lower() == "v" or (not unit and v >= 1000) else v
+
+def to_micrometres(s):
+    v, unit = _quantity(s)
+    if v is None: return None
+    return v * LENGTH_UNITS_UM.get(unit.lower(), 1.0)
+
+def to_date(s):
+    """yyyy/mm/dd, yyyy-mm-dd, yyyy.mm.dd or dd/mm/yyyy (split, no strptime)."""
+    parts = s.strip().replace("-", "/").replace(".", "/").split("/")
+    if len(parts) != 3: return None
+    if len(parts[2]) == 4: parts.reverse()
+    try: return datetime.date(int(parts[0]), int(parts[1]), int(parts[2]))
+    except ValueError: return None
+
+def to_time(s):
+    parts = s.strip().split(":")
+    if not 2 <= len(parts) <= 3: return None
+    try: return datetime.time(*(int(float(p)) for p in parts))
+    except ValueError: return None
+
+def to_floats(n):
+    """Converter for an 'a b c' value spread over n columns ('1280 960', '1280x960')."""
+    def convert(s):
+        parts = s.replace("x", " ").replace(",", " ").split()
+        values = tuple(to_float(p) for p in parts[:n])
+        return values + (None,) * (n - len(values))
+    return convert
+
+def to_text(s):
+    return s or None
+
+# ------------------ Schema ------------------
+# (raw keys, column name(s), converter). Raw keys are given without leading
+# "$", so one entry covers every dialect's prefix.
+
+FIELDS = [
+    (("CM_FORMAT",), "format", to_text),
+    (("CM_VERSION",), "version", to_text),
+    (("CM_INSTRUMENT",), "instrument", to_text),
+    (("CM_DATE",), "date", to_date),
+    (("CM_TIME",), "time", to_time),
+    (("CM_OPERATOR",), "operator", to_text),
+    (("CM_TITLE",), "title", to_text),
+    (("CM_SIGNAL",), "signal", to_text),
+    (("CM_ACCEL_VOLT",), "accel_kv", to_kilovolts),
+    (("CM_MAG",), "magnification", to_float),
+    (("CM_FULL_SIZE",), ("width_px", "height_px"), to_floats(2)),
+    (("CM_MICRON_BAR",), "micron_bar_px", to_float),
+    (("CM_MICRON_MARKER",), "micron_marker_um", to_micrometres),
+    (("SM_MICRON_BAR",), "scale_bar_um", to_micrometres),
+    (("SM_WD",), "working_distance_mm", to_float),
+    (("SM_SCAN_ROTATION",), "scan_rotation_deg", to_float),
+    (("SM_EMISSION_CURRENT",), "emission_current", to_float),
+    (("SM_STAGE_POS",), ("stage_x", "stage_y", "stage_z", "stage_tilt", "stage_rotation"), to_floats(5)),
+]
+# Columns derived after conversion, see _derive
+DERIVED = ["acquired", "pixel_size_nm"]
+# Column dtypes in the bulk table; any other column is float32
+CATEGORIES = ["dialect", "format", "version", "instrument", "operator", "signal"]  # low cardinality
+TEXT_COLUMNS = ["path", "error", "title", "time", "raw"]
+INTEGER_COLUMNS = {"size": "int64", "mtime_ns": "int64", "keys": "Int32", "width_px": "Int32", "height_px": "Int32"}
+DATETIME_COLUMNS = ["date", "acquired"]
+
+
+def compile_schema(fields=FIELDS):
+    """Returns ({raw key: (columns tuple, converter)}, [column names]) for fields."""
+    schema, columns = {}, []
+    for keys, cols, convert in fields:
+        cols = (cols,) if isinstance(cols, str) else tuple(cols)
+        columns.extend(cols)
+        for key in keys:
+            schema[key] = (cols, convert)
+    return schema, columns
+
+SCHEMA, SCHEMA_COLUMNS = compile_schema()
+COLUMNS = SCHEMA_COLUMNS + DERIVED
+
+# ------------------ Parsing ------------------
+
+def decode(data):
+    """Sidecar bytes -> text, by BOM, then UTF-8, then Shift-JIS."""
+    if data[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+        return data.decode("utf-16", errors="ignore")
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp932", errors="ignore")
+
+
+def tokenize(text):
+    """
+    One pass over the text. Returns ({key: raw value}, dialect); a repeated
+    key keeps its last value, as parse_jeol_metadata always has. Keys follow
+    the grammar of the regex parser this replaces, ^\\$+([A-Z0-9_%]+)\\s*(.*)$:
+    the key is the run of KEY_CHARS after the "$"s and the value is the rest
+    of the line, so "$CM_MAG=5000" reads as CM_MAG -> "=5000" and lowercase
+    keys are skipped.
+    """
+    raw = {}
+    # Lines end at CR, LF or CRLF only, as when the file is read in text mode
+    for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = line.strip()
+        if line[:1] != "$": continue
+        body = line.lstrip("$")
+        key, _, value = body.partition(" ")
+        if not KEY_CHARS.issuperset(key):  # tab separated, or no separator after the key
+            end = 0
+            while end < len(body) and body[end] in KEY_CHARS: end += 1
+            key, value = body[:end], body[end:]
+        if key: raw[key] = value.strip()
+    double = text.count("$$SM_")
+    dialect = "$SM" if text.count("$SM_") > double else "$$SM" if double else "CM"
+    return raw, dialect
+
+
+def read_sidecar(path):
+    """Raw {key: value string} of one sidecar, plus its dialect."""
+    with open(path, "rb") as f:
+        return tokenize(decode(f.read()))
+
+
+def _derive(row):
+    date, t = row.get("date"), row.get("time")
+    row["acquired"] = datetime.datetime.combine(date, t) if date is not None and t is not None else None
+    bar, marker = row.get("micron_bar_px"), row.get("micron_marker_um")
+    row["pixel_size_nm"] = marker * 1000 / bar if bar and marker else None
+    return row
+
+
+def typed_values(raw, schema=SCHEMA):
+    """Converts the schema keys in raw to {column: typed value}; others are left out."""
+    row = {}
+    for key, (cols, convert) in schema.items():
+        value = raw.get(key)
+        if value is None:
+            continue
+        try:
+            v = convert(value)
+        except (ValueError, OverflowError):
+            v = None
+        if len(cols) == 1:
+            row[cols[0]] = v
+        else:
+            row.update(zip(cols, v))
+    return _derive(row)
+
+
+def parse_sidecar(path, schema=SCHEMA):
+    """{column: typed value} for one sidecar, plus dialect and the number of keys read."""
+    raw, dialect = read_sidecar(path)
+    row = typed_values(raw, schema)
+    row["dialect"], row["keys"] = dialect, len(raw)
+    return row
+
+
+def jsonable(values):
+    """typed_values output with dates and times as ISO strings, for JSON records."""
+    return {k: v.isoformat() if isinstance(v, (datetime.date, datetime.time)) else v
+            for k, v in values.items() if v is not None}
+
+# ------------------ Bulk ------------------
+
+def find_sidecars(folder):
+    """Sorted paths (str) of every sidecar under folder."""
+    found = []
+    for root, _, files in os.walk(folder):
+        found.extend(os.path.join(root, f) for f in files if f.lower().endswith(SIDECAR_SUFFIX))
+    return sorted(found)
+
+
+def _set_dtypes(df):
+    for col in df.columns:
+        if col in CATEGORIES:
+            df[col] = df[col].astype("category")
+        elif col in INTEGER_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(INTEGER_COLUMNS[col])
+        elif col in DATETIME_COLUMNS:
+            df[col] = pd.to_datetime(df[col], errors="coerce").astype("datetime64[us]")
+        elif col not in TEXT_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    return df
+
+
+def to_frame(rows, columns=COLUMNS, raw=False):
+    """Rows from parse_sidecar -> DataFrame with compact dtypes."""
+    cols = BOOKKEEPING + columns + (["raw"] if raw else [])
+    return _set_dtypes(pd.DataFrame.from_records(rows, columns=cols))
+
+
+def parse_folder(folder, previous=None, raw=False, schema=SCHEMA, columns=COLUMNS):
+    """
+    Parses every sidecar under folder into one DataFrame. Rows of previous
+    (an earlier parse_folder result) whose file size and mtime are unchanged
+    are kept as they are, so only new or modified sidecars are read.
+    Returns (df, parsed) where parsed is the number of files actually read.
+    """
+    known = {}
+    if previous is not None and len(previous):
+        known = {p: (s, m) for p, s, m in zip(previous["path"], previous["size"], previous["mtime_ns"])}
+    rows, keep = [], []
+    for path in find_sidecars(folder):
+        st = os.stat(path)
+        if known.get(path) == (st.st_size, st.st_mtime_ns):
+            keep.append(path)
+            continue
+        row = {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "error": None}
+        try:
+            values, dialect = read_sidecar(path)
+            row.update(typed_values(values, schema), dialect=dialect, keys=len(values))
+            if raw: row["raw"] = json.dumps(values)
+        except OSError as e:
+            row["error"] = str(e)
+        rows.append(row)
+
+    df = to_frame(rows, columns, raw)
+    if keep:
+        kept = previous[previous["path"].isin(set(keep))]
+        df = pd.concat([kept, df], ignore_index=True) if len(df) else kept
+        df = _set_dtypes(df.sort_values("path", ignore_index=True))
+    return df, len(rows)
+
+
+def read_table(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def write_table(df, path):
+    """Parquet (needs pyarrow) or CSV, by the output's suffix."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        if pyarrow is None:
+            raise ImportError("pyarrow is required for Parquet output (pip install pyarrow)")
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+# ------------------ Main ------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse a folder of JEOL .txt sidecars into one typed table.")
+    parser.add_argument("folder")
+    parser.add_argument("-o", "--output", required=True, help=".parquet or .csv; an existing file is updated")
+    parser.add_argument("--raw", action="store_true", help="also keep every raw key as a JSON column")
+    parser.add_argument("--force", action="store_true", help="re-parse every sidecar")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    previous = None if args.force else read_table(args.output)
+    if previous is not None and args.raw != ("raw" in previous):
+        previous = None  # column set changed, start over
+    df, parsed = parse_folder(args.folder, previous, raw=args.raw)
+    write_table(df, args.output)
+    elapsed = time.perf_counter() - start
+    errors = int(df["error"].notna().sum()) if len(df) else 0
+    print(f"✅ {len(df)} sidecars in {args.output}: {parsed} parsed, {len(df) - parsed} unchanged, "
+          f"{errors} failed, {parsed / elapsed if elapsed else 0:.0f} files/s")
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
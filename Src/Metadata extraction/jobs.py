@@ -0,0 +1,201 @@
+"""
+Background jobs for the extractor GUI.
+
+A JobManager runs submitted jobs on a small pool of worker threads, so the
+Tk event loop never waits on extraction. Workers never touch Tk: every
+message a job produces goes into one thread-safe queue, and the GUI calls
+dispatch() from root.after to hand the messages to each job's on_message
+callback on the main thread.
+
+Heavy work runs in child processes (run_command): batch_extract.py and
+pdf_extract.py print JSON lines that become messages. Running them as
+separate scripts keeps their process pools from re-importing the GUI.
+Cancelling a job that has not started drops it; cancelling a running
+command terminates the child process together with its process pool, as
+each child is started in a process group of its own.
+"""
+import collections
+import itertools
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from sem_extract import extract_from_image_and_text
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+DEFAULT_WORKERS = 2
+DISPATCH_LIMIT = 200  # messages handled per dispatch() call, so a flood cannot freeze the UI
+HERE = Path(__file__).resolve().parent
+# Start children in their own process group, so terminate_tree reaches their pool workers
+NEW_PROCESS_GROUP = ({"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt"
+                     else {"start_new_session": True})
+
+
+def terminate_tree(proc):
+    """Stops a child started with NEW_PROCESS_GROUP and every process it started."""
+    if proc.poll() is not None:
+        return
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+class Job:
+    def __init__(self, job_id, title, work, on_message=None):
+        self.id = job_id
+        self.title = title
+        self.work = work
+        self.on_message = on_message
+        self.state = QUEUED  # only changed by dispatch(), on the main thread
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._proc = None
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        with self._lock:
+            if self._proc is not None:
+                terminate_tree(self._proc)
+
+    def attach(self, proc):
+        """Called by a running job so cancel() can stop its child process."""
+        with self._lock:
+            self._proc = proc
+        if self.cancelled:
+            terminate_tree(proc)
+
+
+class JobManager:
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.jobs = []
+        self._ids = itertools.count(1)
+        self._todo = queue.Queue()
+        self._events = queue.Queue()
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, title, work, on_message=None):
+        """
+        Queues work(job, emit) to run on a worker thread. emit(dict) sends a
+        message to on_message(job, message) on the main thread; state
+        changes arrive there too, as {"state": ...} messages.
+        """
+        job = Job(next(self._ids), title, work, on_message)
+        self.jobs.append(job)
+        self._events.put((job, {"state": QUEUED}))
+        self._todo.put(job)
+        return job
+
+    def cancel_all(self):
+        for job in self.jobs:
+            if job.state not in FINISHED:
+                job.cancel()
+
+    def active(self):
+        return sum(job.state not in FINISHED for job in self.jobs)
+
+    def dispatch(self, limit=DISPATCH_LIMIT):
+        """Main thread only: delivers pending messages to the jobs' callbacks."""
+        for _ in range(limit):
+            try:
+                job, msg = self._events.get_nowait()
+            except queue.Empty:
+                return
+            if "state" in msg:
+                job.state = msg["state"]
+            if job.on_message is not None:
+                job.on_message(job, msg)
+
+    def shutdown(self):
+        self.cancel_all()
+        for _ in self._threads:
+            self._todo.put(None)
+
+    def _worker(self):
+        while True:
+            job = self._todo.get()
+            if job is None:
+                return
+            if job.cancelled:
+                self._events.put((job, {"state": CANCELLED}))
+                continue
+            self._events.put((job, {"state": RUNNING}))
+            emit = lambda msg, job=job: self._events.put((job, msg))
+            try:
+                job.work(job, emit)
+                final = {"state": CANCELLED if job.cancelled else DONE}
+            except Exception as e:
+                final = {"state": CANCELLED} if job.cancelled else {"state": FAILED, "error": str(e)}
+            self._events.put((job, final))
+
+# ------------------ Work ------------------
+
+def run_command(argv, ok_codes=(0,)):
+    """Work that runs argv in a child process and emits each JSON line it prints."""
+    def work(job, emit):
+        proc = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                encoding="utf-8", errors="replace", **NEW_PROCESS_GROUP)
+        job.attach(proc)
+        log = collections.deque(maxlen=20)  # other output, for the error message
+        try:
+            for line in proc.stdout:
+                if line.startswith("{"):
+                    try:
+                        emit(json.loads(line))
+                        continue
+                    except json.JSONDecodeError:
+                        pass  # not a message after all, keep it with the other output
+                if line.strip():
+                    log.append(line.strip())
+        except BaseException:
+            terminate_tree(proc)  # never leave the child running once we stop reading
+            raise
+        finally:
+            proc.stdout.close()
+            proc.wait()
+        if proc.returncode not in ok_codes and not job.cancelled:
+            raise RuntimeError(log[-1] if log else f"exit code {proc.returncode}")
+    return work
+
+
+def image_job(paths, workers=None):
+    """Metadata for images and folders of images, one message per image."""
+    argv = [sys.executable, str(HERE / "batch_extract.py"), *paths, "--json-progress"]
+    if workers:
+        argv += ["--workers", str(workers)]
+    # Exit code 1 only means some images failed; those arrive as messages with an error
+    return run_command(argv, ok_codes=(0, 1))
+
+
+def pdf_job(pdf_path, output_dir):
+    return run_command([sys.executable, str(HERE / "pdf_extract.py"), pdf_path, output_dir, "--json-progress"])
+
+
+def sidecar_job(pairs):
+    """Image + JEOL sidecar pairs. Text parsing only, so it runs on the worker thread."""
+    def work(job, emit):
+        for i, (image_path, meta_path) in enumerate(pairs, 1):
+            if job.cancelled:
+                return
+            msg = {"processed": i, "total": len(pairs), "path": image_path, "sidecar": meta_path}
+            try:
+                msg["result"] = extract_from_image_and_text(image_path, meta_path)
+            except Exception as e:
+                msg["error"] = f"{type(e).__name__}: {e}"
+            emit(msg)
+    return work
@@ -0,0 +1,211 @@
+"""
+Parallel image extraction from PDF reports.
+
+Page ranges are spread over a process pool and each worker opens its own
+fitz document. Within a range an image shared by several pages (the same
+xref, e.g. a logo) is extracted once, and images with identical bytes are
+saved once. Across ranges the parent drops later copies by content hash,
+so every distinct image ends up on disk exactly once. Metadata rows are
+streamed to CSV or Parquet as ranges finish, in page order, instead of
+being collected for one final spreadsheet.
+
+    python pdf_extract.py report.pdf OUTPUT_FOLDER [--workers 4] [--format parquet]
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only needed for --format parquet
+    pa = pq = None
+
+PAGES_PER_TASK = 16
+METADATA_NAME = "image_metadata"
+COLUMNS = [
+    "Page", "Image Number", "Filename", "Width (px)", "Height (px)", "Extension",
+    "Color Space", "Bits per Component", "File Path", "Xref", "Content Hash", "Duplicate Of",
+]
+
+# ------------------ Workers ------------------
+
+def page_ranges(n_pages, size=PAGES_PER_TASK):
+    return [(first, min(first + size, n_pages)) for first in range(0, n_pages, size)]
+
+
+def extract_page_range(pdf_path, first, last, output_dir):
+    """
+    Runs in a worker process. Extracts the images on pages [first, last) and
+    returns one metadata row per image occurrence.
+    """
+    rows = []
+    by_xref = {}  # xref -> row of its first occurrence in this range
+    by_hash = {}  # content hash -> filename saved in this range
+    with fitz.open(pdf_path) as doc:
+        for page_index in range(first, last):
+            for img_index, img in enumerate(doc[page_index].get_images(full=True)):
+                xref = img[0]
+                row = {"Page": page_index + 1, "Image Number": img_index + 1, "Xref": xref}
+                seen = by_xref.get(xref)
+                if seen is not None:
+                    rows.append({**seen, **row, "Duplicate Of": seen["Filename"]})
+                    continue
+
+                base_image = doc.extract_image(xref)
+                if not base_image:
+                    continue  # masks and unsupported image types
+                image_bytes = base_image["image"]
+                digest = hashlib.sha1(image_bytes).hexdigest()
+                filename = f"page{page_index + 1}_img{img_index + 1}.{base_image['ext']}"
+                duplicate_of = by_hash.get(digest, "")
+                if duplicate_of:
+                    filename = duplicate_of
+                else:
+                    with open(os.path.join(output_dir, filename), "wb") as f:
+                        f.write(image_bytes)
+                    by_hash[digest] = filename
+
+                row.update({
+                    "Filename": filename,
+                    "Width (px)": base_image["width"],
+                    "Height (px)": base_image["height"],
+                    "Extension": base_image["ext"],
+                    "Color Space": base_image["colorspace"],
+                    "Bits per Component": base_image["bpc"],
+                    "File Path": os.path.join(output_dir, filename),
+                    "Content Hash": digest,
+                    "Duplicate Of": duplicate_of,
+                })
+                by_xref[xref] = row
+                rows.append(row)
+    return rows
+
+# ------------------ Output ------------------
+
+class MetadataWriter:
+    """Streams metadata rows to a CSV file or, with pyarrow, a Parquet file."""
+
+    def __init__(self, output_dir, fmt="csv"):
+        if fmt not in ("csv", "parquet"):
+            raise ValueError(f"Unknown format {fmt!r}, expected 'csv' or 'parquet'")
+        if fmt == "parquet" and pq is None:
+            raise ImportError("pyarrow is required for Parquet output (pip install pyarrow)")
+        self.fmt = fmt
+        self.path = os.path.join(output_dir, f"{METADATA_NAME}.{fmt}")
+        self._fh = self._writer = None
+        if fmt == "csv":
+            self._fh = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._fh, fieldnames=COLUMNS)
+            self._writer.writeheader()
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self.fmt == "csv":
+            self._writer.writerows(rows)
+            self._fh.flush()
+            return
+        table = pa.Table.from_pylist([{c: r[c] for c in COLUMNS} for r in rows])
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self):
+        if self.fmt == "csv":
+            self._fh.close()
+        elif self._writer is not None:
+            self._writer.close()
+        else:
+            # No images at all: still leave an (empty) file behind
+            pq.write_table(pa.Table.from_pylist([], schema=pa.schema([(c, pa.string()) for c in COLUMNS])), self.path)
+
+# ------------------ Main ------------------
+
+def extract_pdf_images(pdf_path, output_dir, workers=None, fmt="csv", progress=None,
+                       pages_per_task=PAGES_PER_TASK):
+    """
+    Extracts every image in the PDF into output_dir and writes
+    image_metadata.csv (or .parquet) next to them. progress, if given, is
+    called as progress(pages_done, total_pages, images) after each range.
+    Returns a summary dict.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    with fitz.open(pdf_path) as doc:
+        n_pages = len(doc)
+    ranges = page_ranges(n_pages, pages_per_task)
+
+    writer = MetadataWriter(output_dir, fmt)
+    first_by_hash = {}  # content hash -> filename kept on disk
+    images = duplicates = pages_done = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(extract_page_range, pdf_path, a, b, output_dir) for a, b in ranges]
+            # Consume in submission order so the metadata stays in page order
+            for (a, b), future in zip(ranges, futures):
+                rows = future.result()
+                for row in rows:
+                    kept = first_by_hash.setdefault(row["Content Hash"], row["Filename"])
+                    if kept != row["Filename"]:
+                        # Same bytes already saved by an earlier range
+                        if not row["Duplicate Of"]:
+                            os.remove(row["File Path"])
+                        row.update({"Filename": kept, "File Path": os.path.join(output_dir, kept),
+                                    "Duplicate Of": kept})
+                    duplicates += bool(row["Duplicate Of"])
+                writer.write(rows)
+                images += len(rows)
+                pages_done += b - a
+                if progress is not None:
+                    progress(pages_done, n_pages, images)
+    finally:
+        writer.close()
+
+    return {
+        "pages": n_pages,
+        "images": images,
+        "unique": images - duplicates,
+        "duplicates": duplicates,
+        "metadata_path": writer.path,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract every image from a PDF, in parallel.")
+    parser.add_argument("pdf")
+    parser.add_argument("output", help="folder for the images and the metadata file")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv", help="metadata file format")
+    parser.add_argument("--pages-per-task", type=int, default=PAGES_PER_TASK)
+    parser.add_argument("--json-progress", action="store_true",
+                        help="print progress and the summary as JSON lines (used by the GUI)")
+    args = parser.parse_args(argv)
+
+    if args.json_progress:
+        def progress(done, total, images):
+            print(json.dumps({"pages_done": done, "pages": total, "images": images}), flush=True)
+    else:
+        def progress(done, total, images):
+            print(f"  {done}/{total} pages, {images} images", flush=True)
+
+    summary = extract_pdf_images(args.pdf, args.output, args.workers, args.format, progress, args.pages_per_task)
+    if args.json_progress:
+        print(json.dumps({"done": True, **summary}), flush=True)
+    else:
+        print(f"✅ Extracted {summary['images']} images ({summary['unique']} unique, "
+              f"{summary['duplicates']} duplicates) from {summary['pages']} pages in {summary['seconds']:.1f} s")
+        print(f"🧾 Metadata: {summary['metadata_path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
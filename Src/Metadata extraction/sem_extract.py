@@ -0,0 +1,125 @@
+from PIL import Image
+from pathlib import Path
+import xml.etree.ElementTree as ET
+import json, re
+from sem_meta import SEMMeta
+from jeol_sidecar import read_sidecar, typed_values, jsonable
+
+# Metadata extraction helpers shared by the GUI (app.py) and batch tools.
+# Nothing in here touches Tkinter, so it can be imported headless.
+
+# ------------------ Helper Functions ------------------
+
+def strip_ns_key(key): return key.split('}')[-1] if '}' in key else key
+
+def xml_to_dict(elem):
+    children = list(elem)
+    if not children:
+        t = elem.text.strip() if elem.text and elem.text.strip() else None
+        return t
+    r = {}
+    for c in children:
+        d = xml_to_dict(c)
+        t = strip_ns_key(c.tag)
+        if t in r:
+            if not isinstance(r[t], list): r[t] = [r[t]]
+            r[t].append(d)
+        else:
+            r[t] = d
+    return r
+
+def strip_ns(d):
+    if isinstance(d, dict):  return {strip_ns_key(k): strip_ns(v) for k,v in d.items()}
+    if isinstance(d, list):  return [strip_ns(i) for i in d]
+    return d
+
+# ------------------ Value Normalisation ------------------
+# Values are classified up front instead of trial-parsing every string as XML
+# and round-tripping everything through json.dumps. Namespaces are stripped
+# while the dicts are built, so the result needs no second walk.
+
+JSON_SCALARS = (str, int, float, bool)
+XML_START = re.compile(r"[\s\ufeff]*<")  # an XML document can only start with "<"
+
+def _looks_like_xml(s):
+    return XML_START.match(s) is not None
+
+def _parse_xml(s):
+    try: r=ET.fromstring(s)
+    except ET.ParseError: return None
+    return {strip_ns_key(r.tag):xml_to_dict(r)}
+
+def _parse_kv(s):
+    kv={}
+    for line in s.splitlines():
+        k,sep,val=line.partition("=")
+        if sep: kv[strip_ns_key(k.strip())]=val.strip()
+    return {"plain":kv} if kv else None
+
+def _parse_text(s):
+    if _looks_like_xml(s):
+        r=_parse_xml(s)
+        if r is not None: return r
+    if "=" in s:
+        r=_parse_kv(s)
+        if r is not None: return r
+    return s
+
+def parse_value(v):
+    t=type(v)
+    if t is str: return _parse_text(v)
+    if v is None or t in JSON_SCALARS: return v
+    if t is tuple or t is list:
+        # Long runs of plain numbers (offsets, counts, colour maps) skip recursion
+        if all(type(i) is int or type(i) is float for i in v): return list(v)
+        return [parse_value(i) for i in v]
+    if t is bytes: return _parse_text(v.decode("utf-8",errors="ignore"))
+    if isinstance(v,str): return _parse_text(str(v))
+    # Anything else (e.g. IFDRational) is kept only if JSON can encode it
+    try: json.dumps(v)
+    except (TypeError, ValueError): return None
+    return strip_ns(v) if isinstance(v,(dict,list,tuple)) else v
+
+def _parse_vendor_text(v):
+    # Vendor blocks arrive as a 1-tuple of str (or bytes), go straight to text parsing
+    if type(v) is tuple and all(type(i) is str for i in v): return [_parse_text(i) for i in v]
+    return parse_value(v)
+
+# Known SEM vendor text tags by tag id, everything else goes through parse_value
+TAG_PARSERS = {
+    270: _parse_vendor_text,    # ImageDescription (FEI/Tescan key=value, sometimes XML)
+    700: _parse_vendor_text,    # XMP packet (XML)
+    34118: _parse_vendor_text,  # Zeiss SEM text (key = value) / Fibics XML
+    34680: _parse_vendor_text,  # FEI SFEG (INI style)
+    34682: _parse_vendor_text,  # FEI Helios (INI style)
+}
+
+def convert_meta_to_json(meta):
+    c={}
+    for k,v in meta.items():
+        try: c[str(k)]=TAG_PARSERS.get(k,parse_value)(v)
+        except Exception: c[str(k)]=None
+    return c
+
+def parse_jeol_metadata(meta_path):
+    # Raw key -> value strings; jeol_sidecar.py does the single-pass tokenizing
+    try: d,_=read_sidecar(meta_path)
+    except Exception as e: d={"Error":f"Failed to parse metadata: {e}"}
+    return d
+
+# ------------------ SEM Extraction ------------------
+
+def extract_from_image(image_path):
+    with Image.open(image_path) as im:
+        meta,_=SEMMeta.ImageMetadata(im)
+        return {"image":Path(image_path).name,"metadata":convert_meta_to_json(meta)}
+
+def extract_from_image_and_text(image_path,meta_path):
+    m=parse_jeol_metadata(meta_path)
+    v=typed_values(m)
+    b=Path(image_path).stem
+    mach=m.get("CM_INSTRUMENT","Unknown").strip()
+    date=m.get("CM_DATE","Unknown").replace("/","-")  # as written, so file names stay as they were
+    u=f"{b}_{mach}_{date}"
+    return {"id":b,"image_file":f"{u}.tif","metadata_file":f"{u}.txt",
+            "machine":mach,"date_taken":date,"metadata":m,"values":jsonable(v)}
@@ -0,0 +1,206 @@
+"""
+Header-only TIFF metadata reads, for local files and HTTP URLs.
+
+PIL only needs the TIFF header and the IFD entries (plus the tag values
+they point to) to build `img.tag`. Pixel data is never touched until the
+image is loaded. RangeFile gives PIL a seekable file object that fetches
+just those byte ranges, either from a memory map or with HTTP Range
+requests, and counts every byte it pulls in. The metadata therefore comes
+out exactly as extract_from_image produces it, without streaming
+multi-hundred-MB images over a network share or from the image server.
+
+    python tiff_header.py image.tif https://host/images/sample.tif
+"""
+import io
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from PIL import Image
+from sem_meta import SEMMeta
+
+from sem_extract import convert_meta_to_json
+
+BLOCK_SIZE = 64 * 1024  # header + IFD of most SEM TIFFs fit in one block
+HTTP_TIMEOUT = 10
+
+
+def is_url(source):
+    return urlsplit(str(source)).scheme in ("http", "https")
+
+
+class RangeFile(io.RawIOBase):
+    """
+    Read-only, seekable file object over a local path (memory-mapped) or an
+    HTTP(S) URL. Remote data is fetched in fixed-size blocks with Range
+    requests and cached, so PIL's many small reads cost a few round trips.
+    bytes_read counts what was actually read or downloaded.
+    """
+
+    def __init__(self, source, block_size=BLOCK_SIZE, session=None):
+        super().__init__()
+        self.source = str(source)
+        self.block_size = block_size
+        self.bytes_read = 0
+        self.requests = 0
+        self._pos = 0
+        self._blocks = {}
+        self._size = None
+        self._whole = None  # full body, only when a server ignores Range
+        if is_url(self.source):
+            self._http = session or requests.Session()
+            self._owns_session = session is None
+            self._mm = self._fh = None
+        else:
+            self._http = None
+            self._fh = open(self.source, "rb")
+            self._size = os.fstat(self._fh.fileno()).st_size
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+
+    def __repr__(self):
+        return f"<RangeFile {self.source!r}>"
+
+    # -- io.RawIOBase interface --
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self._total_size() + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}")
+        return self._pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = max(0, self._total_size() - self._pos)
+        if self._http is None:
+            # Local files: slice the memory map directly, the OS pages in what is touched
+            data = self._mm[self._pos:self._pos + size] if self._mm is not None else b""
+            self._pos += len(data)
+            self.bytes_read += len(data)
+            return data
+        out = bytearray()
+        while size > 0:
+            index, offset = divmod(self._pos, self.block_size)
+            block = self._block(index)
+            chunk = block[offset:offset + size]
+            if not chunk:
+                break  # end of file
+            out += chunk
+            self._pos += len(chunk)
+            size -= len(chunk)
+        return bytes(out)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        if self._fh is not None:
+            self._fh.close()
+        if self._http is not None and self._owns_session:
+            self._http.close()
+        super().close()
+
+    # -- block fetching --
+
+    def _total_size(self):
+        if self._size is None:
+            self._block(0)  # a ranged response reports the total size
+        return self._size or 0
+
+    def _block(self, index):
+        block = self._blocks.get(index)
+        if block is not None:
+            return block
+        start = index * self.block_size
+        if self._whole is not None:
+            return self._whole[start:start + self.block_size]
+        if self._size is not None and start >= self._size:
+            return b""  # past the end, nothing to ask the server for
+        block = self._fetch_range(start, start + self.block_size - 1)
+        if self._whole is not None:
+            return block
+        self.bytes_read += len(block)
+        self.requests += 1
+        self._blocks[index] = block
+        return block
+
+    def _fetch_range(self, first, last):
+        r = self._http.get(self.source, headers={"Range": f"bytes={first}-{last}"}, timeout=HTTP_TIMEOUT)
+        if r.status_code == 416:
+            return b""
+        r.raise_for_status()
+        if r.status_code == 206:
+            total = r.headers.get("Content-Range", "").rpartition("/")[2]
+            if total.isdigit():
+                self._size = int(total)
+            return r.content
+        # 200: the server ignored the Range header and sent the whole file
+        self._whole = r.content
+        self._size = len(self._whole)
+        self.bytes_read += self._size
+        self.requests += 1
+        return self._whole[first:last + 1]
+
+
+def read_header_tags(source, block_size=BLOCK_SIZE, session=None):
+    """
+    Returns (tags, bytes_read) for a local TIFF path or an HTTP(S) URL,
+    where tags is the same mapping SEMMeta.ImageMetadata returns.
+    """
+    with RangeFile(source, block_size, session) as f:
+        with Image.open(f) as im:
+            meta, _ = SEMMeta.ImageMetadata(im)
+            tags = dict(meta)
+        return tags, f.bytes_read
+
+
+def extract_header_only(source, block_size=BLOCK_SIZE, session=None):
+    """
+    Header-only counterpart of extract_from_image. Returns (record, bytes_read)
+    where record has the same {"image", "metadata"} shape.
+    """
+    tags, bytes_read = read_header_tags(source, block_size, session)
+    name = Path(urlsplit(str(source)).path).name if is_url(source) else Path(source).name
+    return {"image": name, "metadata": convert_meta_to_json(tags)}, bytes_read
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(__doc__.strip().splitlines()[-1].strip())
+        return 2
+    status = 0
+    for source in argv:
+        try:
+            record, bytes_read = extract_header_only(source)
+            print(json.dumps(record, indent=2))
+            print(f"# {source}: {bytes_read} bytes read", file=sys.stderr)
+        except Exception as e:
+            print(f"❌ {source}: {e}", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Batch pixel-length inference with a saved ViT scale model.
+
+Loads the model once and streams images through a tf.data pipeline: files
+are decoded in parallel, grouped into batches of one image shape (the model
+takes whole images, so a batch has to be rectangular) and prefetched while
+the previous batch is on the CPU. The model is wrapped in one tf.function
+with an open image-size signature, so new image sizes do not retrace it.
+
+Predictions (nm per pixel) are appended to a CSV file or to an
+ImagePrediction table, and with --resume images that already have a
+prediction are skipped, so an interrupted archive backfill can continue.
+
+    python batch_inference.py best_hd_model_frozen.keras SEM_DATA/ --output predictions.csv
+    python batch_inference.py best_hd_model_frozen.keras results.ndjson --db sqlite:///predictions.db --resume
+"""
+import argparse
+import csv
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+try:
+    from sqlalchemy import create_engine, text
+except ImportError:  # optional, only needed for --db
+    create_engine = text = None
+
+from image_io import list_inputs, read_gray
+from model_layers import load_model
+
+DEFAULT_BATCH_SIZE = 16
+SHAPE_KEY_BASE = 1_000_000  # shape key = height * base + width
+OUTPUT_COLUMNS = ["path", "height", "width", "pixel_length_nm", "model", "predicted_at"]
+PREDICTION_TABLE = """CREATE TABLE IF NOT EXISTS ImagePrediction (
+    path TEXT NOT NULL, height INTEGER, width INTEGER, pixel_length_nm DOUBLE PRECISION,
+    model TEXT, predicted_at TEXT)"""
+
+# ------------------ Pipeline ------------------
+
+def make_dataset(paths, batch_size=DEFAULT_BATCH_SIZE, errors=None, reader=read_gray):
+    """
+    tf.data pipeline yielding (paths, images) batches, images shaped
+    (n, height, width, 1) float32 with one shape per batch. Unreadable files
+    are dropped and recorded in errors (a dict path -> message) if given.
+    reader turns a path into a 2-D uint8 array.
+    """
+    def load(path):
+        path = path.decode()
+        try:
+            return reader(path)
+        except Exception as e:
+            if errors is not None:
+                errors[path] = f"{type(e).__name__}: {e}"
+            return np.zeros((0, 0), np.uint8)
+
+    def decode(path):
+        image = tf.numpy_function(load, [path], tf.uint8)
+        image.set_shape([None, None])
+        return path, image
+
+    def shape_key(path, image):
+        shape = tf.shape(image, out_type=tf.int64)
+        return shape[0] * SHAPE_KEY_BASE + shape[1]
+
+    def to_float(paths, images):
+        return paths, tf.cast(images, tf.float32)[..., tf.newaxis]
+
+    ds = tf.data.Dataset.from_tensor_slices(tf.constant(paths, dtype=tf.string))
+    ds = ds.map(decode, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+    ds = ds.filter(lambda path, image: tf.size(image) > 0)
+    ds = ds.group_by_window(
+        key_func=shape_key,
+        reduce_func=lambda key, window: window.batch(batch_size),
+        window_size=batch_size,
+    )
+    return ds.map(to_float, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+
+def compile_predict(model):
+    """One concrete function for every image size and batch size."""
+    @tf.function(input_signature=[tf.TensorSpec([None, None, None, 1], tf.float32)])
+    def predict(images):
+        return model(images, training=False)
+
+    return predict
+
+# ------------------ Output ------------------
+
+class CsvOutput:
+    def __init__(self, path):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._fh = open(path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._fh, fieldnames=OUTPUT_COLUMNS)
+        if new:
+            self._writer.writeheader()
+
+    def done(self):
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return {row["path"] for row in csv.DictReader(f)}
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+class DbOutput:
+    """Appends to an ImagePrediction table, one transaction per batch."""
+
+    def __init__(self, url):
+        if create_engine is None:
+            raise ImportError("sqlalchemy is required for database output (pip install sqlalchemy)")
+        self.engine = create_engine(url)
+        with self.engine.begin() as conn:
+            conn.execute(text(PREDICTION_TABLE))
+
+    def done(self):
+        with self.engine.connect() as conn:
+            return {r[0] for r in conn.execute(text("SELECT DISTINCT path FROM ImagePrediction"))}
+
+    def write(self, rows):
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"INSERT INTO ImagePrediction ({', '.join(OUTPUT_COLUMNS)}) "
+                f"VALUES ({', '.join(':' + c for c in OUTPUT_COLUMNS)})"), rows)
+
+    def close(self):
+        self.engine.dispose()
+
+# ------------------ Main ------------------
+
+def run(model_path, sources, output, batch_size=DEFAULT_BATCH_SIZE, resume=False, progress=None):
+    """
+    Predicts every input image and writes the rows to output (a CsvOutput
+    or DbOutput). Returns a summary dict with throughput and batch latency
+    percentiles. progress, if given, is called as progress(done, total).
+    """
+    paths = list_inputs(sources)
+    total_inputs = len(paths)
+    if resume:
+        done = output.done()
+        paths = [p for p in paths if p not in done]
+
+    model = load_model(model_path)
+    predict = compile_predict(model)
+    model_name = os.path.basename(model_path)
+
+    errors = {}
+    latencies = []  # seconds per batch, model call only
+    images = 0
+    start = time.perf_counter()
+    for batch_paths, batch in make_dataset(paths, batch_size, errors):
+        t = time.perf_counter()
+        pred = predict(batch).numpy().reshape(-1)
+        latencies.append(time.perf_counter() - t)
+
+        _, height, width, _ = batch.shape
+        stamp = datetime.datetime.now().isoformat(timespec="seconds")
+        output.write([
+            {"path": p.decode(), "height": height, "width": width, "pixel_length_nm": float(v),
+             "model": model_name, "predicted_at": stamp}
+            for p, v in zip(batch_paths.numpy(), pred)
+        ])
+        images += len(pred)
+        if progress is not None:
+            progress(images + len(errors), len(paths))
+    elapsed = time.perf_counter() - start
+
+    lat = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "inputs": total_inputs,
+        "skipped": total_inputs - len(paths),
+        "images": images,
+        "failed": len(errors),
+        "errors": errors,
+        "batches": len(latencies),
+        "seconds": elapsed,
+        "images_per_s": images / elapsed if elapsed else 0.0,
+        "batch_p50_ms": float(np.percentile(lat, 50)),
+        "batch_p99_ms": float(np.percentile(lat, 99)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict pixel lengths for a directory or manifest of SEM images.")
+    parser.add_argument("model", help="saved .keras model, e.g. best_hd_model_frozen.keras")
+    parser.add_argument("inputs", nargs="+", help="image folders, images, or manifests (.txt, .csv, .ndjson)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("-o", "--output", help="CSV file to append predictions to")
+    target.add_argument("--db", help="SQLAlchemy URL; predictions go to the ImagePrediction table")
+    parser.add_argument("-b", "--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--resume", action="store_true", help="skip images that already have a prediction")
+    args = parser.parse_args(argv)
+
+    output = DbOutput(args.db) if args.db else CsvOutput(args.output)
+
+    def progress(done, total):
+        print(f"  {done}/{total} images", end="\r", flush=True)
+
+    try:
+        summary = run(args.model, args.inputs, output, args.batch_size, args.resume, progress)
+    finally:
+        output.close()
+
+    print()
+    for path, error in summary["errors"].items():
+        print(f"⚠️ {path}: {error}")
+    print(f"✅ Predicted {summary['images']} images in {summary['batches']} batches "
+          f"({summary['skipped']} already done, {summary['failed']} failed)")
+    print(f"⏱️ {summary['images_per_s']:.1f} images/s, batch latency "
+          f"p50 {summary['batch_p50_ms']:.0f} ms, p99 {summary['batch_p99_ms']:.0f} ms")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Offline ViT embeddings of every SampleImage, for the map's "similar images".
+
+The pixel-length models pool the ViT backbone's tokens into one vector per
+image before the regression head: GlobalAveragePooling1D in Model.ipynb,
+the class token in Capstone_Project_high_definition.ipynb. In both, that
+vector is the input of the first BatchNormalization layer, and
+embedding_model() cuts a saved model there. Every SampleImage runs through
+it with the batch_inference.py pipeline (parallel decode, one image shape
+per batch, a single traced function). The vectors go into the similarity
+index the map reads (Src/Map Interface/similarity.py): a float16 matrix
+plus an inverted-file index.
+
+Runs are incremental. Images already in the index are not embedded again,
+new ones join their nearest index list, and images deleted from the
+database are dropped. --rebuild embeds everything again.
+
+    python embed_images.py best_hd_model_frozen.keras SIMILARITY_DIR
+    python embed_images.py best_hd_model_frozen.keras SIMILARITY_DIR --db sqlite:///standin.db \\
+        --url-prefix https://data.example.org/sem/ --root SEM_DATA/
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+import tensorflow as tf
+from sqlalchemy import create_engine, text
+
+from batch_inference import DEFAULT_BATCH_SIZE, make_dataset
+from image_io import read_gray
+from model_layers import load_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Map Interface"))
+from similarity import SimilarityIndex  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Common"))
+from database import engine_from_env  # noqa: E402
+
+HTTP_TIMEOUT = 30
+IMAGES_QUERY = text("""
+    SELECT si.id AS image_id, si.sample_id, si.caption, si.image_url AS path
+    FROM SampleImage si
+    ORDER BY si.id
+""")
+
+# ------------------ Model ------------------
+
+def embedding_model(model):
+    """The saved model cut at the pooled backbone output (input of the first BatchNormalization)."""
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.layers.BatchNormalization):
+            return tf.keras.Model(model.inputs, layer.input, name="embedding")
+    raise ValueError("No BatchNormalization layer after the backbone; not a pixel-length model?")
+
+
+def compile_embed(model):
+    """One concrete function for every image size and batch size, as in batch_inference."""
+    @tf.function(input_signature=[tf.TensorSpec([None, None, None, 1], tf.float32)])
+    def embed(images):
+        return model(images, training=False)
+
+    return embed
+
+# ------------------ Images ------------------
+
+class ImageReader:
+    """
+    Reads SampleImage URLs: below url_prefix from the local root, other
+    http(s) URLs by download, anything else as a local path.
+    """
+
+    def __init__(self, root=None, url_prefix=None):
+        self.root = Path(root) if root else None
+        self.url_prefix = url_prefix.rstrip("/") + "/" if url_prefix else None
+        self._http = requests.Session()
+
+    def __call__(self, url):
+        if self.root is not None and self.url_prefix and url.startswith(self.url_prefix):
+            return read_gray(self.root / url[len(self.url_prefix):])
+        if url.startswith(("http://", "https://")):
+            response = self._http.get(url, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            return read_gray(io.BytesIO(response.content))
+        return read_gray(url)
+
+
+# ------------------ Main ------------------
+
+def embed_images(embed, images, reader, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Embeds the rows of images (image_id, sample_id, caption, path). Returns
+    (vectors float16, the rows embedded, errors {path: message}).
+    """
+    rows_by_path = {}
+    for i, path in enumerate(images["path"]):
+        rows_by_path.setdefault(path, []).append(i)
+    errors, vectors, rows = {}, [], []
+    for batch_paths, batch in make_dataset(list(rows_by_path), batch_size, errors, reader):
+        out = embed(batch).numpy().astype(np.float16)
+        for p, v in zip(batch_paths.numpy(), out):
+            for i in rows_by_path[p.decode()]:  # images sharing a URL share a vector
+                rows.append(i)
+                vectors.append(v)
+        if progress is not None:
+            progress(len(rows) + len(errors), len(images))
+    order = np.argsort(rows, kind="stable")
+    embedded = images.iloc[np.asarray(rows, dtype=np.int64)[order]].reset_index(drop=True)
+    return (np.stack(vectors)[order] if vectors else np.zeros((0, 0), np.float16)), embedded, errors
+
+
+def update_index(model_path, index_dir, engine, reader, batch_size=DEFAULT_BATCH_SIZE, rebuild=False,
+                 progress=None):
+    """
+    Brings the index under index_dir up to date with SampleImage. Returns a
+    summary dict.
+    """
+    with engine.connect() as conn:
+        catalogue = pd.read_sql(IMAGES_QUERY, conn)
+    catalogue = catalogue[catalogue["path"].notna()].reset_index(drop=True)
+
+    index = None
+    if not rebuild:
+        try:
+            index = SimilarityIndex.load(index_dir, mmap=False)
+        except FileNotFoundError:
+            pass
+    model_name = os.path.basename(model_path)
+    if index is not None and index.model != model_name:
+        print(f"⚠️ Index was built with {index.model}, re-embedding everything with {model_name}")
+        index = None
+
+    removed = 0
+    if index is not None:
+        gone = index.image_ids[~np.isin(index.image_ids, catalogue["image_id"].to_numpy())]
+        removed = len(gone)
+        index.remove(gone)
+        new = catalogue[~catalogue["image_id"].isin(index.image_ids)]
+        index.relabel(catalogue)  # captions and sample links may have changed
+    else:
+        new = catalogue
+
+    start = time.perf_counter()
+    vectors, embedded, errors = np.zeros((0, 0), np.float16), new.iloc[:0], {}
+    if len(new):
+        embed = compile_embed(embedding_model(load_model(model_path)))
+        vectors, embedded, errors = embed_images(embed, new.reset_index(drop=True), reader, batch_size, progress)
+    elapsed = time.perf_counter() - start
+
+    if len(embedded):
+        if index is None:
+            index = SimilarityIndex.build(vectors, embedded["image_id"], embedded["sample_id"], embedded,
+                                          model=model_name)
+        else:
+            index.add(vectors, embedded["image_id"], embedded["sample_id"], embedded)
+    if index is not None:
+        index.save(index_dir)
+    return {
+        "images": len(catalogue),
+        "embedded": len(embedded),
+        "removed": removed,
+        "failed": len(errors),
+        "errors": errors,
+        "indexed": 0 if index is None else len(index),
+        "lists": None if index is None or index.centroids is None else len(index.centroids),
+        "images_per_s": len(embedded) / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embed every SampleImage and update the map's similarity index.")
+    parser.add_argument("model", help="saved .keras model, e.g. best_hd_model_frozen.keras")
+    parser.add_argument("index_dir", help="similarity index folder (MAP_SIMILARITY_DIR)")
+    parser.add_argument("--db", help="SQLAlchemy URL (default: PostgreSQL from DB_* in .env)")
+    parser.add_argument("--root", help="local folder holding the images below --url-prefix")
+    parser.add_argument("--url-prefix", help="URL prefix that maps to --root")
+    parser.add_argument("-b", "--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--rebuild", action="store_true", help="embed every image again")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.db) if args.db else engine_from_env()
+
+    def progress(done, total):
+        print(f"  {done}/{total} images", end="\r", flush=True)
+
+    summary = update_index(args.model, args.index_dir, engine, ImageReader(args.root, args.url_prefix),
+                           args.batch_size, args.rebuild, progress)
+    print()
+    for path, error in summary["errors"].items():
+        print(f"⚠️ {path}: {error}")
+    print(f"✅ {summary['indexed']} images indexed ({summary['embedded']} embedded, {summary['removed']} removed, "
+          f"{summary['failed']} failed), {summary['lists'] or 'no'} index lists")
+    if summary["embedded"]:
+        print(f"⏱️ {summary['images_per_s']:.1f} images/s")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
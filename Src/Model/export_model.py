@@ -0,0 +1,172 @@
+"""
+Quantized TFLite export of the pixel-length model, with an accuracy and
+speed report against the float model.
+
+Modes:
+- dynamic: int8 weights, float activations (no calibration data needed)
+- float16: float16 weights
+- int8:    int8 weights and activations, calibrated on SEM crops from the
+           training dataset; ops without an int8 kernel stay in float
+
+The local-attention encoder uses ExtractImagePatches, which has no TFLite
+builtin, so the converter is allowed to fall back to TensorFlow ops (the
+Flex delegate, included in the tensorflow pip package).
+
+    python export_model.py best_hd_model_frozen.keras SEM_DATASET/ --mode int8 --output hd_int8.tflite
+    python export_model.py best_hd_model_frozen.keras SEM_DATASET/ --report-only hd_int8.tflite
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from model_layers import load_model
+from training_data import ShardedDataset
+
+MODES = ("dynamic", "float16", "int8")
+CALIBRATION_IMAGES = 100
+# ShardedDataset.split with these reproduces the notebooks'
+# train_test_split(test_size=0.1, random_state=42), so the report only uses
+# images the model was not trained on
+VAL_FRACTION = 0.1
+SPLIT_SEED = 42
+
+# ------------------ Export ------------------
+
+def representative_images(dataset, positions, n=CALIBRATION_IMAGES, seed=0):
+    """Calibration generator for int8: n training crops, one per step."""
+    chosen = np.random.default_rng(seed).choice(positions, size=min(n, len(positions)), replace=False)
+
+    def generator():
+        for p in chosen:
+            images, _ = dataset.gather([p])
+            yield [images[..., np.newaxis].astype(np.float32)]
+
+    return generator
+
+
+def convert(model, mode="dynamic", representative=None):
+    """Returns the .tflite flatbuffer for model in the given quantization mode."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+
+    # Batch of one, any image size: the interpreter is resized per image shape
+    @tf.function(input_signature=[tf.TensorSpec([1, None, None, 1], tf.float32)])
+    def serve(images):
+        return model(images, training=False)
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([serve.get_concrete_function()], model)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8":
+        if representative is None:
+            raise ValueError("int8 quantization needs representative images")
+        converter.representative_dataset = representative
+    return converter.convert()
+
+# ------------------ Inference ------------------
+
+class TfliteModel:
+    """Runs a .tflite pixel-length model one image at a time."""
+
+    def __init__(self, path, threads=None):
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=threads)
+        self.input = self.interpreter.get_input_details()[0]["index"]
+        self.output = self.interpreter.get_output_details()[0]["index"]
+        self.shape = None
+
+    def predict(self, image):
+        """image: (height, width) or (height, width, 1) -> pixel length in nm."""
+        x = np.asarray(image, dtype=np.float32).reshape((1,) + np.shape(image)[:2] + (1,))
+        if x.shape != self.shape:
+            self.interpreter.resize_tensor_input(self.input, x.shape)
+            self.interpreter.allocate_tensors()
+            self.shape = x.shape
+        self.interpreter.set_tensor(self.input, x)
+        self.interpreter.invoke()
+        return float(self.interpreter.get_tensor(self.output).reshape(-1)[0])
+
+# ------------------ Report ------------------
+
+def evaluate(predict, dataset, positions):
+    """MAPE (%) and per-image latencies (ms) of predict over positions."""
+    preds, latencies = [], []
+    for p in positions:
+        images, _ = dataset.gather([p])
+        start = time.perf_counter()
+        preds.append(predict(images[0]))
+        latencies.append((time.perf_counter() - start) * 1000)
+    labels = dataset.labels[positions]
+    mape = float(np.mean(np.abs((np.array(preds) - labels) / labels)) * 100)
+    return {
+        "mape": mape,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def report(model_path, tflite_path, dataset, max_images=None, threads=None):
+    """Compares the float Keras model with the .tflite model on the validation split."""
+    _, val = dataset.split(VAL_FRACTION, SPLIT_SEED)
+    if max_images:
+        val = val[:max_images]
+
+    model = load_model(model_path)
+    serve = tf.function(lambda x: model(x, training=False),
+                        input_signature=[tf.TensorSpec([1, None, None, 1], tf.float32)])
+    float_result = evaluate(
+        lambda image: float(serve(image[np.newaxis, ..., np.newaxis].astype(np.float32)).numpy().reshape(-1)[0]),
+        dataset, val)
+    lite = TfliteModel(tflite_path, threads)
+    lite_result = evaluate(lite.predict, dataset, val)
+
+    float_result["size_mb"] = os.path.getsize(model_path) / 1e6
+    lite_result["size_mb"] = os.path.getsize(tflite_path) / 1e6
+    return {"images": len(val), "float": float_result, "tflite": lite_result}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a quantized TFLite pixel-length model and compare it.")
+    parser.add_argument("model", help="saved .keras model")
+    parser.add_argument("dataset", help="training_data.py dataset (calibration and validation split)")
+    parser.add_argument("--mode", choices=MODES, default="dynamic")
+    parser.add_argument("-o", "--output", help="output .tflite path (default: next to the model)")
+    parser.add_argument("--report-only", metavar="TFLITE", help="skip the export and report on this model")
+    parser.add_argument("--calibration-images", type=int, default=CALIBRATION_IMAGES)
+    parser.add_argument("--max-images", type=int, default=None, help="limit the validation images in the report")
+    parser.add_argument("--threads", type=int, default=None, help="TFLite interpreter threads")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    dataset = ShardedDataset(args.dataset)
+    tflite_path = args.report_only
+    if tflite_path is None:
+        tflite_path = args.output or os.path.splitext(args.model)[0] + f"_{args.mode}.tflite"
+        train, _ = dataset.split(VAL_FRACTION, SPLIT_SEED)
+        representative = representative_images(dataset, train, args.calibration_images)
+        start = time.perf_counter()
+        flatbuffer = convert(load_model(args.model), args.mode, representative)
+        with open(tflite_path, "wb") as f:
+            f.write(flatbuffer)
+        print(f"✅ Wrote {tflite_path} ({len(flatbuffer) / 1e6:.1f} MB) in {time.perf_counter() - start:.0f} s")
+
+    result = report(args.model, tflite_path, dataset, args.max_images, args.threads)
+    print(f"Validation images: {result['images']}")
+    print(f"{'model':<8} | {'MAPE %':>7} | {'p50 ms':>7} | {'p99 ms':>7} | {'MB':>6}")
+    for name in ("float", "tflite"):
+        r = result[name]
+        print(f"{name:<8} | {r['mape']:>7.2f} | {r['p50_ms']:>7.1f} | {r['p99_ms']:>7.1f} | {r['size_mb']:>6.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
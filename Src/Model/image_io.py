@@ -0,0 +1,96 @@
+"""
+Image loading shared by the model tools. Kept free of TensorFlow so worker
+processes that only read images start quickly.
+"""
+import csv
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# The strip-wise TIFF reader is shared with the map interface
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Common"))
+from tiff_bands import can_stream, iter_bands, to_uint8  # noqa: E402
+
+IMAGE_EXTS = {".tif", ".tiff", ".bmp", ".jpg", ".jpeg", ".png"}
+
+
+def _streamable(path):
+    return isinstance(path, (str, Path)) and Path(path).suffix.lower() in (".tif", ".tiff") and can_stream(path)
+
+
+def read_gray(path):
+    """
+    Reads an image as a 2-D uint8 array, the way the notebooks'
+    cv2.imread(path, 0) does (16-bit images keep their high byte). TIFFs
+    go through the same band reader as iter_gray_rows, and other
+    high-bit-depth images through the same 8-bit mapping, so a whole image
+    and its streamed rows always have the same pixels.
+    """
+    if _streamable(path):
+        return np.concatenate([band for _, band in iter_bands(path, gray=True)])
+    with Image.open(path) as img:
+        if img.mode in ("I;16", "I;16B", "I;16L", "I"):
+            return to_uint8(np.asarray(img)[..., None], photometric=1, gray=True)
+        return np.asarray(img.convert("L"))
+
+
+def list_inputs(sources):
+    """
+    Image paths from directories (searched recursively), single images, or
+    manifests: .txt with one path per line, .csv with a "path" column, or the
+    NDJSON written by batch_extract.py.
+    """
+    paths = []
+    for source in sources:
+        p = Path(source)
+        if p.is_dir():
+            paths += sorted(str(f) for f in p.rglob("*") if f.is_file() and f.suffix.lower() in IMAGE_EXTS)
+        elif p.suffix.lower() in IMAGE_EXTS:
+            paths.append(str(p))
+        elif p.suffix.lower() == ".csv":
+            with open(p, newline="", encoding="utf-8") as f:
+                paths += [row["path"] for row in csv.DictReader(f) if row.get("path")]
+        elif p.suffix.lower() in (".ndjson", ".jsonl"):
+            with open(p, encoding="utf-8") as f:
+                paths += [json.loads(line)["path"] for line in f if line.strip()]
+        else:
+            with open(p, encoding="utf-8") as f:
+                paths += [line.strip() for line in f if line.strip()]
+    return list(dict.fromkeys(paths))  # drop repeats, keep order
+
+
+def image_shape(path):
+    """(height, width) without decoding the pixels."""
+    with Image.open(path) as img:
+        return img.height, img.width
+
+
+def iter_gray_rows(path, rows):
+    """
+    Yields (y, block) with block a full-width grey uint8 array of `rows`
+    rows (the last one may be shorter). TIFFs are streamed strip by strip,
+    so memory stays around one block whatever the image size; other formats
+    are decoded whole.
+    """
+    if _streamable(path):
+        bands = iter_bands(path, gray=True)
+        first = next(bands, None)
+        if first is not None:
+            y, buffer = 0, first[1]
+            for _, band in bands:
+                buffer = np.concatenate([buffer, band]) if len(buffer) else band
+                while len(buffer) >= rows:
+                    yield y, buffer[:rows]
+                    y, buffer = y + rows, buffer[rows:]
+            if len(buffer):
+                while len(buffer) > rows:
+                    yield y, buffer[:rows]
+                    y, buffer = y + rows, buffer[rows:]
+                yield y, buffer
+            return
+    image = read_gray(path)
+    for y in range(0, image.shape[0], rows):
+        yield y, image[y:y + rows]
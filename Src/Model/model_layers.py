@@ -0,0 +1,221 @@
+"""
+Custom layers of the pixel-length models, taken from the training notebooks.
+
+Model.ipynb uses Scale and Rescale; Capstone_Project_high_definition.ipynb
+adds the 256x256 single-channel patch embedding and the local-attention
+encoder. They are registered under the "MyLayers" package exactly as in the
+notebooks, so importing this module is enough for
+tf.keras.models.load_model to rebuild a saved model outside a notebook.
+"""
+import warnings
+
+import keras
+import tensorflow as tf
+from keras import ops
+from keras_hub.src.models.vit.vit_layers import MLP, ViTEncoder, ViTEncoderBlock, ViTPatchingAndEmbedding
+
+TRAIN_WIDTH = 885  # width of the training images, Scale corrects predictions for other widths
+
+
+# this model assumes all input images are 660X885
+# so I need to rescale the output
+@tf.keras.utils.register_keras_serializable(package="MyLayers", name="Scale")
+class Scale(tf.keras.layers.Layer):
+    def __init__(self, **kwargs):
+        super().__init__()
+
+    def call(self, inputs):
+        output = TRAIN_WIDTH / tf.keras.ops.shape(inputs)[-2]
+        output = tf.cast(output, tf.dtypes.float16)
+        output = tf.broadcast_to(output, [tf.shape(inputs)[0], 1])
+        return output
+
+
+@tf.keras.utils.register_keras_serializable(package="MyLayers", name="Rescale")
+class Rescale(tf.keras.layers.Layer):
+    # assume the scale is the last element of tensor
+    # put this layer after the output layer
+    def __init__(self, **kwargs):
+        super().__init__()
+
+    def call(self, inputs):
+        return tf.keras.ops.prod(inputs, axis=-1, keepdims=True)
+
+
+@tf.keras.utils.register_keras_serializable(package="MyLayers", name="ViTPEWithoutPos")
+class ViTPEWithoutPos(ViTPatchingAndEmbedding):
+    """Patch embedding without position embeddings, so any image size works."""
+
+    def build(self, input_shape):
+        super().build(input_shape)
+        self.position_embedding = None
+
+    def call(self, inputs):
+        patch_embeddings = self.patch_embedding(inputs)
+        if self.data_format == "channels_first":
+            patch_embeddings = ops.transpose(patch_embeddings, axes=(0, 2, 3, 1))
+        embeddings_shape = ops.shape(patch_embeddings)
+        patch_embeddings = ops.reshape(patch_embeddings, [embeddings_shape[0], -1, embeddings_shape[-1]])
+
+        if self.use_class_token:
+            class_token = ops.tile(self.class_token, (embeddings_shape[0], 1, 1))
+            patch_embeddings = ops.concatenate([class_token, patch_embeddings], axis=1)
+        return patch_embeddings
+
+
+@tf.keras.utils.register_keras_serializable(package="MyLayers", name="ViTEncoderBlockLocal")
+class ViTEncoderBlockLocal(ViTEncoderBlock):
+    """
+    Encoder block where each patch attends only to its 3x3 neighbourhood and
+    the class token attends to every patch.
+    """
+
+    def build(self, input_shape):
+        # Attention block
+        self.layer_norm_1 = keras.layers.LayerNormalization(
+            epsilon=self.layer_norm_epsilon, name="ln_1", dtype=self.dtype_policy,
+        )
+        self.layer_norm_1.build(input_shape)
+        self.mha = keras.layers.MultiHeadAttention(
+            num_heads=self.num_heads,
+            key_dim=self.key_dim,
+            use_bias=self.use_mha_bias,
+            dropout=self.attention_dropout,
+            name="mha",
+            dtype=self.dtype_policy,
+        )
+        self.mha.build(input_shape, input_shape)
+        self.dropout = keras.layers.Dropout(self.dropout_rate, dtype=self.dtype_policy, name="dropout")
+
+        # MLP block
+        self.layer_norm_2 = keras.layers.LayerNormalization(
+            epsilon=self.layer_norm_epsilon, name="ln_2", dtype=self.dtype_policy,
+        )
+        self.layer_norm_2.build((None, None, self.hidden_dim))
+        self.mlp = MLP(
+            hidden_dim=self.hidden_dim,
+            mlp_dim=self.mlp_dim,
+            use_bias=self.use_mlp_bias,
+            dropout_rate=self.dropout_rate,
+            name="mlp",
+            dtype=self.dtype_policy,
+        )
+        self.mlp.build((None, None, self.hidden_dim))
+
+        # calculate shapes
+        self.emb_dim = input_shape[-1]
+        if input_shape[1] is not None:
+            self.patch_n = input_shape[1] - 1  # without the class token
+            self.p_sqrt = int(round(self.patch_n ** 0.5))
+        else:
+            self.patch_n = None
+            self.p_sqrt = None
+        self.built = True
+
+    def call(self, inputs):
+        x = self.layer_norm_1(inputs)
+        batch_size = tf.shape(x)[0]
+        cls = x[:, 0, :]
+        cls = tf.reshape(cls, (batch_size, 1, self.emb_dim))  # keep the shape
+
+        # attention for patch
+        patch = x[:, 1:, :]
+        if self.patch_n is not None:
+            total_patch_n = self.patch_n
+            p_sqrt = self.p_sqrt
+        else:
+            # if none, calculate patch dynamically
+            total_patch_n = tf.shape(patch)[1]
+            p_sqrt = tf.cast(tf.sqrt(tf.cast(total_patch_n, tf.float32)), tf.int32)
+
+        query = tf.reshape(patch, (batch_size * total_patch_n, 1, self.emb_dim))
+        key_value = tf.reshape(patch, (batch_size, p_sqrt, p_sqrt, self.emb_dim))
+        key_value = keras.ops.image.extract_patches(images=key_value, size=[3, 3], padding="same", strides=1)
+        key_value = tf.reshape(key_value, (batch_size * total_patch_n, 9, self.emb_dim))
+
+        patch_result = self.mha(query, key_value)  # local query
+        patch_result = tf.reshape(patch_result, (batch_size, total_patch_n, self.emb_dim))
+
+        cls_result = self.mha(cls, x)  # global query
+
+        x = tf.concat([cls_result, patch_result], axis=1)
+        x = self.dropout(x)
+        x = x + inputs
+
+        y = self.layer_norm_2(x)
+        y = self.mlp(y)
+        return x + y
+
+
+@tf.keras.utils.register_keras_serializable(package="MyLayers", name="MyVitEncoder")
+class MyVitEncoder(ViTEncoder):
+    """
+    ViT encoder built from a configurable encoder block class. The block is
+    saved in the config by its registered name, so a reloaded model keeps
+    its attention. Configs saved by the notebook have no block name; the
+    notebook only built this encoder with ViTEncoderBlockLocal, so that is
+    what they get.
+    """
+
+    def __init__(self, EncoderBlock=ViTEncoderBlock, **kwargs):
+        super().__init__(**kwargs)
+        self.EncoderBlock = EncoderBlock
+
+    def get_config(self):
+        config = super().get_config()
+        config["EncoderBlock"] = keras.saving.get_registered_name(self.EncoderBlock)
+        return config
+
+    @classmethod
+    def from_config(cls, config):
+        config = dict(config)
+        name = config.pop("EncoderBlock", None)
+        if name is None:
+            warnings.warn("MyVitEncoder config without an EncoderBlock (saved by the notebook), "
+                          "assuming ViTEncoderBlockLocal")
+            block = ViTEncoderBlockLocal
+        elif name == keras.saving.get_registered_name(ViTEncoderBlock):
+            block = ViTEncoderBlock
+        else:
+            block = keras.saving.get_registered_object(name)
+            if block is None:
+                raise ValueError(f"Unknown encoder block {name!r}; register it before loading the model")
+        return cls(EncoderBlock=block, **config)
+
+    def build(self, input_shape):
+        self.encoder_layers = []
+        for i in range(self.num_layers):
+            encoder_block = self.EncoderBlock(
+                num_heads=self.num_heads,
+                hidden_dim=self.hidden_dim,
+                mlp_dim=self.mlp_dim,
+                dropout_rate=self.dropout_rate,
+                use_mha_bias=self.use_mha_bias,
+                use_mlp_bias=self.use_mlp_bias,
+                attention_dropout=self.attention_dropout,
+                layer_norm_epsilon=self.layer_norm_epsilon,
+                dtype=self.dtype_policy,
+                name=f"tranformer_block_{i + 1}",
+            )
+            encoder_block.build((None, None, self.hidden_dim))
+            self.encoder_layers.append(encoder_block)
+        self.dropout = keras.layers.Dropout(self.dropout_rate, dtype=self.dtype_policy, name="dropout")
+        self.layer_norm = keras.layers.LayerNormalization(
+            epsilon=self.layer_norm_epsilon, dtype=self.dtype_policy, name="ln",
+        )
+        self.layer_norm.build((None, None, self.hidden_dim))
+        self.built = True
+
+
+CUSTOM_OBJECTS = {
+    "Scale": Scale,
+    "Rescale": Rescale,
+    "ViTPEWithoutPos": ViTPEWithoutPos,
+    "ViTEncoderBlockLocal": ViTEncoderBlockLocal,
+    "MyVitEncoder": MyVitEncoder,
+}
+
+
+def load_model(path, compile=False):
+    """Loads a saved .keras pixel-length model with the custom layers above."""
+    return tf.keras.models.load_model(path, custom_objects=CUSTOM_OBJECTS, compile=compile)
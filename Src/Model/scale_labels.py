@@ -0,0 +1,317 @@
+"""
+Pixel-length labels for training, with a persistent cache.
+
+Replaces the notebooks' serial extract_scale loop and the hand-pickled
+pixel_lengths.pkl. For every image:
+
+1. the pixel size stored by the microscope is used when there is one
+   (FEI PixelWidth, Zeiss "Pixel Size"), read from the TIFF header only
+   and parsed by the metadata extraction tools;
+2. otherwise the scale bar is measured and its label read with tesseract,
+   exactly as extract_scale_singleim does.
+
+Images are processed across a process pool and every result (including
+failures) is stored in an SQLite cache keyed by the SHA-1 of the file, so a
+rerun only processes new or changed images. File hashes are themselves
+remembered by path, size and mtime, so unchanged files are not re-read.
+
+    python scale_labels.py SEM_DATA/ --output labels.csv
+    python scale_labels.py SEM_DATA/ new_images/ --output labels.csv --workers 8 --ocr-only
+"""
+import argparse
+import csv
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from image_io import list_inputs, read_gray
+
+# Vendor tags are parsed by the metadata extraction tools, not here
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Metadata extraction"))
+from sem_extract import convert_meta_to_json  # noqa: E402
+from tiff_header import read_header_tags  # noqa: E402
+
+try:
+    from pytesseract import image_to_string
+except ImportError:  # only needed for images without a stored pixel size
+    image_to_string = None
+
+DEFAULT_CACHE = "scale_cache.sqlite"
+CHUNK_SIZE = 8
+# Bump when the extraction logic changes so cached results are recomputed
+EXTRACTOR_VERSION = 1
+
+# Layout of the 885 px wide training images (data bar below row 660)
+SCALE_TEXT_BOX = (slice(670, None), slice(435, 600))
+SCALE_BAR_BOX = (slice(670, 700), slice(420, 750))
+BAR_THRESHOLD = 250
+
+FEI_TAGS = (34682, 34680)
+ZEISS_TAG = 34118
+TIFF_EXTS = {".tif", ".tiff"}
+LENGTH = re.compile(r"([-+\d.eE]+)\s*(pm|nm|[µμu]m|mm)")
+UNIT_NM = {"pm": 1e-3, "nm": 1.0, "µm": 1e3, "μm": 1e3, "um": 1e3, "mm": 1e6}  # micro sign and Greek mu
+
+LABEL_COLUMNS = ["path", "hash", "pixel_length_nm", "source", "scale_value_nm", "bar_length_px", "error"]
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS labels (
+        hash TEXT PRIMARY KEY, version INTEGER, pixel_length_nm REAL, source TEXT,
+        scale_value_nm REAL, bar_length_px INTEGER, error TEXT)""",
+    "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT)",
+]
+
+# ------------------ Metadata ------------------
+
+def _fields(parsed):
+    """key = value dicts of a vendor tag as parsed by sem_extract.convert_meta_to_json."""
+    for block in parsed if isinstance(parsed, list) else [parsed]:
+        if isinstance(block, dict) and isinstance(block.get("plain"), dict):
+            yield block["plain"]
+
+
+def fei_pixel_size(fields):
+    """PixelWidth of an FEI INI block, in nm."""
+    try:
+        return float(fields["PixelWidth"]) * 1e9  # stored in metres
+    except (KeyError, ValueError):
+        return None
+
+
+def zeiss_pixel_size(fields):
+    """"Pixel Size" of a Zeiss SEM text block, e.g. "2.5 nm", in nm."""
+    m = LENGTH.match(fields.get("Pixel Size", ""))
+    return float(m.group(1)) * UNIT_NM[m.group(2)] if m else None
+
+
+def metadata_pixel_size(path):
+    """Pixel size in nm stored in the TIFF header, or None. Reads no pixel data."""
+    if Path(path).suffix.lower() not in TIFF_EXTS:
+        return None
+    tags, _ = read_header_tags(path)
+    readers = [(tag, fei_pixel_size) for tag in FEI_TAGS] + [(ZEISS_TAG, zeiss_pixel_size)]
+    parsed = convert_meta_to_json({tag: tags[tag] for tag, _ in readers if tag in tags})
+    for tag, read in readers:
+        for fields in _fields(parsed.get(str(tag))):
+            size = read(fields)
+            if size:
+                return size
+    return None
+
+# ------------------ OCR ------------------
+
+def scale_value_nm(text):
+    """Scale bar label as read by tesseract -> length in nm, as in the notebooks."""
+    scale_value = int(re.sub("[^0-9]", "", text))
+    # convert mm to um
+    if scale_value < 10:
+        scale_value = scale_value * 1000
+    # convert um to nm
+    return scale_value * 1000
+
+
+def bar_length(image_scale_bar):
+    """Scale bar length in pixels from the bar strip, as in extract_scale_singleim."""
+    thresh = np.where(image_scale_bar > BAR_THRESHOLD, 255, 0).sum(axis=0)
+    logic = thresh == thresh.max()
+    max_i_1 = logic.argmax()
+    logic = logic[max_i_1 + 1:]
+    max_i_2 = logic.argmax()
+    logic = logic[max_i_2 + 1:]
+    max_i_3 = logic.argmax() + max_i_2 + max_i_1
+    return int(max_i_3 - max_i_1 + 3)
+
+
+def ocr_pixel_size(path, tesseract_config=""):
+    if image_to_string is None:
+        raise ImportError("pytesseract is required to read scale bars (pip install pytesseract)")
+    image = read_gray(path)
+    text = image_to_string(Image.fromarray(image[SCALE_TEXT_BOX]), config=tesseract_config).strip()
+    value = scale_value_nm(text)
+    length = bar_length(image[SCALE_BAR_BOX])
+    return value / length, value, length
+
+# ------------------ Workers ------------------
+
+def file_hash(path, chunk=1024 * 1024):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def label_one(path, use_metadata=True, tesseract_config=""):
+    """Returns a labels row (without hash) for one image; errors are recorded, not raised."""
+    row = {"pixel_length_nm": None, "source": None, "scale_value_nm": None, "bar_length_px": None, "error": None}
+    try:
+        size = metadata_pixel_size(path) if use_metadata else None
+        if size:
+            row.update(pixel_length_nm=size, source="metadata")
+        else:
+            pixel_length, value, length = ocr_pixel_size(path, tesseract_config)
+            row.update(pixel_length_nm=pixel_length, source="ocr", scale_value_nm=value, bar_length_px=length)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def label_chunk(chunk, use_metadata=True, tesseract_config=""):
+    """Runs in a worker process. chunk is a list of (hash, path) pairs."""
+    return [(digest, label_one(path, use_metadata, tesseract_config)) for digest, path in chunk]
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+# ------------------ Cache ------------------
+
+class LabelCache:
+    """SQLite store of labels by file hash, and of file hashes by path/size/mtime."""
+
+    def __init__(self, path=DEFAULT_CACHE):
+        self.conn = sqlite3.connect(path)
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+
+    def known_hashes(self, paths):
+        """{path: hash} for paths whose size and mtime are unchanged since they were hashed."""
+        known = {}
+        for path in paths:
+            row = self.conn.execute("SELECT size, mtime, hash FROM files WHERE path = ?", (path,)).fetchone()
+            if row is not None:
+                st = os.stat(path)
+                if (row[0], row[1]) == (st.st_size, st.st_mtime):
+                    known[path] = row[2]
+        return known
+
+    def remember_hashes(self, hashes):
+        rows = []
+        for path, digest in hashes.items():
+            st = os.stat(path)
+            rows.append((path, st.st_size, st.st_mtime, digest))
+        self.conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def get(self, hashes, retry_failed=False):
+        """Cached rows for the given hashes computed by the current extractor."""
+        out = {}
+        for digest in hashes:
+            row = self.conn.execute(
+                "SELECT pixel_length_nm, source, scale_value_nm, bar_length_px, error FROM labels "
+                "WHERE hash = ? AND version = ?", (digest, EXTRACTOR_VERSION)).fetchone()
+            if row is not None and not (retry_failed and row[4]):
+                out[digest] = dict(zip(LABEL_COLUMNS[2:], row))
+        return out
+
+    def put(self, results):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(digest, EXTRACTOR_VERSION, r["pixel_length_nm"], r["source"], r["scale_value_nm"],
+              r["bar_length_px"], r["error"]) for digest, r in results])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+# ------------------ Main ------------------
+
+def extract_labels(paths, cache_path=DEFAULT_CACHE, workers=None, use_metadata=True, retry_failed=False,
+                   tesseract_config="", chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Labels every image in paths, reusing cached results. Returns
+    (rows, stats): one LABEL_COLUMNS dict per existing path in input order,
+    and a dict of counts. progress, if given, is called as progress(done, todo).
+    """
+    start = time.perf_counter()
+    missing = [p for p in paths if not os.path.isfile(p)]
+    if missing:
+        paths = [p for p in paths if os.path.isfile(p)]
+    cache = LabelCache(cache_path)
+    try:
+        hashes = cache.known_hashes(paths)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            unhashed = [p for p in paths if p not in hashes]
+            new_hashes = dict(zip(unhashed, pool.map(file_hash, unhashed, chunksize=CHUNK_SIZE)))
+            cache.remember_hashes(new_hashes)
+            hashes.update(new_hashes)
+
+            cached = cache.get(set(hashes.values()), retry_failed)
+            todo = {}  # hash -> one path with that content
+            for path in paths:
+                if hashes[path] not in cached:
+                    todo.setdefault(hashes[path], path)
+
+            done = 0
+            items = list(todo.items())
+            futures = [pool.submit(label_chunk, chunk, use_metadata, tesseract_config)
+                       for chunk in chunked(items, chunk_size)]
+            for future in futures:
+                results = future.result()
+                cache.put(results)  # saved as we go, an interrupted run keeps its progress
+                cached.update(results)
+                done += len(results)
+                if progress is not None:
+                    progress(done, len(items))
+    finally:
+        cache.close()
+
+    rows = [{"path": p, "hash": hashes[p], **cached[hashes[p]]} for p in paths]
+    stats = {
+        "images": len(paths),
+        "missing": len(missing),
+        "processed": len(todo),
+        "cached": len(paths) - sum(1 for p in paths if hashes[p] in todo),
+        "metadata": sum(r["source"] == "metadata" for r in rows),
+        "ocr": sum(r["source"] == "ocr" for r in rows),
+        "failed": sum(bool(r["error"]) for r in rows),
+        "seconds": time.perf_counter() - start,
+    }
+    return rows, stats
+
+
+def write_labels(rows, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=LABEL_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract pixel-length training labels from SEM images.")
+    parser.add_argument("inputs", nargs="+", help="image folders, images, or manifests (.txt, .csv, .ndjson)")
+    parser.add_argument("-o", "--output", default="labels.csv", help="labels CSV to write")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="SQLite cache file")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--ocr-only", action="store_true", help="ignore pixel sizes stored in the metadata")
+    parser.add_argument("--retry-failed", action="store_true", help="process images that failed before again")
+    parser.add_argument("--tesseract-config", default="", help='extra tesseract options, e.g. "--psm 7"')
+    args = parser.parse_args(argv)
+
+    paths = list_inputs(args.inputs)
+
+    def progress(done, todo):
+        print(f"  {done}/{todo} images processed", end="\r", flush=True)
+
+    rows, stats = extract_labels(paths, args.cache, args.workers, not args.ocr_only, args.retry_failed,
+                                 args.tesseract_config, progress=progress)
+    write_labels(rows, args.output)
+    print()
+    print(f"✅ {stats['images']} images: {stats['processed']} processed, {stats['cached']} from cache "
+          f"in {stats['seconds']:.1f} s")
+    print(f"📏 {stats['metadata']} from metadata, {stats['ocr']} from OCR, {stats['failed']} failed, "
+          f"{stats['missing']} missing")
+    print(f"🧾 Labels: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
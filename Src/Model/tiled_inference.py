@@ -0,0 +1,191 @@
+"""
+Sliding-window pixel-length inference for images larger than the
+training images.
+
+The model squeezes every input to 256x256 and its Scale/Rescale layers
+turn the head's output into nm per pixel for the input's width
+(885 / width). A large-area map squeezed that far loses the detail the
+model learned from. Here the image is cut, at full resolution, into tiles
+the size of the training crops (660 x 885), so each tile reaches the model
+the way training images did, and each tile's output is already a pixel
+length for the whole image (same pixels, same nm per pixel). Tiles are
+predicted in batches and combined into one estimate with a spread:
+
+- median:   median of the tile predictions, spread = 1.4826 * MAD
+- weighted: mean weighted by tile contrast (flat, featureless tiles carry
+            little scale information), spread = weighted standard deviation
+
+TIFFs are read a band of rows at a time, so memory is bounded by one tile
+row and one batch whatever the image size. Images no larger than a tile
+are predicted whole, as batch_inference.py does.
+
+    python tiled_inference.py best_hd_model_frozen.keras Large_area-map.tif
+    python tiled_inference.py hd_int8.tflite SEM_DATA/ --method weighted --overlap 0.25 --output tiled.csv
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+from image_io import image_shape, iter_gray_rows, list_inputs, read_gray
+
+TILE_SHAPE = (660, 885)  # training crop: image[:660, :] of 885 px wide images
+DEFAULT_BATCH_SIZE = 16
+METHODS = ("median", "weighted")
+MAD_TO_STD = 1.4826
+OUTPUT_COLUMNS = ["path", "pixel_length_nm", "spread_nm", "tiles", "method", "seconds"]
+
+# ------------------ Tiling ------------------
+
+def _starts(length, tile, stride):
+    """Tile offsets covering [0, length), the last one flush with the end."""
+    starts = list(range(0, length - tile + 1, stride))
+    if starts[-1] + tile < length:
+        starts.append(length - tile)
+    return starts
+
+
+def iter_tiles(path, tile=TILE_SHAPE, overlap=0.0, databar_rows=0):
+    """
+    Yields (y, x, tile) for full-resolution tiles of the image at path,
+    skipping databar_rows at the bottom. Only tile height plus one stride of
+    rows is held in memory.
+    """
+    height, width = image_shape(path)
+    height -= databar_rows
+    tile_h, tile_w = tile
+    if height < tile_h or width < tile_w:
+        raise ValueError(f"{path} is smaller than one {tile_h}x{tile_w} tile")
+    stride_h = max(1, int(tile_h * (1 - overlap)))
+    stride_w = max(1, int(tile_w * (1 - overlap)))
+    xs = _starts(width, tile_w, stride_w)
+    ys = _starts(height, tile_h, stride_h)
+
+    buffer, top = np.empty((0, width), np.uint8), 0  # buffer holds rows top .. top + len(buffer)
+    wanted = iter(ys)
+    y = next(wanted)
+    for _, block in iter_gray_rows(path, stride_h):
+        buffer = np.concatenate([buffer, block]) if len(buffer) else block
+        while y is not None and top + len(buffer) >= y + tile_h:
+            rows = buffer[y - top:y - top + tile_h]
+            for x in xs:
+                yield y, x, rows[:, x:x + tile_w]
+            y = next(wanted, None)
+        if y is None:
+            return
+        # Drop rows no later tile needs
+        keep_from = y - top
+        if keep_from > 0:
+            buffer, top = buffer[keep_from:], y
+
+
+def tile_contrast(tile):
+    return float(tile.std())
+
+# ------------------ Aggregation ------------------
+
+def aggregate(predictions, weights=None, method="median"):
+    """Combines per-tile pixel lengths -> (estimate, spread)."""
+    preds = np.asarray(predictions, dtype=np.float64)
+    if method == "median":
+        estimate = float(np.median(preds))
+        return estimate, float(MAD_TO_STD * np.median(np.abs(preds - estimate)))
+    if method == "weighted":
+        w = np.asarray(weights, dtype=np.float64)
+        if not w.sum() > 0:
+            w = np.ones_like(preds)
+        estimate = float(np.average(preds, weights=w))
+        return estimate, float(np.sqrt(np.average((preds - estimate) ** 2, weights=w)))
+    raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+
+# ------------------ Models ------------------
+
+def make_predictor(model_path):
+    """
+    Returns predict(images) -> pixel lengths for a float32 batch shaped
+    (n, height, width, 1): a traced Keras model, or a TFLite model run image
+    by image.
+    """
+    if model_path.endswith(".tflite"):
+        from export_model import TfliteModel
+        lite = TfliteModel(model_path)
+        return lambda images: np.array([lite.predict(image) for image in images])
+
+    from batch_inference import compile_predict
+    from model_layers import load_model
+    predict = compile_predict(load_model(model_path))
+    return lambda images: predict(images).numpy().reshape(-1)
+
+
+def predict_tiled(predict, path, tile=TILE_SHAPE, overlap=0.0, databar_rows=0, method="median",
+                  batch_size=DEFAULT_BATCH_SIZE):
+    """
+    One pixel-length estimate for the image at path. Returns a dict with
+    pixel_length_nm, spread_nm and the number of tiles used.
+    """
+    height, width = image_shape(path)
+    if height - databar_rows <= tile[0] or width <= tile[1]:
+        image = read_gray(path)[:height - databar_rows]
+        value = float(predict(image[np.newaxis, ..., np.newaxis].astype(np.float32))[0])
+        return {"pixel_length_nm": value, "spread_nm": 0.0, "tiles": 1}
+
+    batch = np.empty((batch_size,) + tuple(tile) + (1,), np.float32)
+    predictions, weights = [], []
+    n = 0
+    for _, _, t in iter_tiles(path, tile, overlap, databar_rows):
+        batch[n, ..., 0] = t
+        weights.append(tile_contrast(t))
+        n += 1
+        if n == batch_size:
+            predictions.extend(predict(batch))
+            n = 0
+    if n:
+        predictions.extend(predict(batch[:n]))
+
+    estimate, spread = aggregate(predictions, weights, method)
+    return {"pixel_length_nm": estimate, "spread_nm": spread, "tiles": len(predictions)}
+
+# ------------------ Main ------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiled pixel-length prediction for large SEM images.")
+    parser.add_argument("model", help="saved .keras model or exported .tflite model")
+    parser.add_argument("inputs", nargs="+", help="images, image folders or manifests (.txt, .csv, .ndjson)")
+    parser.add_argument("--method", choices=METHODS, default="median")
+    parser.add_argument("--overlap", type=float, default=0.0, help="tile overlap as a fraction (0 - 0.9)")
+    parser.add_argument("--databar-rows", type=int, default=0, help="rows at the bottom to leave out")
+    parser.add_argument("--tile", type=int, nargs=2, default=TILE_SHAPE, metavar=("HEIGHT", "WIDTH"))
+    parser.add_argument("-b", "--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("-o", "--output", help="CSV file for the results")
+    args = parser.parse_args(argv)
+    if not 0 <= args.overlap < 1:
+        parser.error("--overlap must be in [0, 1)")
+
+    predict = make_predictor(args.model)
+    rows = []
+    for path in list_inputs(args.inputs):
+        start = time.perf_counter()
+        try:
+            result = predict_tiled(predict, path, tuple(args.tile), args.overlap, args.databar_rows,
+                                   args.method, args.batch_size)
+        except Exception as e:
+            print(f"⚠️ {path}: {type(e).__name__}: {e}")
+            continue
+        seconds = time.perf_counter() - start
+        rows.append({"path": path, **result, "method": args.method, "seconds": round(seconds, 3)})
+        print(f"📏 {os.path.basename(path)}: {result['pixel_length_nm']:.3f} ± {result['spread_nm']:.3f} nm/px "
+              f"({result['tiles']} tiles, {seconds:.1f} s)")
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=OUTPUT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+On-disk training dataset for the pixel-length model.
+
+Replaces images.pkl / pixel_lengths.pkl. Cropped images are written to
+uint8 .npy shards (one image shape per shard) next to an index.csv holding
+one row per image: shard, row, pixel length and source path. Shards are
+opened memory-mapped, so only the rows of the current batch are paged in
+and the dataset can be larger than RAM.
+
+Train/validation splits are arrays of row numbers into the index, and
+make_tf_dataset gathers each shuffled batch straight from the shards and
+prefetches the next one.
+
+    python training_data.py build labels.csv SEM_DATASET/
+    python training_data.py build --pickles images.pkl pixel_lengths.pkl SEM_DATASET/
+
+    ds = ShardedDataset("SEM_DATASET")
+    train_idx, val_idx = ds.split(val_fraction=0.1, seed=42)
+    model.fit(ds.make_tf_dataset(train_idx, shuffle=True), validation_data=ds.make_tf_dataset(val_idx), ...)
+"""
+import argparse
+import csv
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from image_io import read_gray
+
+INDEX_NAME = "index.csv"
+SHARD_NAME = "shard_{:05d}.npy"
+SHARD_IMAGES = 256
+TRAIN_CROP_ROWS = 660  # the notebooks train on image[:660, :], above the data bar
+INDEX_COLUMNS = ["shard", "row", "height", "width", "pixel_length_nm", "path"]
+DEFAULT_BATCH_SIZE = 32
+
+# ------------------ Writing ------------------
+
+class ShardWriter:
+    """
+    Collects images per shape and writes a shard whenever SHARD_IMAGES of one
+    shape have arrived, so memory use is bounded by one shard per shape.
+    """
+
+    def __init__(self, output_dir, shard_images=SHARD_IMAGES):
+        os.makedirs(output_dir, exist_ok=True)
+        if os.path.exists(os.path.join(output_dir, INDEX_NAME)):
+            raise FileExistsError(f"{output_dir} already holds a dataset")
+        self.output_dir = output_dir
+        self.shard_images = shard_images
+        self.pending = {}  # shape -> list of (position, image, pixel_length, path)
+        self.index = []
+        self.shards = 0
+        self.added = 0
+
+    def add(self, image, pixel_length, path=""):
+        group = self.pending.setdefault(image.shape, [])
+        group.append((self.added, image, pixel_length, path))
+        self.added += 1
+        if len(group) >= self.shard_images:
+            self._flush(image.shape)
+
+    def _flush(self, shape):
+        group = self.pending.pop(shape, [])
+        if not group:
+            return
+        np.save(os.path.join(self.output_dir, SHARD_NAME.format(self.shards)),
+                np.stack([image for _, image, _, _ in group]))
+        for row, (position, _, pixel_length, path) in enumerate(group):
+            self.index.append((position, self.shards, row, shape[0], shape[1], pixel_length, path))
+        self.shards += 1
+
+    def close(self):
+        for shape in list(self.pending):
+            self._flush(shape)
+        # Index rows in the order the images were added, so dataset positions
+        # match the notebooks' image lists whatever the shard layout
+        self.index.sort()
+        pd.DataFrame([row[1:] for row in self.index], columns=INDEX_COLUMNS).to_csv(
+            os.path.join(self.output_dir, INDEX_NAME), index=False)
+        return len(self.index)
+
+
+def load_training_image(path, crop_rows=TRAIN_CROP_ROWS):
+    image = read_gray(path)
+    return image[:crop_rows, :] if crop_rows else image
+
+
+def build_from_labels(labels_csv, output_dir, crop_rows=TRAIN_CROP_ROWS, workers=None,
+                      shard_images=SHARD_IMAGES, progress=None):
+    """
+    Writes a dataset from a scale_labels.py labels CSV; images without a
+    pixel length are left out. Returns the number of images written.
+    """
+    with open(labels_csv, newline="", encoding="utf-8") as f:
+        labels = [(r["path"], float(r["pixel_length_nm"])) for r in csv.DictReader(f) if r["pixel_length_nm"]]
+    paths = [p for p, _ in labels]
+    writer = ShardWriter(output_dir, shard_images)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        crops = pool.map(load_training_image, paths, [crop_rows] * len(paths), chunksize=8)
+        for i, ((path, pixel_length), image) in enumerate(zip(labels, crops), 1):
+            writer.add(image, pixel_length, path)
+            if progress is not None:
+                progress(i, len(labels))
+    return writer.close()
+
+
+def build_from_pickles(images_pkl, pixel_lengths_pkl, output_dir, shard_images=SHARD_IMAGES):
+    """Converts the notebooks' images.pkl / pixel_lengths.pkl (already cropped)."""
+    with open(images_pkl, "rb") as f:
+        images = pickle.load(f)
+    with open(pixel_lengths_pkl, "rb") as f:
+        pixel_lengths = pickle.load(f)
+    writer = ShardWriter(output_dir, shard_images)
+    for image, pixel_length in zip(images, pixel_lengths):
+        writer.add(np.asarray(image, dtype=np.uint8).reshape(np.shape(image)[:2]), float(pixel_length))
+    return writer.close()
+
+# ------------------ Reading ------------------
+
+class ShardedDataset:
+    """A dataset written by ShardWriter, with its shards memory-mapped."""
+
+    def __init__(self, path):
+        self.path = path
+        self.index = pd.read_csv(os.path.join(path, INDEX_NAME))
+        self.shards = {
+            s: np.load(os.path.join(path, SHARD_NAME.format(s)), mmap_mode="r")
+            for s in self.index["shard"].unique()
+        }
+        self.shard_ids = self.index["shard"].to_numpy()
+        self.rows = self.index["row"].to_numpy()
+        self.labels = self.index["pixel_length_nm"].to_numpy(dtype=np.float32)
+        self.shapes = list(zip(self.index["height"], self.index["width"]))
+
+    def __len__(self):
+        return len(self.index)
+
+    def split(self, val_fraction=0.1, seed=42):
+        """
+        (train, val) arrays of dataset positions; nothing is copied. The
+        partition is the notebooks' train_test_split(test_size=val_fraction,
+        random_state=seed): a RandomState permutation whose first
+        ceil(val_fraction * n) entries are the validation images.
+        """
+        order = np.random.RandomState(seed).permutation(len(self))
+        n_val = int(np.ceil(len(self) * val_fraction))
+        return np.sort(order[n_val:]), np.sort(order[:n_val])
+
+    def gather(self, positions):
+        """Images (n, height, width) and labels for positions of one image shape."""
+        positions = np.asarray(positions)
+        shard_ids, rows = self.shard_ids[positions], self.rows[positions]
+        first = self.shards[shard_ids[0]]
+        images = np.empty((len(positions),) + first.shape[1:], dtype=np.uint8)
+        for s in np.unique(shard_ids):
+            mask = shard_ids == s
+            order = np.argsort(rows[mask])  # read each shard front to back
+            images[np.flatnonzero(mask)[order]] = self.shards[s][rows[mask][order]]
+        return images, self.labels[positions]
+
+    def make_tf_dataset(self, positions=None, batch_size=DEFAULT_BATCH_SIZE, shuffle=False, seed=None):
+        """
+        tf.data pipeline of (images (n, h, w, 1) float32, pixel lengths)
+        batches over positions (default: all), reshuffled every epoch when
+        shuffle is set. Each batch holds one image shape.
+        """
+        import tensorflow as tf  # only needed for training, not for building a dataset
+
+        positions = np.arange(len(self)) if positions is None else np.asarray(positions)
+        if not len(positions):
+            raise ValueError("no images to make a dataset from")
+
+        def to_model_input(images, labels):
+            return tf.cast(images, tf.float32)[..., tf.newaxis], labels
+
+        groups = {}
+        for p in positions:
+            groups.setdefault(self.shapes[p], []).append(p)
+
+        datasets, weights = [], []
+        for (height, width), members in groups.items():
+            ds = tf.data.Dataset.from_tensor_slices(np.array(members, dtype=np.int64))
+            if shuffle:
+                ds = ds.shuffle(len(members), seed=seed, reshuffle_each_iteration=True)
+            ds = ds.batch(batch_size)
+            ds = ds.map(
+                lambda batch: tf.numpy_function(self.gather, [batch], (tf.uint8, tf.float32)),
+                num_parallel_calls=tf.data.AUTOTUNE,
+            )
+            ds = ds.map(lambda images, labels, h=height, w=width: (tf.ensure_shape(images, [None, h, w]),
+                                                                   tf.ensure_shape(labels, [None])))
+            datasets.append(ds)
+            weights.append(len(members))
+
+        if len(datasets) == 1:
+            ds = datasets[0]
+        else:
+            weights = np.array(weights, dtype=np.float64)
+            ds = tf.data.Dataset.sample_from_datasets(datasets, weights=list(weights / weights.sum()), seed=seed)
+        return ds.map(to_model_input, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+# ------------------ Main ------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the memory-mapped pixel-length training dataset.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="write a dataset from a labels CSV or the old pickles")
+    build.add_argument("source", nargs="?", help="labels CSV written by scale_labels.py")
+    build.add_argument("output", help="dataset folder to create")
+    build.add_argument("--pickles", nargs=2, metavar=("IMAGES_PKL", "PIXEL_LENGTHS_PKL"),
+                       help="convert images.pkl and pixel_lengths.pkl instead")
+    build.add_argument("--crop-rows", type=int, default=TRAIN_CROP_ROWS, help="keep the top N rows (0: no crop)")
+    build.add_argument("--shard-images", type=int, default=SHARD_IMAGES)
+    build.add_argument("-w", "--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.pickles:
+        n = build_from_pickles(*args.pickles, args.output, args.shard_images)
+    elif args.source:
+        def progress(done, total):
+            print(f"  {done}/{total} images", end="\r", flush=True)
+        n = build_from_labels(args.source, args.output, args.crop_rows, args.workers, args.shard_images, progress)
+        print()
+    else:
+        parser.error("give a labels CSV or --pickles")
+
+    ds = ShardedDataset(args.output)
+    size = sum(a.nbytes for a in ds.shards.values())
+    print(f"✅ Wrote {n} images in {len(ds.shards)} shards ({size / 1e6:.0f} MB) "
+          f"to {args.output} in {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# The tools are plain scripts in folders with spaces in their names, not
+# packages, so their folders go on sys.path as they do when run directly.
+SRC = Path(__file__).resolve().parents[1] / "Src"
+for folder in ("Common", "Map Interface", "Metadata extraction", "Model"):
+    sys.path.insert(0, str(SRC / folder))
@@ -0,0 +1,99 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from batch_extract import MANIFEST_SUFFIX, find_images, run
+
+
+def _image(path, value=0):
+    Image.fromarray(np.full((16, 16), value, np.uint8)).save(path, "tiff")
+    return path
+
+
+@pytest.fixture
+def data(tmp_path):
+    root = tmp_path / "SEM_DATA"
+    (root / "S1").mkdir(parents=True)
+    _image(root / "S1" / "a.tif")
+    _image(root / "S1" / "b.tif", 50)
+    (root / "S1" / "b.txt").write_text("$CM_INSTRUMENT JSM-7001F\n$CM_DATE 2023/05/14\n")
+    (root / "S1" / "notes.md").write_text("not an image")
+    return root
+
+
+def _run(root, output, **kwargs):
+    calls = []
+    ok, failures, skipped = run([str(root)], str(output), workers=2, chunk_size=1,
+                                progress=lambda record, done, total: calls.append((done, total)), **kwargs)
+    return ok, failures, skipped, calls
+
+
+def _lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_find_images_pairs_sidecars(data):
+    found = sorted((os.path.basename(i), s and os.path.basename(s)) for i, s in find_images([str(data)]))
+    assert found == [("a.tif", None), ("b.tif", "b.txt")]
+
+
+def test_rerun_skips_unchanged_files(data, tmp_path):
+    output = tmp_path / "results.ndjson"
+    ok, failures, skipped, calls = _run(data, output)
+    assert (ok, failures, skipped) == (2, [], 0)
+    assert calls[-1] == (2, 2)
+    records = {os.path.basename(r["path"]): r for r in _lines(output)}
+    assert records["b.tif"]["machine"] == "JSM-7001F"
+    assert os.path.exists(str(output) + MANIFEST_SUFFIX)
+
+    assert _run(data, output)[:3] == (0, [], 2)
+    assert len(_lines(output)) == 2
+
+
+def test_touched_file_is_extracted_again_without_hash(data, tmp_path):
+    output = tmp_path / "results.ndjson"
+    _run(data, output)
+    os.utime(data / "S1" / "a.tif", ns=(0, 10**18))
+    assert _run(data, output)[:3] == (1, [], 1)
+    assert len(_lines(output)) == 3
+
+
+def test_hash_skips_touched_files_with_the_same_content(data, tmp_path):
+    output = tmp_path / "results.ndjson"
+    _run(data, output, use_hash=True)
+    os.utime(data / "S1" / "a.tif", ns=(0, 10**18))
+    ok, failures, skipped, calls = _run(data, output, use_hash=True)
+    assert (ok, failures, skipped) == (0, [], 2)
+    assert calls == [(1, 1)]  # the progress count still reaches the total
+    assert len(_lines(output)) == 2
+
+    _image(data / "S1" / "a.tif", 200)
+    assert _run(data, output, use_hash=True)[:3] == (1, [], 1)
+
+
+def test_failures_are_retried(data, tmp_path):
+    output = tmp_path / "results.ndjson"
+    (data / "S1" / "a.tif").write_bytes(b"not a tiff")
+    ok, failures, _, calls = _run(data, output)
+    assert ok == 1 and [os.path.basename(p) for p, _ in failures] == ["a.tif"]
+    assert calls[-1] == (2, 2)
+
+    _image(data / "S1" / "a.tif")
+    assert _run(data, output)[:3] == (1, [], 1)
+
+
+def test_force_rewrites_ndjson(data, tmp_path):
+    output = tmp_path / "results.ndjson"
+    _run(data, output)
+    assert _run(data, output, force=True)[:3] == (2, [], 0)
+    assert len(_lines(output)) == 2
+
+
+def test_json_folder_output(data, tmp_path):
+    output = tmp_path / "json_out"
+    _run(data, output)
+    assert sorted(os.listdir(output / "S1")) == ["a.json", "b.json"]
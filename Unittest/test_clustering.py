@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+from clustering import (MAX_CLUSTER_ZOOM, bounds_contains, cell_size_deg, cluster_samples, drill_down_zoom,
+                        pad_bounds)
+
+
+def _samples():
+    return pd.DataFrame({
+        "sample_id": [1, 2, 3, 4],
+        "lat": [-31.95, -31.951, -31.952, -20.0],
+        "lon": [115.86, 115.861, 115.862, 130.0],
+    })
+
+
+def test_nearby_samples_are_grouped():
+    clusters, singles = cluster_samples(_samples(), zoom=5)
+    assert clusters["count"].tolist() == [3]
+    assert clusters["lat"].iloc[0] == pytest.approx(-31.951)
+    assert clusters["lon"].iloc[0] == pytest.approx(115.861)
+    assert singles["sample_id"].tolist() == [4]
+
+
+def test_counts_add_up_at_every_zoom():
+    samples = _samples()
+    for zoom in range(0, MAX_CLUSTER_ZOOM + 2):
+        clusters, singles = cluster_samples(samples, zoom)
+        assert clusters["count"].sum() + len(singles) == len(samples)
+
+
+def test_no_clusters_from_max_zoom():
+    clusters, singles = cluster_samples(_samples(), zoom=MAX_CLUSTER_ZOOM)
+    assert clusters.empty
+    assert len(singles) == 4
+
+
+def test_bounds_filter():
+    clusters, singles = cluster_samples(_samples(), zoom=5, bounds=[[-25, 125], [-15, 135]])
+    assert clusters.empty
+    assert singles["sample_id"].tolist() == [4]
+
+
+def test_helpers():
+    assert cell_size_deg(1) == 2 * cell_size_deg(2)
+    assert drill_down_zoom(None) == 2
+    assert drill_down_zoom(MAX_CLUSTER_ZOOM - 1) == MAX_CLUSTER_ZOOM
+    assert pad_bounds([[-10, -10], [10, 10]]) == [[-20, -20], [20, 20]]
+    assert pad_bounds([[-80, 170], [80, 179]])[1] == [90.0, 180.0]
+    assert bounds_contains([[-20, -20], [20, 20]], [[-10, -10], [10, 10]])
+    assert not bounds_contains([[-20, -20], [20, 20]], [[-10, -10], [30, 10]])
+    assert not bounds_contains(None, [[0, 0], [1, 1]])
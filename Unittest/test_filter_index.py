@@ -0,0 +1,84 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import FilterIndex
+
+
+def _index(ids=(1, 2, 3, 4, 5), sparse=False):
+    dates = ["2021-03-01", None, "2020-01-15", "2022-07-30", "2021-03-01"]
+    types = pd.DataFrame({"sample_id": [1, 1, 3, 4, 5, 99], "etype": ["SEM", "EDS", "TEM", "SEM", "EDS", "SEM"]})
+    if sparse:  # ids far apart take the binary search path instead of the lookup table
+        ids = [i * 1_000_000 for i in ids]
+        types["sample_id"] *= 1_000_000
+    return FilterIndex(list(ids), dates, types, version="v1")
+
+
+@pytest.fixture(params=[False, True], ids=["dense", "sparse"])
+def index(request):
+    return _index(sparse=request.param)
+
+
+@pytest.fixture
+def scale(index):
+    return 1_000_000 if index.ids.max() > 1000 else 1
+
+
+def test_types_and_bounds(index):
+    assert len(index) == 5
+    assert index.types == ["EDS", "SEM", "TEM"]
+    assert index.date_bounds() == (datetime.date(2020, 1, 15), datetime.date(2022, 7, 30))
+
+
+def test_date_window(index, scale):
+    ids = index.sample_ids("2021-01-01", "2021-12-31")
+    assert ids.tolist() == [1 * scale, 5 * scale]
+    # Open ends still leave out the sample without a date
+    assert index.sample_ids(None, None).tolist() == [s * scale for s in (1, 3, 4, 5)]
+
+
+def test_types(index, scale):
+    assert index.sample_ids(None, None, ["SEM"]).tolist() == [1 * scale, 4 * scale]
+    assert index.sample_ids(None, None, ["EDS", "TEM"]).tolist() == [s * scale for s in (1, 3, 5)]
+    assert index.sample_ids(None, None, ["XRD"]).tolist() == []
+    assert index.sample_ids("2021-01-01", "2021-12-31", ["SEM"]).tolist() == [1 * scale]
+
+
+def test_results_are_cached_and_read_only(index):
+    first = index.sample_ids("2021-01-01", None, ["SEM", "EDS"])
+    assert index.sample_ids("2021-01-01", None, ["EDS", "SEM"]) is first
+    with pytest.raises(ValueError):
+        first[0] = 0
+
+
+def test_mask_matches_sample_ids(index, scale):
+    viewport = np.array([5, 42, 1, 2, 4]) * scale
+    mask = index.mask(viewport, "2021-01-01", None, ["SEM", "EDS"])
+    assert mask.tolist() == [True, False, True, False, True]
+    expected = set(index.sample_ids("2021-01-01", None, ["SEM", "EDS"]).tolist())
+    assert set(viewport[mask].tolist()) == expected & set(viewport.tolist())
+
+
+def test_mask_against_pandas():
+    rng = np.random.default_rng(0)
+    n = 2_000
+    ids = rng.permutation(n) + 1
+    dates = pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3_000, n), unit="D")
+    types = pd.DataFrame({"sample_id": rng.choice(ids, 3_000), "etype": rng.choice(["SEM", "EDS", "TEM"], 3_000)})
+    index = FilterIndex(ids, list(dates), types)
+
+    start, end, wanted = "2017-01-01", "2019-06-30", ["EDS", "TEM"]
+    in_window = pd.Series((dates >= start) & (dates <= end), index=ids)
+    has_type = set(types.loc[types["etype"].isin(wanted), "sample_id"])
+    expected = sorted(i for i in ids if in_window[i] and i in has_type)
+    assert index.sample_ids(start, end, wanted).tolist() == expected
+
+
+def test_empty_index():
+    index = FilterIndex([], [], pd.DataFrame({"sample_id": [], "etype": []}))
+    assert len(index) == 0
+    assert index.date_bounds() == (None, None)
+    assert index.sample_ids(None, None, ["SEM"]).tolist() == []
+    assert index.mask([1, 2], None, None).tolist() == [False, False]
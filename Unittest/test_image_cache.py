@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import image_cache
+from image_cache import (ImageCacheError, _acquire_lock, _release_lock, cache_key, evict, get_rendition,
+                         rendition_path)
+
+
+class FakeResponse:
+    def __init__(self, body, status=200, headers=None):
+        self.body, self.status_code, self.headers = body, status, headers or {}
+        self.ok = status < 400
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise image_cache.requests.exceptions.HTTPError(f"{self.status_code}")
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+class FakeSession:
+    """Serves in-memory files by URL and counts the GETs."""
+
+    def __init__(self, files):
+        self.files = files
+        self.gets = 0
+
+    def head(self, url, timeout=None, allow_redirects=True):
+        body = self.files.get(url)
+        if body is None:
+            return FakeResponse(b"", 404)
+        return FakeResponse(b"", headers={"ETag": str(hash(body)), "Content-Length": str(len(body))})
+
+    def get(self, url, timeout=None, stream=False):
+        self.gets += 1
+        body = self.files.get(url)
+        return FakeResponse(body, 200) if body is not None else FakeResponse(b"", 404)
+
+
+def _tiff_bytes(size=(400, 300), value=128):
+    buffer = BytesIO()
+    Image.fromarray(np.full(size[::-1], value, np.uint8)).save(buffer, "tiff")
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def fresh_keys():
+    image_cache._key_memo.clear()
+
+
+def test_key_follows_the_validators():
+    session = FakeSession({"http://h/a.tif": _tiff_bytes()})
+    first = cache_key("http://h/a.tif", session)
+    assert cache_key("http://h/a.tif", session) == first
+    image_cache._key_memo.clear()
+    session.files["http://h/a.tif"] = _tiff_bytes(value=7)
+    assert cache_key("http://h/a.tif", session) != first
+
+
+def test_rendition_is_converted_once(tmp_path):
+    session = FakeSession({"http://h/a.tif": _tiff_bytes()})
+    path = get_rendition("http://h/a.tif", "thumb", str(tmp_path), session=session)
+    with Image.open(path) as img:
+        assert img.format == "JPEG"
+        assert max(img.size) == image_cache.RENDITIONS["thumb"]
+    assert os.path.exists(rendition_path(cache_key("http://h/a.tif", session), "preview", str(tmp_path)))
+    assert get_rendition("http://h/a.tif", "preview", str(tmp_path), session=session)
+    assert session.gets == 1
+
+
+def test_missing_image_raises_and_leaves_nothing(tmp_path):
+    with pytest.raises(ImageCacheError):
+        get_rendition("http://h/missing.tif", cache_dir=str(tmp_path), session=FakeSession({}))
+    leftovers = [f for _, _, files in os.walk(tmp_path) for f in files]
+    assert leftovers == []
+
+
+def test_concurrent_misses_decode_once(tmp_path):
+    session = FakeSession({"http://h/a.tif": _tiff_bytes()})
+    decodes = []
+
+    def slow_decode(source, key, cache_dir):
+        decodes.append(key)
+        time.sleep(0.3)
+        image_cache.build_renditions(source, key, cache_dir)
+
+    threads = [threading.Thread(target=get_rendition, args=("http://h/a.tif", "thumb", str(tmp_path)),
+                                kwargs={"session": session, "decode": slow_decode}) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(decodes) == 1
+
+
+def test_stale_lock_is_taken_over(tmp_path, monkeypatch):
+    lock = str(tmp_path / "k.lock")
+    assert _acquire_lock(lock)
+    monkeypatch.setattr(image_cache, "LOCK_TIMEOUT", 0.5)
+    old = time.time() - 10
+    os.utime(lock, (old, old))
+    assert _acquire_lock(lock)
+    _release_lock(lock)
+    assert not os.path.exists(lock)
+
+
+def test_held_lock_times_out(tmp_path, monkeypatch):
+    lock = str(tmp_path / "k.lock")
+    monkeypatch.setattr(image_cache, "LOCK_TIMEOUT", 0.3)
+    assert _acquire_lock(lock)
+    # Still being refreshed by its holder, so it never looks stale
+    future = time.time() + 60
+    os.utime(lock, (future, future))
+    start = time.monotonic()
+    assert not _acquire_lock(lock)
+    assert time.monotonic() - start >= 0.3
+    assert os.path.exists(lock)
+
+
+def _entry(cache_dir, name, size, age):
+    folder = cache_dir / name[:2]
+    folder.mkdir(exist_ok=True)
+    path = folder / name
+    path.write_bytes(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    old = _entry(tmp_path, "aa11_thumb.jpeg", 100, age=300)
+    middle = _entry(tmp_path, "bb22_thumb.jpeg", 100, age=200)
+    new = _entry(tmp_path, "cc33_thumb.jpeg", 100, age=100)
+    other = _entry(tmp_path, "dd44.lock", 500, age=400)  # not a rendition, never counted
+
+    assert evict(str(tmp_path), 150) == 200
+    assert not old.exists() and not middle.exists()
+    assert new.exists() and other.exists()
+    assert evict(str(tmp_path), 150) == 0
+
+
+def test_evict_keeps_the_current_key(tmp_path):
+    kept = _entry(tmp_path, "aa11_preview.jpeg", 100, age=300)
+    other = _entry(tmp_path, "bb22_preview.jpeg", 100, age=100)
+    assert evict(str(tmp_path), 100, keep="aa11") == 100
+    assert kept.exists() and not other.exists()
+
+
+def test_pyramids_count_against_the_budget(tmp_path):
+    pytest.importorskip("tifffile")
+    cache_dir, static = tmp_path / "cache", tmp_path / "static"
+    session = FakeSession({"http://h/a.tif": _tiff_bytes((600, 500)), "http://h/b.tif": _tiff_bytes((600, 500), 9)})
+    first = image_cache.get_pyramid("http://h/a.tif", str(static), session, str(cache_dir), max_bytes=10**9)
+    assert os.path.exists(first)
+    marker = image_cache.pyramid_marker_path(cache_key("http://h/a.tif", session), str(cache_dir))
+    size, out_dir = image_cache._read_marker(marker)
+    assert size > 0 and out_dir == os.path.dirname(os.path.abspath(first))
+
+    old = time.time() - 100
+    os.utime(marker, (old, old))
+    # A second pyramid with room for only one: the older one goes, the new one stays
+    second = image_cache.get_pyramid("http://h/b.tif", str(static), session, str(cache_dir), max_bytes=size)
+    assert os.path.exists(second)
+    assert not os.path.exists(first) and not os.path.exists(marker)
+    assert not [d for d in os.listdir(static) if d.endswith((".evicting", ".building", ".lock"))]
@@ -0,0 +1,61 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_io import iter_gray_rows, list_inputs, read_gray
+
+tifffile = pytest.importorskip("tifffile")
+from tiff_bands import iter_bands  # noqa: E402
+
+
+def _write(path, array, **kwargs):
+    tifffile.imwrite(str(path), array, **kwargs)
+    return str(path)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16, np.int8, np.int16, np.int32])
+def test_integer_samples_map_to_8_bit_in_order(tmp_path, dtype):
+    info = np.iinfo(dtype)
+    ramp = np.linspace(info.min, info.max, 64 * 50).astype(dtype).reshape(64, 50)
+    gray = np.concatenate([band for _, band in iter_bands(_write(tmp_path / "ramp.tif", ramp, rowsperstrip=8),
+                                                          gray=True)])
+    assert gray.shape == ramp.shape
+    assert (np.diff(gray.ravel().astype(int)) >= 0).all()  # nothing wraps around
+    assert gray[0, 0] == 0
+    assert gray[-1, -1] >= 254
+    if info.min < 0:
+        assert (gray[ramp <= 0] == 0).all()
+
+
+def test_gray_rows_are_rebuffered(tmp_path):
+    image = np.random.default_rng(1).integers(0, 65536, (100, 40), dtype=np.uint16)
+    path = _write(tmp_path / "large.tif", image, rowsperstrip=7)
+    blocks = list(iter_gray_rows(path, 30))
+    assert [y for y, _ in blocks] == [0, 30, 60, 90]
+    assert [len(block) for _, block in blocks] == [30, 30, 30, 10]
+    assert (np.concatenate([block for _, block in blocks]) == (image >> 8)).all()
+    assert (np.concatenate([block for _, block in blocks]) == read_gray(path)).all()
+
+
+@pytest.mark.parametrize("dtype", [np.uint16, np.int32])
+def test_read_gray_matches_the_streamed_rows(tmp_path, dtype):
+    image = np.random.default_rng(2).integers(0, np.iinfo(dtype).max, (50, 30), dtype=dtype)
+    path = _write(tmp_path / "deep.tif", image, rowsperstrip=4)
+    streamed = np.concatenate([block for _, block in iter_gray_rows(path, 16)])
+    assert (read_gray(path) == streamed).all()
+    # Images PIL decodes (here from a buffer) map to 8 bit the same way
+    buffer = BytesIO()
+    Image.fromarray(image).save(buffer, "TIFF")
+    assert (read_gray(BytesIO(buffer.getvalue())) == streamed).all()
+
+
+def test_list_inputs(tmp_path):
+    (tmp_path / "a").mkdir()
+    for name in ("a/1.tif", "a/2.png", "a/notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    manifest = tmp_path / "list.txt"
+    manifest.write_text(f"{tmp_path / 'a' / '2.png'}\n{tmp_path / 'x.bmp'}\n")
+    assert list_inputs([str(tmp_path / "a"), str(manifest)]) == [
+        str(tmp_path / "a" / "1.tif"), str(tmp_path / "a" / "2.png"), str(tmp_path / "x.bmp")]
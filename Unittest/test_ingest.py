@@ -0,0 +1,102 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine, make_url, text
+
+from ingest import RowBuilder, ingest, parse_date
+
+
+def _records(root):
+    # batch_extract NDJSON: a JEOL pair and a TIFF-only record, in two sample folders
+    return [
+        {"path": str(root / "S1" / "a.tif"), "id": "a", "machine": "JSM-7001F", "date_taken": "2023-05-14",
+         "metadata": {"CM_MAG": "5000"}},
+        {"path": str(root / "S1" / "b.tif"), "image": "b.tif",
+         "metadata": {"34118": [{"plain": {"SystemType": "SUPRA 55", "Date": "05/01/2024"}}]}},
+        {"path": str(root / "S2" / "c.tif"), "id": "c", "machine": "JSM-7001F", "date_taken": "2022/01/02",
+         "metadata": {}},
+    ]
+
+
+def _write(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+    return str(path)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'standin.db'}")
+
+
+def _table(engine, sql):
+    with engine.connect() as conn:
+        return conn.execute(text(sql)).fetchall()
+
+
+def test_ingest_and_rerun_changes_nothing(tmp_path, engine):
+    results = _write(tmp_path / "results.ndjson", _records(tmp_path))
+    first = ingest(engine, [results], roots=[str(tmp_path)], url_prefix="https://data.example.org/sem/",
+                   batch_size=2)
+    assert (first["records"], first["inserted"], first["updated"]) == (3, 3, 0)
+    assert (first["new_samples"], first["new_equipment"]) == (2, 2)
+    before = _table(engine, "SELECT * FROM SampleImage ORDER BY id")
+
+    second = ingest(engine, [results], roots=[str(tmp_path)], url_prefix="https://data.example.org/sem/",
+                    batch_size=2)
+    assert (second["inserted"], second["updated"], second["new_samples"], second["new_equipment"]) == (0, 0, 0, 0)
+    assert _table(engine, "SELECT * FROM SampleImage ORDER BY id") == before
+    assert len(_table(engine, "SELECT * FROM Sample")) == 2
+
+
+def test_rows_and_changed_rows(tmp_path, engine):
+    records = _records(tmp_path)
+    ingest(engine, [_write(tmp_path / "results.ndjson", records)], roots=[str(tmp_path)],
+           url_prefix="https://data.example.org/sem")
+    rows = _table(engine, """
+        SELECT si.image_url, s.sample_name, e.name, si.date_obtained FROM SampleImage si
+        JOIN Sample s ON s.id = si.sample_id JOIN Equipment e ON e.id = si.equipment_id ORDER BY si.image_url""")
+    assert rows == [
+        ("https://data.example.org/sem/S1/a.tif", "S1", "JSM-7001F", "2023-05-14"),
+        ("https://data.example.org/sem/S1/b.tif", "S1", "SUPRA 55", "2024-05-01"),
+        ("https://data.example.org/sem/S2/c.tif", "S2", "JSM-7001F", "2022-01-02"),
+    ]
+
+    records[0]["metadata"]["CM_MAG"] = "10000"
+    stats = ingest(engine, [_write(tmp_path / "results.ndjson", records)], roots=[str(tmp_path)],
+                   url_prefix="https://data.example.org/sem")
+    assert (stats["inserted"], stats["updated"]) == (0, 1)
+
+
+def test_document_references_are_linked_once(tmp_path, engine):
+    results = _write(tmp_path / "results.ndjson", _records(tmp_path))
+    first = ingest(engine, [results], roots=[str(tmp_path)], document="Smith et al. 2021")
+    second = ingest(engine, [results], roots=[str(tmp_path)], document="Smith et al. 2021")
+    assert (first["references"], second["references"]) == (2, 0)
+
+
+def test_row_builder_without_root_or_prefix(tmp_path):
+    build = RowBuilder(sample="Smith2021")
+    row = build(str(tmp_path / "x" / "img.tif"), {"metadata": {"Date": "2024/05/01"}})
+    assert row["sample_name"] == "Smith2021"
+    assert row["image_url"].endswith("/x/img.tif")
+    assert row["date_obtained"] == "2024-05-01"
+    assert row["equipment"] is None
+
+
+def test_parse_date():
+    assert parse_date("2023/05/14") == "2023-05-14"
+    assert parse_date("05-01-2024") == "2024-05-01"
+    assert parse_date("") is None
+    assert parse_date("not a date") is None
+
+
+def test_database_url_escapes_the_password(monkeypatch):
+    from database import database_url
+
+    for key, value in {"DB_USER": "sem", "DB_PASS": "p@ss/w:rd", "DB_HOST": "db.example.org",
+                       "DB_PORT": "5433", "DB_NAME": "atlas"}.items():
+        monkeypatch.setenv(key, value)
+    url = database_url()
+    assert (url.username, url.password, url.host, url.port, url.database) == \
+        ("sem", "p@ss/w:rd", "db.example.org", 5433, "atlas")
+    assert make_url(url.render_as_string(hide_password=False)).password == "p@ss/w:rd"
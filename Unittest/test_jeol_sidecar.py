@@ -0,0 +1,141 @@
+import codecs
+import datetime
+import re
+
+from jeol_sidecar import (decode, parse_folder, to_date, to_floats, to_kilovolts, to_micrometres, to_time,
+                          tokenize, typed_values)
+from sem_extract import extract_from_image_and_text
+
+SIDECAR = (
+    "$CM_FORMAT JEOL/SEM\n"
+    "$CM_INSTRUMENT JSM-7001F\n"
+    "$CM_DATE 2023/05/14\n"
+    "$CM_TIME 13:45:02\n"
+    "$CM_ACCEL_VOLT 15.00\n"
+    "$CM_MAG 5000\n"
+    "$CM_FULL_SIZE 1280 960\n"
+    "$CM_MICRON_BAR 128\n"
+    "$CM_MICRON_MARKER 10um\n"
+    "$$SM_WD 10.2\n"
+    "$$SM_STAGE_POS 1.5 2.5 10 0 90\n"
+)
+
+
+def test_tokenize_keys_values_and_dialect():
+    raw, dialect = tokenize(SIDECAR)
+    assert dialect == "$$SM"
+    assert raw["CM_INSTRUMENT"] == "JSM-7001F"
+    assert raw["SM_WD"] == "10.2"  # leading "$" stripped for both prefixes
+    assert len(raw) == 11
+
+
+def test_tokenize_tabs_line_endings_and_single_dollar():
+    raw, dialect = tokenize("$CM_MAG\t5000\r\n  $SM_WD\t8.0\r$CM_TITLE  a title \n junk line\n")
+    assert dialect == "$SM"
+    assert raw == {"CM_MAG": "5000", "SM_WD": "8.0", "CM_TITLE": "a title"}
+
+
+def _regex_tokenize(text):
+    """The per-line regex parser tokenize replaced (parse_jeol_metadata in the original app.py)."""
+    d = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("$"):
+            m = re.match(r"^\$+([A-Z0-9_%]+)\s*(.*)$", line)
+            if m: k, v = m.groups(); d[k.strip()] = v.strip()
+    return d
+
+
+def test_tokenize_matches_the_regex_grammar():
+    text = SIDECAR + (
+        "$cm_lower 1\n"          # lowercase keys never matched
+        "$CM_MAG=5000\n"         # the key ends at the first character outside [A-Z0-9_%]
+        "$CM-DASH x\n"
+        "$CM_SPACED    padded value  \n"
+        "$CM_EMPTY\n"
+        "$CM_GLUED\tvalue\twith tabs\n"
+        "$SM_100%_RATIO 3\n"
+        "$ no key\n"
+        "$$$\n"
+        "$CM_µ 1\n"
+    )
+    raw, _ = tokenize(text)
+    assert raw == _regex_tokenize(text)
+    assert raw["CM_MAG"] == "=5000"
+    assert raw["CM"] == "-DASH x"
+    assert "cm_lower" not in raw
+
+
+def test_tokenize_repeated_key_keeps_last():
+    raw, _ = tokenize("$CM_MAG 100\n$CM_MAG 200\n")
+    assert raw == {"CM_MAG": "200"}
+
+
+def test_decode_encodings():
+    text = "$CM_OPERATOR 山田\n"
+    assert decode(codecs.BOM_UTF8 + text.encode("utf-8")) == text
+    assert decode(text.encode("utf-16")) == text
+    assert decode(text.encode("cp932")) == text
+
+
+def test_converters():
+    assert to_kilovolts("15.00") == 15.0
+    assert to_kilovolts("15000 V") == 15.0
+    assert to_kilovolts("20000") == 20.0
+    assert to_micrometres("500nm") == 0.5
+    assert to_micrometres("10 um") == 10.0
+    assert to_micrometres("1mm") == 1000.0
+    assert to_date("2023/05/14") == datetime.date(2023, 5, 14)
+    assert to_date("2023-05-14") == datetime.date(2023, 5, 14)
+    assert to_date("14/05/2023") == datetime.date(2023, 5, 14)
+    assert to_date("yesterday") is None
+    assert to_time("13:45:02") == datetime.time(13, 45, 2)
+    assert to_time("13") is None
+    assert to_floats(2)("1280x960") == (1280.0, 960.0)
+    assert to_floats(3)("1 2") == (1.0, 2.0, None)
+
+
+def test_typed_values():
+    raw, _ = tokenize(SIDECAR)
+    values = typed_values(raw)
+    assert values["instrument"] == "JSM-7001F"
+    assert values["accel_kv"] == 15.0
+    assert values["magnification"] == 5000.0
+    assert (values["width_px"], values["height_px"]) == (1280.0, 960.0)
+    assert values["stage_rotation"] == 90.0
+    assert values["acquired"] == datetime.datetime(2023, 5, 14, 13, 45, 2)
+    assert values["pixel_size_nm"] == 10 * 1000 / 128
+
+
+def test_typed_values_bad_value_is_none():
+    values = typed_values({"CM_MAG": "n/a", "CM_DATE": "2023/13/40"})
+    assert values["magnification"] is None
+    assert values["date"] is None
+
+
+def test_parse_folder_reads_only_changed_files(tmp_path):
+    (tmp_path / "a.txt").write_text(SIDECAR)
+    (tmp_path / "b.txt").write_text(SIDECAR.replace("$CM_MAG 5000", "$CM_MAG 2000"))
+    first, parsed = parse_folder(tmp_path)
+    assert parsed == 2
+    assert first["magnification"].tolist() == [5000.0, 2000.0]
+
+    (tmp_path / "b.txt").write_text(SIDECAR.replace("$CM_MAG 5000", "$CM_MAG 30000"))
+    second, parsed = parse_folder(tmp_path, previous=first)
+    assert parsed == 1
+    assert second["magnification"].tolist() == [5000.0, 30000.0]
+    assert second["instrument"].tolist() == ["JSM-7001F", "JSM-7001F"]
+
+
+def test_image_and_sidecar_names_keep_the_written_date(tmp_path):
+    image = tmp_path / "grain.tif"
+    sidecar = tmp_path / "grain.txt"
+    sidecar.write_text("$CM_INSTRUMENT  JSM-7001F \n$CM_DATE 14/05/2023\n")
+    record = extract_from_image_and_text(str(image), str(sidecar))
+    assert (record["machine"], record["date_taken"]) == ("JSM-7001F", "14-05-2023")
+    assert record["image_file"] == "grain_JSM-7001F_14-05-2023.tif"
+    assert record["values"]["date"] == "2023-05-14"
+
+    sidecar.write_text("$CM_MAG 100\n")
+    record = extract_from_image_and_text(str(image), str(sidecar))
+    assert record["metadata_file"] == "grain_Unknown_Unknown.txt"
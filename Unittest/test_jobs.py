@@ -0,0 +1,114 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from jobs import CANCELLED, DONE, FAILED, FINISHED, HERE, RUNNING, JobManager, run_command
+
+
+def _finish(manager, *jobs, timeout=30):
+    deadline = time.monotonic() + timeout
+    while any(job.state not in FINISHED for job in jobs):
+        assert time.monotonic() < deadline, "job did not finish"
+        manager.dispatch()
+        time.sleep(0.01)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"  # a zombie has already exited
+    except OSError:
+        return True
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(workers=1)
+    yield manager
+    manager.shutdown()
+
+
+def test_messages_and_states_reach_the_main_thread(manager):
+    seen = []
+    job = manager.submit("ok", lambda job, emit: emit({"n": 1}), on_message=lambda job, msg: seen.append(msg))
+    failing = manager.submit("bad", lambda job, emit: 1 / 0)
+    _finish(manager, job, failing)
+    assert seen == [{"state": "queued"}, {"state": RUNNING}, {"n": 1}, {"state": DONE}]
+    assert failing.state == FAILED
+    assert manager.active() == 0
+
+
+def test_cancelled_jobs_never_start(manager):
+    release, ran = threading.Event(), []
+    blocker = manager.submit("blocker", lambda job, emit: release.wait(10))
+    waiting = manager.submit("waiting", lambda job, emit: ran.append(job))
+    waiting.cancel()
+    release.set()
+    _finish(manager, blocker, waiting)
+    assert (blocker.state, waiting.state, ran) == (DONE, CANCELLED, [])
+
+
+def test_run_command_emits_json_lines(manager):
+    script = ("import json, sys\n"
+              "print(json.dumps({'step': 1}))\n"
+              "print('{not json')\n"
+              "print(json.dumps({'step': 2}))\n"
+              "sys.exit(3)\n")
+    messages = []
+    job = manager.submit("cmd", run_command([sys.executable, "-c", script]),
+                         on_message=lambda job, msg: messages.append(msg))
+    _finish(manager, job)
+    assert [m for m in messages if "step" in m] == [{"step": 1}, {"step": 2}]
+    assert messages[-1] == {"state": FAILED, "error": "{not json"}
+
+    job = manager.submit("cmd", run_command([sys.executable, "-c", script], ok_codes=(3,)))
+    _finish(manager, job)
+    assert job.state == DONE
+
+
+@pytest.mark.skipif(os.name == "nt", reason="checks POSIX process groups")
+def test_cancel_stops_the_whole_process_tree(manager):
+    # The child starts a grandchild, as batch_extract starts its process pool
+    script = ("import json, subprocess, sys, time\n"
+              "grandchild = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+              "print(json.dumps({'pid': grandchild.pid}), flush=True)\n"
+              "time.sleep(60)\n")
+    pids = []
+    job = manager.submit("tree", run_command([sys.executable, "-c", script]),
+                         on_message=lambda job, msg: pids.append(msg.get("pid")))
+    deadline = time.monotonic() + 30
+    while not any(pids):
+        assert time.monotonic() < deadline
+        manager.dispatch()
+        time.sleep(0.01)
+    child = job._proc
+    job.cancel()
+    _finish(manager, job)
+    assert job.state == CANCELLED
+    assert child.poll() is not None
+    grandchild = next(pid for pid in pids if pid)
+    deadline = time.monotonic() + 10
+    while _alive(grandchild):
+        assert time.monotonic() < deadline, "grandchild still running"
+        time.sleep(0.05)
+
+
+def test_batch_extract_prints_only_json_with_json_progress(tmp_path):
+    for i in range(3):
+        Image.fromarray(np.full((8, 8), i * 50, np.uint8)).save(tmp_path / f"{i}.tif")
+    argv = [sys.executable, str(HERE / "batch_extract.py"), str(tmp_path), "--json-progress", "--workers", "1"]
+    out = subprocess.run(argv, capture_output=True, text=True, encoding="utf-8", timeout=120).stdout
+    messages = [json.loads(line) for line in out.splitlines()]
+    assert [m["processed"] for m in messages] == [1, 2, 3]
+    assert all(m["error"] is None for m in messages)
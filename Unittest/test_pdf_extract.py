@@ -0,0 +1,70 @@
+import csv
+import os
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+fitz = pytest.importorskip("fitz")
+from pdf_extract import extract_pdf_images, page_ranges  # noqa: E402
+
+PAGES = 12
+
+
+def _png(value):
+    buffer = BytesIO()
+    Image.fromarray(np.full((20, 30, 3), value, np.uint8)).save(buffer, "png")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def report(tmp_path):
+    """Every page has the same logo and its own figure. Odd pages reuse the logo's xref,
+    even pages embed the logo bytes again, so duplicates show up both ways and across ranges."""
+    path = str(tmp_path / "report.pdf")
+    logo = _png(255)
+    with fitz.open() as doc:
+        logo_xref = 0
+        for i in range(PAGES):
+            page = doc.new_page()
+            if logo_xref and i % 2:
+                page.insert_image(fitz.Rect(0, 0, 30, 20), xref=logo_xref)
+            else:
+                xref = page.insert_image(fitz.Rect(0, 0, 30, 20), stream=logo)
+                logo_xref = logo_xref or xref
+            page.insert_image(fitz.Rect(50, 50, 80, 70), stream=_png(i))
+        doc.save(path)
+    return path
+
+
+def test_page_ranges():
+    assert page_ranges(10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert page_ranges(0, 4) == []
+
+
+@pytest.mark.parametrize("pages_per_task", [1, 5, PAGES])
+def test_each_image_is_saved_once(report, tmp_path, pages_per_task):
+    out = tmp_path / f"out_{pages_per_task}"
+    summary = extract_pdf_images(report, str(out), workers=2, pages_per_task=pages_per_task)
+    assert (summary["pages"], summary["images"]) == (PAGES, 2 * PAGES)
+    assert (summary["unique"], summary["duplicates"]) == (PAGES + 1, PAGES - 1)
+
+    with open(summary["metadata_path"], newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [int(r["Page"]) for r in rows] == sorted(int(r["Page"]) for r in rows)
+    assert all(os.path.exists(r["File Path"]) for r in rows)
+
+    files = [f for f in os.listdir(out) if not f.startswith("image_metadata")]
+    assert len(files) == PAGES + 1
+    logos = [r for r in rows if r["Image Number"] == "1"]
+    assert {r["Filename"] for r in logos} == {"page1_img1.png"}
+    assert [r["Duplicate Of"] for r in logos] == [""] + ["page1_img1.png"] * (PAGES - 1)
+    assert len({r["Content Hash"] for r in rows}) == PAGES + 1
+
+
+def test_parquet_output(report, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    summary = extract_pdf_images(report, str(tmp_path / "out"), workers=2, fmt="parquet", pages_per_task=5)
+    table = pq.read_table(summary["metadata_path"])
+    assert table.num_rows == 2 * PAGES
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from PIL import Image, TiffImagePlugin
+
+from scale_labels import metadata_pixel_size, scale_value_nm
+
+
+def _tiff(path, tag=None, text=None):
+    info = TiffImagePlugin.ImageFileDirectory_v2()
+    if tag is not None:
+        info[tag] = text
+        info.tagtype[tag] = 2  # ASCII
+    Image.fromarray(np.zeros((8, 8), np.uint8)).save(path, tiffinfo=info)
+    if text and "µ" in text:
+        # Zeiss writes µ as Latin-1 0xB5; PIL can only write ASCII tags and leaves "?"
+        path.write_bytes(path.read_bytes().replace(text.replace("µ", "?").encode(), text.encode("latin-1")))
+    return str(path)
+
+
+def test_fei_pixel_width(tmp_path):
+    path = _tiff(tmp_path / "fei.tif", 34682, "[User]\r\nDate=1\r\n[Scan]\r\nPixelWidth=2.5e-09\r\n")
+    assert metadata_pixel_size(path) == pytest.approx(2.5)
+
+
+@pytest.mark.parametrize("value, nm", [("3.1 nm", 3.1), ("1.2 µm", 1200.0), ("450 pm", 0.45)])
+def test_zeiss_pixel_size(tmp_path, value, nm):
+    path = _tiff(tmp_path / "zeiss.tif", 34118, f"0\r\n AP_PIXEL_SIZE\r\nPixel Size = {value}\r\n")
+    assert metadata_pixel_size(path) == pytest.approx(nm)
+
+
+def test_no_stored_pixel_size(tmp_path):
+    assert metadata_pixel_size(_tiff(tmp_path / "plain.tif")) is None
+    assert metadata_pixel_size(_tiff(tmp_path / "other.tif", 34118, "WD = 5 mm\r\n")) is None
+    Image.fromarray(np.zeros((8, 8), np.uint8)).save(tmp_path / "image.png")
+    assert metadata_pixel_size(str(tmp_path / "image.png")) is None
+
+
+def test_scale_value_nm():
+    assert scale_value_nm("10µm") == 10_000
+    assert scale_value_nm("1 mm") == 1_000_000
@@ -0,0 +1,42 @@
+from sem_extract import convert_meta_to_json, parse_jeol_metadata, parse_value
+
+FEI_INI = "[User]\r\nDate=05/01/2024\r\n[Scan]\r\nPixelWidth=2.5e-09\r\n"
+FIBICS_XML = '<?xml version="1.0"?><Fibics xmlns="urn:fibics"><Scan><Ux>1.5</Ux></Scan></Fibics>'
+
+
+def test_parse_value_key_value_text():
+    assert parse_value("a = 1\nb=two\nno separator") == {"plain": {"a": "1", "b": "two"}}
+
+
+def test_parse_value_xml_strips_namespaces():
+    assert parse_value(FIBICS_XML) == {"Fibics": {"Scan": {"Ux": "1.5"}}}
+
+
+def test_parse_value_plain_and_broken_xml_stay_text():
+    assert parse_value("just a note") == "just a note"
+    assert parse_value("<not closed") == "<not closed"
+
+
+def test_parse_value_scalars_bytes_and_sequences():
+    assert parse_value(5) == 5
+    assert parse_value(None) is None
+    assert parse_value(b"k=v") == {"plain": {"k": "v"}}
+    assert parse_value((1, 2.5, 3)) == [1, 2.5, 3]
+    assert parse_value(("x=1", 2)) == [{"plain": {"x": "1"}}, 2]
+    assert parse_value(object()) is None
+
+
+def test_convert_meta_to_json_vendor_tags():
+    meta = {34682: (FEI_INI,), 34118: ("Pixel Size = 3.1 nm\r\nWD = 5 mm\r\n",), 270: FIBICS_XML, 256: 1024}
+    out = convert_meta_to_json(meta)
+    assert out["34682"] == [{"plain": {"Date": "05/01/2024", "PixelWidth": "2.5e-09"}}]
+    assert out["34118"] == [{"plain": {"Pixel Size": "3.1 nm", "WD": "5 mm"}}]
+    assert out["270"] == {"Fibics": {"Scan": {"Ux": "1.5"}}}
+    assert out["256"] == 1024
+
+
+def test_parse_jeol_metadata(tmp_path):
+    sidecar = tmp_path / "a.txt"
+    sidecar.write_text("$CM_MAG 5000\n$$SM_WD 10.2\n")
+    assert parse_jeol_metadata(sidecar) == {"CM_MAG": "5000", "SM_WD": "10.2"}
+    assert "Error" in parse_jeol_metadata(tmp_path / "missing.txt")
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from similarity import EXACT_BELOW, SimilarityIndex
+
+
+def _vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def _index(n=50):
+    vectors = _vectors(n)
+    images = pd.DataFrame({"image_id": np.arange(n) + 100, "sample_id": np.arange(n) // 5})
+    return vectors, SimilarityIndex.build(vectors, np.arange(n) + 100, np.arange(n) // 5, images)
+
+
+def test_search_finds_itself_first():
+    vectors, index = _index()
+    rows, scores = index.search(vectors[7], k=3)
+    assert rows[0] == 7
+    assert scores[0] > 0.99
+    assert (np.diff(scores) <= 0).all()
+
+
+def test_exclude_samples():
+    vectors, index = _index()
+    rows, _ = index.search(vectors[7], k=10, exclude_samples=[1])  # rows 5..9 are sample 1
+    assert not set(rows.tolist()) & {5, 6, 7, 8, 9}
+
+
+def test_similar_leaves_out_the_same_sample():
+    _, index = _index()
+    similar = index.similar(107, k=4)
+    assert len(similar) == 4
+    assert 1 not in similar["sample_id"].tolist()
+    assert index.similar(999).empty
+
+
+def test_add_replaces_and_remove_drops():
+    vectors, index = _index()
+    moved = _vectors(1, seed=1)[0]
+    index.add(moved[None], [107], [9])
+    assert len(index) == 50
+    assert index.sample_ids[index.row(107)] == 9
+    rows, _ = index.search(moved, k=1)
+    assert index.image_ids[rows[0]] == 107
+
+    index.remove([107, 12345])
+    assert len(index) == 49
+    assert index.row(107) is None
+    assert index.row(108) is not None
+
+
+def test_inverted_lists_agree_with_exact_search():
+    n = EXACT_BELOW + 500
+    vectors = _vectors(n, seed=2)
+    index = SimilarityIndex.build(vectors, np.arange(n), np.arange(n))
+    assert index.centroids is not None
+    exact = SimilarityIndex(index.vectors, index.image_ids, index.sample_ids)  # no lists, brute force
+    for q in vectors[:5]:
+        rows, _ = index.search(q, k=1, nprobe=len(index.centroids))
+        assert rows.tolist() == exact.search(q, k=1)[0].tolist()
+
+
+def test_save_and_load(tmp_path):
+    vectors, index = _index()
+    index.save(str(tmp_path))
+    loaded = SimilarityIndex.load(str(tmp_path))
+    assert len(loaded) == len(index)
+    assert loaded.images.equals(index.images)
+    assert loaded.search(vectors[3], k=1)[0][0] == 3
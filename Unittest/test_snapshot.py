@@ -0,0 +1,165 @@
+import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from sqlalchemy import create_engine, text
+
+import snapshot
+from data_access import DATA_VERSION_COLUMNS
+from snapshot import Snapshot, merge_rows, refresh_snapshot
+
+# SQLite stand-ins for the PostGIS queries, with the same table aliases
+SAMPLES_SQL = """
+    SELECT s.id AS sample_id, s.sample_name AS name, s.description AS "desc", s.sample_image_url,
+           s.lat, s.lon, s.date_collected AS date
+    FROM Sample s
+"""
+IMAGES_QUERY = text("""
+    SELECT si.id AS image_id, si.sample_id, si.image_url AS path, si.caption,
+           e.name AS equipment, e.type AS etype, si.date_obtained AS date
+    FROM SampleImage si
+    LEFT JOIN Equipment e ON si.equipment_id = e.id
+""")
+REFERENCES_QUERY = text("""
+    SELECT r.sample_id, d.document_name AS name, d.document_url AS link
+    FROM Reference r
+    JOIN Document d ON r.document_id = d.document_id
+""")
+VERSION_QUERY = text("SELECT " + ", ".join(DATA_VERSION_COLUMNS + [
+    "(SELECT MAX(updated_at) FROM Sample) AS sample_updated",
+    "(SELECT MAX(updated_at) FROM SampleImage) AS sampleimage_updated",
+]))
+
+SCHEMA = [
+    "CREATE TABLE Sample (id INTEGER PRIMARY KEY, sample_name TEXT, description TEXT, sample_image_url TEXT,"
+    " lat REAL, lon REAL, date_collected TEXT, updated_at TEXT)",
+    "CREATE TABLE Equipment (id INTEGER PRIMARY KEY, name TEXT, type TEXT)",
+    "CREATE TABLE SampleImage (id INTEGER PRIMARY KEY, sample_id INTEGER, image_url TEXT, caption TEXT,"
+    " equipment_id INTEGER, date_obtained TEXT, updated_at TEXT)",
+    "CREATE TABLE Document (document_id INTEGER PRIMARY KEY, document_name TEXT, document_url TEXT)",
+    "CREATE TABLE Reference (sample_id INTEGER, document_id INTEGER)",
+    "INSERT INTO Equipment VALUES (1, 'Quanta', 'SEM'), (2, 'Tecnai', 'TEM')",
+    "INSERT INTO Sample VALUES (1, 'a', 'first', 'a.tif', -30.0, 150.0, '2020-01-01', '2024-01-01'),"
+    " (2, 'b', NULL, 'b.tif', -31.0, 151.0, NULL, '2024-01-01'),"
+    " (3, 'c', 'no origin', NULL, NULL, NULL, '2021-06-01', '2024-01-01')",
+    "INSERT INTO SampleImage VALUES (1, 1, 'a1.tif', 'x', 1, '2020-01-02', '2024-01-01'),"
+    " (2, 1, 'a2.tif', 'y', 2, NULL, '2024-01-01'), (3, 2, 'b1.tif', NULL, NULL, NULL, '2024-01-01')",
+    "INSERT INTO Document VALUES (1, 'paper', 'http://doc/1')",
+    "INSERT INTO Reference VALUES (1, 1), (3, 1)",
+]
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_SAMPLES_SQL", SAMPLES_SQL)
+    monkeypatch.setattr(snapshot, "ALL_IMAGES_QUERY", IMAGES_QUERY)
+    monkeypatch.setattr(snapshot, "ALL_REFERENCES_QUERY", REFERENCES_QUERY)
+    monkeypatch.setattr(snapshot, "data_version_query", lambda engine: VERSION_QUERY)
+    engine = create_engine(f"sqlite:///{tmp_path / 'catalogue.db'}")
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+    yield engine
+    engine.dispose()
+
+
+def _run(engine, *statements):
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+
+
+def test_merge_rows_replaces_and_adds():
+    old = pa.table({"id": [1, 2, 3], "v": pa.array(["a", "b", "c"]).dictionary_encode()})
+    delta = pa.table({"id": [2, 4], "v": pa.array(["B", "d"]).dictionary_encode()})
+    merged = merge_rows(old, delta, "id")
+    assert sorted(zip(merged["id"].to_pylist(), merged["v"].to_pylist())) == [
+        (1, "a"), (2, "B"), (3, "c"), (4, "d")]
+    assert merge_rows(old, delta.slice(0, 0), "id") is old
+
+
+def test_snapshot_lookups(engine, tmp_path):
+    path = str(tmp_path / "snap")
+    assert refresh_snapshot(engine, path) == "full"
+    snap = Snapshot(path)
+    assert len(snap) == 3
+    assert all(isinstance(t, pa.Table) for t in snap.tables.values())
+    assert not snap._ids.flags.writeable  # a view of the memory map, not a copy
+
+    view = snap.viewport([[-30.5, 149], [-29, 152]])
+    assert list(view["sample_id"]) == [1]
+    assert list(view.columns) == ["sample_id", "name", "desc", "sample_image_url", "lat", "lon", "date"]
+    assert view["date"][0] == datetime.date(2020, 1, 1)
+
+    assert snap.sample(2) == {"sample_id": 2, "name": "b", "desc": None, "sample_image_url": "b.tif",
+                              "lat": -31.0, "lon": 151.0, "date": None}
+    assert snap.sample(4) is None and snap.sample(0) is None
+
+    images, references = snap.sample_details(1)
+    assert list(images["image_id"]) == [1, 2]
+    assert list(images["etype"].astype(object)) == ["SEM", "TEM"]
+    assert list(references["link"]) == ["http://doc/1"]
+    images, references = snap.sample_details(3)
+    assert images.empty and list(references["sample_id"]) == [3]
+
+    index = snap.filter_index()
+    assert len(index) == 3
+    assert index.types == ["SEM", "TEM"]
+
+
+def test_incremental_refresh(engine, tmp_path):
+    path = str(tmp_path / "snap")
+    refresh_snapshot(engine, path)
+    assert refresh_snapshot(engine, path) == "current"
+    _run(engine,
+         "UPDATE Sample SET sample_name = 'b2', updated_at = '2024-02-01' WHERE id = 2",
+         "INSERT INTO Sample VALUES (4, 'd', NULL, NULL, -32.0, 152.0, '2022-01-01', '2024-02-01')",
+         "INSERT INTO SampleImage VALUES (4, 4, 'd1.tif', NULL, 2, NULL, '2024-02-01')",
+         "UPDATE SampleImage SET equipment_id = 2, updated_at = '2024-02-01' WHERE id = 1",
+         "INSERT INTO Reference VALUES (4, 1)")
+    assert refresh_snapshot(engine, path) == "incremental"
+
+    snap = Snapshot(path)
+    assert list(snap._ids) == [1, 2, 3, 4]
+    assert snap.sample(2)["name"] == "b2"
+    assert snap.manifest["high_water"] == {"samples": 4, "images": 4}
+    images, _ = snap.sample_details(1)
+    assert list(images["etype"].astype(object)) == ["TEM", "TEM"]
+    _, references = snap.sample_details(4)
+    assert len(references) == 1
+    assert snap.filter_index().types == ["TEM"]  # the only SEM image moved to the TEM
+    assert refresh_snapshot(engine, path) == "current"
+
+
+def test_deletes_fall_back_to_a_full_export(engine, tmp_path, monkeypatch):
+    path = str(tmp_path / "snap")
+    refresh_snapshot(engine, path)
+    _run(engine,
+         "DELETE FROM SampleImage WHERE sample_id = 2",
+         "DELETE FROM Sample WHERE id = 2",
+         "INSERT INTO Sample VALUES (5, 'e', NULL, NULL, 0.0, 0.0, NULL, '2024-02-01')")
+    exports = []
+    export = snapshot.export_snapshot
+    monkeypatch.setattr(snapshot, "export_snapshot", lambda *args: exports.append(1) or export(*args))
+    assert refresh_snapshot(engine, path) == "full"
+    assert exports == [1]
+    snap = Snapshot(path)
+    assert list(snap._ids) == [1, 3, 5]
+    assert snap.sample_details(2)[0].empty
+
+
+def test_write_snapshot_sorts_frames(tmp_path):
+    frames = {
+        "samples": pd.DataFrame({"sample_id": [2, 1], "name": ["b", "a"], "desc": [None, None],
+                                 "sample_image_url": [None, None], "lat": [1.0, 2.0], "lon": [1.0, 2.0],
+                                 "date": [None, None]}),
+        "images": pd.DataFrame(columns=["image_id", "sample_id", "path", "caption", "equipment", "etype", "date"]),
+        "references": pd.DataFrame({"sample_id": [2, 1], "name": ["r2", "r1"], "link": ["l2", "l1"]}),
+    }
+    manifest = snapshot.write_snapshot(str(tmp_path), frames, {"samples": 2})
+    assert manifest["rows"] == {"samples": 2, "images": 0, "references": 2}
+    assert manifest["high_water"] == {"samples": 2, "images": 0}
+    snap = Snapshot(str(tmp_path))
+    assert list(snap._ids) == [1, 2]
+    assert list(snap.sample_details(1)[1]["name"]) == ["r1"]
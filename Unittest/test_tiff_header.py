@@ -0,0 +1,108 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, TiffImagePlugin
+
+from sem_extract import extract_from_image
+from tiff_header import RangeFile, extract_header_only
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code, self.content, self.headers = status_code, content, headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class RangeServer:
+    """Answers Range requests for one in-memory file, like a static file server."""
+
+    def __init__(self, data, honour_range=True):
+        self.data, self.honour_range = data, honour_range
+        self.gets = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.gets += 1
+        if not self.honour_range:
+            return FakeResponse(200, self.data)
+        first, last = (int(v) for v in headers["Range"].removeprefix("bytes=").split("-"))
+        if first >= len(self.data):
+            return FakeResponse(416)
+        body = self.data[first:last + 1]
+        return FakeResponse(206, body, {"Content-Range": f"bytes {first}-{first + len(body) - 1}/{len(self.data)}"})
+
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+
+
+def test_local_reads_and_seeks(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(DATA)
+    with RangeFile(path) as f:
+        assert f.read(4) == DATA[:4]
+        f.seek(-10, io.SEEK_END)
+        assert f.read() == DATA[-10:]
+        f.seek(100)
+        f.seek(5, io.SEEK_CUR)
+        assert f.tell() == 105
+        assert f.read(3) == DATA[105:108]
+        assert f.bytes_read == 17
+
+
+def test_empty_local_file(tmp_path):
+    (tmp_path / "empty.bin").write_bytes(b"")
+    with RangeFile(tmp_path / "empty.bin") as f:
+        assert f.read() == b""
+
+
+def test_remote_reads_fetch_blocks_once():
+    server = RangeServer(DATA)
+    with RangeFile("https://host/data.bin", block_size=1024, session=server) as f:
+        assert f.read(10) == DATA[:10]
+        assert f.read(2000) == DATA[10:2010]   # spans blocks 0-1
+        f.seek(5)
+        assert f.read(5) == DATA[5:10]         # cached, no new request
+        assert (f.requests, f.bytes_read) == (2, 2048)
+        f.seek(0, io.SEEK_END)
+        assert f.tell() == len(DATA)
+        assert f.read(10) == b""
+        f.seek(len(DATA) - 3)
+        assert f.read(10) == DATA[-3:]
+    assert server.gets == f.requests
+
+
+def test_server_without_range_support_downloads_once():
+    server = RangeServer(DATA, honour_range=False)
+    with RangeFile("https://host/data.bin", block_size=1024, session=server) as f:
+        assert f.read(10) == DATA[:10]
+        f.seek(5000)
+        assert f.read(10) == DATA[5000:5010]
+        assert f.bytes_read == len(DATA)
+    assert server.gets == 1
+
+
+@pytest.fixture
+def large_tiff(tmp_path):
+    info = TiffImagePlugin.ImageFileDirectory_v2()
+    info[34682] = "[Scan]\r\nPixelWidth=2.5e-09\r\n"
+    info.tagtype[34682] = 2  # ASCII
+    image = np.random.default_rng(0).integers(0, 256, (1024, 2048), dtype=np.uint8)
+    path = tmp_path / "large.tif"
+    Image.fromarray(image).save(path, tiffinfo=info)
+    return path
+
+
+def test_header_only_matches_full_extraction(large_tiff):
+    record, bytes_read = extract_header_only(large_tiff)
+    assert record == extract_from_image(large_tiff)
+    assert bytes_read < large_tiff.stat().st_size / 100
+
+
+def test_header_only_over_http(large_tiff):
+    server = RangeServer(large_tiff.read_bytes())
+    record, bytes_read = extract_header_only("https://host/images/large.tif", block_size=4096, session=server)
+    assert record == extract_from_image(large_tiff)
+    assert bytes_read <= 3 * 4096
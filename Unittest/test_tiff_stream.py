@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+tifffile = pytest.importorskip("tifffile")
+from tiff_bands import can_stream, iter_bands  # noqa: E402
+from tiff_stream import build_dzi, stream_downsample  # noqa: E402
+
+
+def _write(path, array, **kwargs):
+    tifffile.imwrite(str(path), array, **kwargs)
+    return str(path)
+
+
+def test_rgb_tiles_come_out_in_order(tmp_path):
+    rgb = np.random.default_rng(0).integers(0, 256, (70, 90, 3), dtype=np.uint8)
+    path = _write(tmp_path / "rgb.tif", rgb, tile=(32, 32))
+    bands = list(iter_bands(path))
+    assert [y for y, _ in bands] == [0, 32, 64]
+    assert (np.concatenate([band for _, band in bands]) == rgb).all()
+
+
+def test_grey_strips_become_rgb(tmp_path):
+    grey = np.arange(256, dtype=np.uint8).reshape(16, 16)
+    rgb = np.concatenate([band for _, band in iter_bands(_write(tmp_path / "grey.tif", grey, rowsperstrip=3))])
+    assert rgb.shape == (16, 16, 3)
+    assert (rgb == grey[..., None]).all()
+
+
+def test_min_is_white(tmp_path):
+    ramp = np.arange(256, dtype=np.uint8).reshape(16, 16)
+    path = _write(tmp_path / "inverted.tif", ramp, photometric="miniswhite")
+    assert (np.concatenate([band for _, band in iter_bands(path)])[..., 0] == 255 - ramp).all()
+
+
+def test_can_stream(tmp_path):
+    assert can_stream(_write(tmp_path / "ok.tif", np.zeros((8, 8), np.uint8)))
+    planar = _write(tmp_path / "planar.tif", np.zeros((3, 8, 8), np.uint8), photometric="rgb", planarconfig="separate")
+    assert not can_stream(planar)
+    Image.fromarray(np.zeros((8, 8), np.uint8)).save(tmp_path / "image.png")
+    assert not can_stream(str(tmp_path / "image.png"))
+
+
+def test_downsample_matches_box_filter(tmp_path):
+    image = np.random.default_rng(2).integers(0, 256, (64, 48), dtype=np.uint8)
+    preview = np.asarray(stream_downsample(_write(tmp_path / "map.tif", image, rowsperstrip=5), 12))
+    expected = image[:60, :45].reshape(12, 5, 9, 5).astype(np.uint32).sum(axis=(1, 3)) // 25
+    assert preview.shape == (12, 9, 3)
+    assert (preview[..., 0] == expected).all()
+
+
+@pytest.mark.parametrize("shape", [(3, 5000), (5000, 3), (1, 1)])
+def test_downsample_thin_images(tmp_path, shape):
+    image = np.arange(np.prod(shape)).astype(np.uint8).reshape(shape)
+    preview = stream_downsample(_write(tmp_path / "thin.tif", image), 256)
+    assert max(preview.size) == min(256, max(shape))
+    assert min(preview.size) == 1
+
+
+def test_dzi_pyramid(tmp_path):
+    image = np.random.default_rng(3).integers(0, 256, (300, 520, 3), dtype=np.uint8)
+    dzi = build_dzi(_write(tmp_path / "map.tif", image, rowsperstrip=16), str(tmp_path / "out"), tile_size=256)
+    assert 'Width="520" Height="300"' in open(dzi).read()
+    files = tmp_path / "out" / "image_files"
+    levels = sorted(int(d) for d in os.listdir(files))
+    assert levels == list(range(11))  # ceil(log2(520)) + 1
+    assert sorted(os.listdir(files / "10")) == ["0_0.jpeg", "0_1.jpeg", "1_0.jpeg", "1_1.jpeg", "2_0.jpeg", "2_1.jpeg"]
+    with Image.open(files / "10" / "2_1.jpeg") as tile:
+        assert tile.size == (520 - 512, 300 - 256)
+    with Image.open(files / "0" / "0_0.jpeg") as tile:
+        assert tile.size == (1, 1)
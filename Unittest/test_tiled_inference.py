@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from tiled_inference import aggregate, iter_tiles, predict_tiled, _starts
+
+
+def _image(shape, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+def test_starts_cover_the_length_and_end_flush():
+    assert _starts(100, 40, 40) == [0, 40, 60]
+    assert _starts(100, 40, 20) == [0, 20, 40, 60]
+    assert _starts(40, 40, 40) == [0]
+    assert _starts(41, 40, 10) == [0, 1]
+
+
+@pytest.fixture(params=["png", "tif"])
+def image_file(request, tmp_path):
+    """The same image as a PNG (decoded whole) and as a TIFF streamed in 7-row strips."""
+    image = _image((203, 150))
+    path = str(tmp_path / f"map.{request.param}")
+    if request.param == "tif":
+        tifffile = pytest.importorskip("tifffile")
+        tifffile.imwrite(path, image, rowsperstrip=7)
+    else:
+        Image.fromarray(image).save(path)
+    return path, image
+
+
+@pytest.mark.parametrize("overlap", [0.0, 0.25, 0.5, 0.9])
+@pytest.mark.parametrize("databar_rows", [0, 13])
+def test_tiles_match_the_image(image_file, overlap, databar_rows):
+    path, image = image_file
+    tile = (60, 50)
+    tiles = list(iter_tiles(path, tile, overlap, databar_rows))
+    height = image.shape[0] - databar_rows
+    stride_h, stride_w = int(tile[0] * (1 - overlap)), int(tile[1] * (1 - overlap))
+    expected = [(y, x) for y in _starts(height, tile[0], stride_h) for x in _starts(150, tile[1], stride_w)]
+    assert [(y, x) for y, x, _ in tiles] == expected
+    for y, x, t in tiles:
+        assert t.shape == tile
+        assert (t == image[y:y + tile[0], x:x + tile[1]]).all()
+
+
+def test_image_smaller_than_a_tile(image_file):
+    path, _ = image_file
+    with pytest.raises(ValueError):
+        list(iter_tiles(path, (300, 50)))
+
+
+def test_aggregate():
+    assert aggregate([1.0, 2.0, 3.0, 100.0]) == pytest.approx((2.5, 1.4826))
+    estimate, spread = aggregate([1.0, 3.0], [3.0, 1.0], "weighted")
+    assert (estimate, spread) == pytest.approx((1.5, np.sqrt(0.75)))
+    # All-flat tiles fall back to equal weights
+    assert aggregate([1.0, 3.0], [0.0, 0.0], "weighted") == pytest.approx((2.0, 1.0))
+    with pytest.raises(ValueError):
+        aggregate([1.0], method="mean")
+
+
+def test_predict_tiled_batches_every_tile(image_file):
+    path, image = image_file
+    batches = []
+
+    def predict(batch):
+        batches.append(len(batch))
+        return batch.mean(axis=(1, 2, 3))
+
+    result = predict_tiled(predict, path, (60, 50), batch_size=4)
+    assert result["tiles"] == 12 and batches == [4, 4, 4]
+    means = [image[y:y + 60, x:x + 50].mean() for y in _starts(203, 60, 60) for x in _starts(150, 50, 50)]
+    assert result["pixel_length_nm"] == pytest.approx(np.median(means))
+
+
+def test_small_images_are_predicted_whole(image_file):
+    path, image = image_file
+    result = predict_tiled(lambda batch: batch.mean(axis=(1, 2, 3)), path, (203, 150))
+    assert result == {"pixel_length_nm": pytest.approx(image.mean()), "spread_nm": 0.0, "tiles": 1}
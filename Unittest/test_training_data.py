@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from training_data import ShardedDataset, ShardWriter
+
+
+def _dataset(tmp_path, n, shard_images=4):
+    writer = ShardWriter(str(tmp_path / "ds"), shard_images)
+    for i in range(n):
+        # Two image shapes interleaved, so shards do not follow the add order
+        shape = (4, 6) if i % 3 else (5, 7)
+        writer.add(np.full(shape, i, dtype=np.uint8), pixel_length=float(i), path=f"img_{i}.tif")
+    assert writer.close() == n
+    return ShardedDataset(str(tmp_path / "ds"))
+
+
+def test_positions_follow_add_order(tmp_path):
+    ds = _dataset(tmp_path, 11)
+    assert ds.labels.tolist() == list(range(11))
+    assert ds.index["path"].tolist() == [f"img_{i}.tif" for i in range(11)]
+    images, labels = ds.gather([4, 1, 7])
+    assert labels.tolist() == [4, 1, 7]
+    assert [int(image[0, 0]) for image in images] == [4, 1, 7]
+
+
+def test_split_is_the_notebook_split(tmp_path):
+    ds = _dataset(tmp_path, 20)
+    train, val = ds.split(val_fraction=0.1, seed=42)
+    # train_test_split(test_size=0.1, random_state=42): the first ceil(0.1 * n) of the permutation
+    assert val.tolist() == sorted(np.random.RandomState(42).permutation(20)[:2].tolist())
+    assert len(train) == 18
+    assert sorted(np.concatenate([train, val]).tolist()) == list(range(20))
+
+
+@pytest.mark.parametrize("n, fraction", [(20, 0.1), (37, 0.1), (50, 0.25)])
+def test_split_matches_sklearn(tmp_path, n, fraction):
+    model_selection = pytest.importorskip("sklearn.model_selection")
+    ds = _dataset(tmp_path, n)
+    train, val = ds.split(val_fraction=fraction, seed=42)
+    x_train, x_val = model_selection.train_test_split(np.arange(n), test_size=fraction, random_state=42)
+    assert train.tolist() == sorted(x_train.tolist())
+    assert val.tolist() == sorted(x_val.tolist())
+
+
+def test_writer_refuses_existing_dataset(tmp_path):
+    _dataset(tmp_path, 3)
+    with pytest.raises(FileExistsError):
+        ShardWriter(str(tmp_path / "ds"))
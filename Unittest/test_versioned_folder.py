@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from versioned_folder import MANIFEST_NAME, current_folder, publish
+
+
+def _publish(path, text, keep=2):
+    with publish(str(path), "snapshot", keep) as tmp:
+        with open(os.path.join(tmp, MANIFEST_NAME), "w") as f:
+            f.write(text)
+
+
+def test_current_points_at_the_newest(tmp_path):
+    assert current_folder(str(tmp_path)) is None
+    _publish(tmp_path, "one")
+    _publish(tmp_path, "two")
+    with open(os.path.join(current_folder(str(tmp_path)), MANIFEST_NAME)) as f:
+        assert f.read() == "two"
+
+
+def test_old_folders_are_pruned(tmp_path):
+    for i in range(4):
+        _publish(tmp_path, str(i))
+    folders = [d for d in os.listdir(tmp_path) if d.startswith("snapshot_")]
+    assert len(folders) == 2
+    assert os.path.basename(current_folder(str(tmp_path))) == max(folders)
+
+
+def test_failed_write_leaves_current_alone(tmp_path):
+    _publish(tmp_path, "good")
+    before = current_folder(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        with publish(str(tmp_path), "snapshot") as tmp:
+            open(os.path.join(tmp, MANIFEST_NAME), "w").close()
+            raise RuntimeError("export failed")
+    assert current_folder(str(tmp_path)) == before
+    assert not [d for d in os.listdir(tmp_path) if d.endswith(".tmp")]